@@ -1,8 +1,4 @@
-from SPARQLWrapper import SPARQLWrapper, JSON
-
-# Set up the SPARQL endpoint
-sparql_endpoint = "https://fuzzy-sl.wikibase.cloud/query/sparql"
-sparql = SPARQLWrapper(sparql_endpoint)
+from lodnb.sparql import FUZZY_SL, queryPages
 
 # Define your SPARQL query
 '''query = """
@@ -14,18 +10,14 @@ SELECT ?item ?itemLabel ?geo WHERE {
 }
 """'''
 query = """
-SELECT ?s ?p ?o WHERE { ?s ?p ?o } LIMIT 5000
+SELECT ?s ?p ?o WHERE { ?s ?p ?o }
 """
 
-# Set the query
-sparql.setQuery(query)
-sparql.setReturnFormat(JSON)
-
-# Execute the query and get results
-results = sparql.query().convert()
-
-print(results)
+# Execute the query in ordered pages of 5000 triples and print them as they arrive
+total = 0
+for page in queryPages(query, FUZZY_SL, page_size=5000):
+    for s, p, o in zip(page["s"], page["p"], page["o"]):
+        print(s, "-", p, "-", o)
+    total += len(page)
 
-# Print the results
-for result in results["results"]["bindings"]:
-    print(result["s"]["value"], "-", result["p"]["value"], "-", result["o"]["value"])
+print(f"{total} triples retrieved")
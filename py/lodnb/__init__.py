@@ -0,0 +1 @@
+"""Shared helpers for the Wikidata and LOD analysis scripts in py/."""
@@ -0,0 +1,5 @@
+import sys
+
+from lodnb.cli import main
+
+sys.exit(main())
@@ -0,0 +1,62 @@
+"""Vectorized aggregations shared by the chart scripts.
+
+- :func:`count_by` counts rows per category combination.
+- :func:`top_k_per_group` keeps the k largest rows of every group with one
+  sort and a ``cumcount`` rank instead of ``groupby().apply(nlargest)``,
+  which calls a Python function and builds a small frame per group.
+- :func:`share_with_others` keeps the categories above a percentage share
+  and folds the rest into one "Others" row.
+- :func:`grouped_bar` draws rows coloured by group with a single ``bar`` call.
+"""
+import pandas as pd
+
+
+def count_by(df, columns, name="count"):
+    """Return the number of rows per combination of ``columns`` as a column ``name``."""
+    return df.groupby(columns, observed=True).size().reset_index(name=name)
+
+
+def top_k_per_group(df, group, value, k):
+    """Return the ``k`` rows with the largest ``value`` in each ``group``.
+
+    Groups appear in sorted order and rows within a group by descending
+    ``value``, ties in their original order, as with
+    ``groupby(group).apply(lambda x: x.nlargest(k, value))``.
+    """
+    ranked = df.sort_values(value, ascending=False, kind="stable")
+    ranked = ranked[ranked.groupby(group, observed=True).cumcount() < k]
+    return ranked.sort_values(group, kind="stable").reset_index(drop=True)
+
+
+def share_with_others(df, label, value="count", threshold=1.0, other_label="Others", inclusive=False):
+    """Keep rows whose share of the ``value`` total exceeds ``threshold`` percent.
+
+    The remaining rows are summed into one ``other_label`` row at the end
+    (omitted if there are none). With ``inclusive`` rows at exactly the
+    threshold are kept as well. A ``percentage`` column is added.
+    """
+    total = df[value].sum()
+    percentage = df[value] * 100 / total
+    # Compared without dividing, so counts at exactly the threshold are not lost to rounding.
+    scaled = df[value] * 100
+    keep = scaled >= threshold * total if inclusive else scaled > threshold * total
+    major = df.loc[keep, [label, value]].assign(percentage=percentage[keep])
+    if keep.all():
+        return major.reset_index(drop=True)
+    other = df.loc[~keep, value].sum()
+    others = pd.DataFrame({label: [other_label], value: [other], "percentage": [other / total * 100]})
+    major[label] = major[label].astype(object)
+    return pd.concat([major, others], ignore_index=True)
+
+
+def grouped_bar(ax, df, x, height, group, colors):
+    """Draw one bar per row of ``df`` coloured by ``group`` in a single call.
+
+    ``colors`` maps group values to colours. Returns the legend handles for
+    the groups present, in order of first appearance.
+    """
+    from lodnb.maps import category_patches
+
+    groups = df[group].tolist()
+    ax.bar(df[x].astype(str), df[height], color=[colors[key] for key in groups])
+    return category_patches({key: colors[key] for key in dict.fromkeys(groups)})
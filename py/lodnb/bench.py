@@ -0,0 +1,399 @@
+"""End-to-end benchmarks of the analysis pipeline on synthetic data.
+
+A local HTTP server stands in for the SPARQL endpoints and answers with
+synthetic results shaped like those of the scripts' queries:
+
+- ``ogham``: Wikidata Ogham stones with coordinates and counties (SPARQL JSON)
+- ``pokemon``: Pokémon with colour and mass (SPARQL JSON)
+- ``samian``: Samian ware kiln sites with region and layer (SPARQL JSON)
+- ``solidpod``: Campanian Ignimbrite sites of the Solid Pod (Turtle)
+
+For every dataset and size the pipeline stages are timed separately, with
+the same helpers the scripts use: ``fetch`` (HTTP, bypassing the cache),
+``decode`` (JSON or Turtle parsing alone), ``frame`` (typed DataFrame),
+``geometry`` (WKT points), ``reproject`` (to Web Mercator), ``kde`` (point
+density) and ``render`` (one figure to PNG). Stages that a dataset does not
+go through are skipped.
+
+Results are saved as JSON named after the current git commit, so runs on
+different commits can be compared and regressions flagged::
+
+    python -m lodnb.bench run --sizes 1000 100000 1000000
+    python -m lodnb.bench compare            # previous run against the latest
+    python -m lodnb.bench compare BASE HEAD --threshold 1.2
+
+``compare`` exits with status 1 when a stage got slower than the threshold.
+"""
+import argparse
+import glob
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+from lodnb.runner import PY_DIR
+
+DEFAULT_SIZES = (1_000, 10_000, 100_000, 1_000_000)
+DEFAULT_RESULTS_DIR = os.path.join(os.path.dirname(PY_DIR), "benchmarks")
+DEFAULT_THRESHOLD = 1.2
+# Stages faster than this are too noisy to flag as regressions.
+MIN_SECONDS = 0.01
+
+STAGES = ("fetch", "decode", "frame", "geometry", "reproject", "kde", "render")
+
+WD = "http://www.wikidata.org/entity/"
+WKT_LITERAL = "http://www.opengis.net/ont/geosparql#wktLiteral"
+XSD_DECIMAL = "http://www.w3.org/2001/XMLSchema#decimal"
+SITE_NS = "http://fuzzy-sl.squirrel.link/ontology/"
+EARTH_RADIUS = 6378137.0
+
+
+def _uri(value):
+    return '{"type":"uri","value":"%s"}' % value
+
+
+def _label(value):
+    return '{"xml:lang":"en","type":"literal","value":"%s"}' % value
+
+
+def _typed(value, datatype):
+    return '{"datatype":"%s","type":"literal","value":"%s"}' % (datatype, value)
+
+
+def _lonlat(n, rng):
+    """Clustered coordinates over Ireland, as the site registries are distributed."""
+    from lodnb.density import _synthetic_sites
+
+    x, y = _synthetic_sites(n, rng)
+    lon = np.degrees(x / EARTH_RADIUS)
+    lat = np.degrees(2 * np.arctan(np.exp(y / EARTH_RADIUS)) - np.pi / 2)
+    return np.round(lon, 6), np.round(lat, 6)
+
+
+def _sparql_json(variables, rows):
+    head = json.dumps({"vars": variables})
+    return ('{"head":%s,"results":{"bindings":[%s]}}' % (head, ",".join(rows))).encode("utf-8")
+
+
+def _ogham(n, rng):
+    lon, lat = _lonlat(n, rng)
+    county = rng.integers(0, 32, n)
+    variables = ["item", "itemLabel", "geo", "county", "countyLabel"]
+    rows = [
+        '{"item":%s,"itemLabel":%s,"geo":%s,"county":%s,"countyLabel":%s}' % (
+            _uri(f"{WD}Q{100000 + i}"), _label(f"CIIC {i}"), _typed(f"Point({x} {y})", WKT_LITERAL),
+            _uri(f"{WD}Q{500 + c}"), _label(f"County {c}"),
+        )
+        for i, (x, y, c) in enumerate(zip(lon.tolist(), lat.tolist(), county.tolist()))
+    ]
+    return _sparql_json(variables, rows)
+
+
+def _pokemon(n, rng):
+    colour = rng.integers(0, 10, n)
+    mass = np.round(rng.lognormal(3, 1.2, n), 1)
+    variables = ["pokemon", "pokemonLabel", "pokedexNumber", "color", "colorLabel", "mass"]
+    rows = [
+        '{"pokemon":%s,"pokemonLabel":%s,"pokedexNumber":%s,"color":%s,"colorLabel":%s,"mass":%s}' % (
+            _uri(f"{WD}Q{200000 + i}"), _label(f"Pokemon {i}"), '{"type":"literal","value":"%03d"}' % (i + 1),
+            _uri(f"{WD}Q{1000 + c}"), _label(f"Colour {c}"), _typed(m, XSD_DECIMAL),
+        )
+        for i, (c, m) in enumerate(zip(colour.tolist(), mass.tolist()))
+    ]
+    return _sparql_json(variables, rows)
+
+
+def _samian(n, rng):
+    lon, lat = _lonlat(n, rng)
+    region = rng.integers(0, 12, n)
+    layer = rng.integers(0, 4, n)
+    variables = ["item", "samian", "itemLabel", "geo", "layerLabel", "layer", "kilnregion", "kilnregionLabel"]
+    rows = [
+        '{"item":%s,"samian":%s,"itemLabel":%s,"geo":%s,"layerLabel":%s,"layer":%s,'
+        '"kilnregion":%s,"kilnregionLabel":%s}' % (
+            _uri(f"{WD}Q{300000 + i}"), _uri(f"http://data.archaeology.link/data/samian/site/{i}"),
+            _label(f"Kiln site {i}"), _typed(f"Point({x} {y})", WKT_LITERAL),
+            _label(f"Layer {l}"), _uri(f"{WD}Q{2000 + l}"), _uri(f"{WD}Q{3000 + r}"), _label(f"Region {r}"),
+        )
+        for i, (x, y, r, l) in enumerate(zip(lon.tolist(), lat.tolist(), region.tolist(), layer.tolist()))
+    ]
+    return _sparql_json(variables, rows)
+
+
+def _solidpod(n, rng):
+    lon, lat = _lonlat(n, rng)
+    kinds = ("Point", "Area", "Line")
+    kind = rng.integers(0, len(kinds), n)
+    parts = [
+        f"@prefix fsl: <{SITE_NS}> .\n"
+        "@prefix geo: <http://www.opengis.net/ont/geosparql#> .\n"
+        "@prefix rdfs: <http://www.w3.org/2000/01/rdf-schema#> .\n"
+        "@prefix site: <http://fuzzy-sl.squirrel.link/data/> .\n\n"
+    ]
+    parts.extend(
+        f'site:s{i} a fsl:Site ; rdfs:label "Site {i}" ; fsl:hasReference site:ref{i % 97} ;\n'
+        f"  fsl:spatialType fsl:{kinds[k]} ; geo:hasGeometry site:s{i}_geom .\n"
+        f'site:s{i}_geom geo:asWKT "POINT({x} {y})"^^geo:wktLiteral .\n'
+        for i, (x, y, k) in enumerate(zip(lon.tolist(), lat.tolist(), kind.tolist()))
+    )
+    return "".join(parts).encode("utf-8")
+
+
+# name: (response builder, content type, stages, category column)
+DATASETS = {
+    "ogham": (_ogham, "application/sparql-results+json", STAGES, "countyLabel"),
+    "pokemon": (_pokemon, "application/sparql-results+json", ("fetch", "decode", "frame", "render"), "colorLabel"),
+    "samian": (_samian, "application/sparql-results+json", STAGES, "kilnregionLabel"),
+    "solidpod": (_solidpod, "text/turtle", ("fetch", "decode", "frame", "render"), "spatialType"),
+}
+
+
+class MockEndpoint:
+    """A local HTTP server answering every query at ``/<dataset>/<rows>`` with synthetic results.
+
+    Responses are generated once per dataset and size (the latest one is
+    kept) and served for GET and POST requests alike, whatever the query.
+    """
+
+    def __init__(self, seed=0):
+        self.seed = seed
+        self._body = (None, None)
+        self._lock = threading.Lock()
+        endpoint = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                try:
+                    _, dataset, rows = self.path.split("?", 1)[0].split("/")
+                    content_type = DATASETS[dataset][1]
+                    body = endpoint.body(dataset, int(rows))
+                except (KeyError, ValueError):
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_POST(self):
+                self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                self.do_GET()
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def body(self, dataset, rows):
+        with self._lock:
+            key, body = self._body
+            if key != (dataset, rows):
+                body = DATASETS[dataset][0](rows, np.random.default_rng(self.seed))
+                self._body = ((dataset, rows), body)
+            return body
+
+    def url(self, dataset, rows):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}/{dataset}/{rows}"
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+        return False
+
+
+def _render(frame, column, geographic):
+    from matplotlib.figure import Figure
+
+    figure = Figure(figsize=(10, 10))
+    ax = figure.subplots()
+    if geographic:
+        from lodnb.maps import plot_categories
+
+        plot_categories(ax, frame, column, markersize=10, alpha=0.7)
+    else:
+        counts = frame[column].value_counts()
+        ax.bar(counts.index.astype(str), counts.to_numpy())
+    figure.savefig(io.BytesIO(), format="png", dpi=100)
+
+
+def run_pipeline(endpoint, dataset, rows):
+    """Run the stages of ``dataset`` once and return ``{stage: seconds}``."""
+    from lodnb.sparql import SparqlClient
+
+    _, accept, stages, column = DATASETS[dataset]
+    timings = {}
+    clock = time.perf_counter
+
+    def timed(stage, function, *args):
+        started = clock()
+        result = function(*args)
+        timings[stage] = clock() - started
+        return result
+
+    url = endpoint.url(dataset, rows)
+    endpoint.body(dataset, rows)
+    client = SparqlClient(url)
+    try:
+        body = timed("fetch", lambda: client.request("SELECT * WHERE { ?s ?p ?o }", accept).content)
+    finally:
+        client.close()
+
+    if dataset == "solidpod":
+        from lodnb.rdf import iter_triples, read_subjects
+
+        timed("decode", lambda: sum(1 for _ in iter_triples(body)))
+        frame = timed("frame", read_subjects, body, SITE_NS + "Site",
+                      {"label": "http://www.w3.org/2000/01/rdf-schema#label", "spatialType": SITE_NS + "spatialType"})
+    else:
+        from lodnb.frames import read_results
+
+        timed("decode", json.loads, body)
+        frame = timed("frame", lambda: read_results(io.BytesIO(body)))
+
+    if "geometry" in stages:
+        from lodnb.density import point_density
+        from lodnb.geo import points_frame, reproject
+
+        frame = timed("geometry", points_frame, frame, "geo")
+        frame = timed("reproject", reproject, frame)
+        timed("kde", point_density, frame.geometry.x.to_numpy(), frame.geometry.y.to_numpy())
+    timed("render", _render, frame, column, "geometry" in stages)
+    return timings
+
+
+def _git(*args):
+    try:
+        return subprocess.run(["git", *args], cwd=PY_DIR, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def benchmark(datasets, sizes, repeat=1, seed=0, progress=None):
+    """Time every stage of ``datasets`` at ``sizes`` rows, keeping the best of ``repeat`` runs.
+
+    Returns the result document: the git commit, platform and one record
+    per dataset, size and stage.
+    """
+    results = []
+    with MockEndpoint(seed) as endpoint:
+        for dataset in datasets:
+            for rows in sizes:
+                best = {}
+                for _ in range(repeat):
+                    for stage, seconds in run_pipeline(endpoint, dataset, rows).items():
+                        best[stage] = min(seconds, best.get(stage, seconds))
+                for stage, seconds in best.items():
+                    results.append({"dataset": dataset, "rows": rows, "stage": stage, "seconds": seconds})
+                if progress is not None:
+                    progress(dataset, rows, best)
+    return {
+        "commit": _git("rev-parse", "HEAD"),
+        "dirty": bool(_git("status", "--porcelain", "--untracked-files=no")),
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "results": results,
+    }
+
+
+def save(document, results_dir=DEFAULT_RESULTS_DIR):
+    """Write ``document`` to ``results_dir`` and return its path."""
+    os.makedirs(results_dir, exist_ok=True)
+    commit = (document["commit"] or "nogit")[:10] + ("-dirty" if document["dirty"] else "")
+    path = os.path.join(results_dir, f"{document['created'].replace(':', '')}-{commit}.json")
+    with open(path, "w", encoding="utf-8") as handle:
+        json.dump(document, handle, indent=1)
+    return path
+
+
+def _resolve(name, results_dir):
+    """Return the result file for a path or a commit prefix (the latest run of that commit)."""
+    if os.path.exists(name):
+        return name
+    commit = _git("rev-parse", name) or name
+    runs = sorted(glob.glob(os.path.join(results_dir, f"*-{commit[:10]}*.json")))
+    if not runs:
+        raise SystemExit(f"No benchmark results for {name!r} in {results_dir}")
+    return runs[-1]
+
+
+def compare(base, head, threshold=DEFAULT_THRESHOLD):
+    """Return ``(dataset, rows, stage, base seconds, head seconds, regressed)`` for the shared records."""
+    timings = {(r["dataset"], r["rows"], r["stage"]): r["seconds"] for r in base["results"]}
+    rows = []
+    for record in head["results"]:
+        key = (record["dataset"], record["rows"], record["stage"])
+        if key in timings:
+            before, after = timings[key], record["seconds"]
+            regressed = after > max(before, MIN_SECONDS) * threshold
+            rows.append((*key, before, after, regressed))
+    return rows
+
+
+def _print_timings(dataset, rows, timings):
+    cells = " ".join(f"{stage} {timings[stage]:.3f}s" for stage in STAGES if stage in timings)
+    print(f"{dataset:>9} {rows:>9}  {cells}", flush=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the analysis pipeline against a mock SPARQL endpoint.")
+    parser.add_argument("--results-dir", default=DEFAULT_RESULTS_DIR)
+    commands = parser.add_subparsers(dest="command", required=True)
+    run = commands.add_parser("run", help="time every pipeline stage and save the results")
+    run.add_argument("--datasets", nargs="+", choices=sorted(DATASETS), default=sorted(DATASETS))
+    run.add_argument("--sizes", nargs="+", type=int, default=list(DEFAULT_SIZES))
+    run.add_argument("--repeat", type=int, default=1, help="keep the best of this many runs per stage")
+    run.add_argument("--seed", type=int, default=0)
+    diff = commands.add_parser("compare", help="compare two saved runs (default: the last two)")
+    diff.add_argument("runs", nargs="*", help="result files or commits: BASE [HEAD]")
+    diff.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                      help="flag stages slower than BASE by this factor")
+    args = parser.parse_args(argv)
+
+    if args.command == "run":
+        document = benchmark(args.datasets, args.sizes, args.repeat, args.seed, _print_timings)
+        print(f"saved {save(document, args.results_dir)}")
+        return 0
+
+    if len(args.runs) > 2:
+        parser.error("compare takes at most two runs")
+    saved = sorted(glob.glob(os.path.join(args.results_dir, "*.json")))
+    paths = [_resolve(name, args.results_dir) for name in args.runs]
+    if len(paths) == 1:
+        paths.append(saved[-1] if saved else None)
+    elif not paths:
+        paths = saved[-2:]
+    if len(paths) < 2 or None in paths:
+        raise SystemExit(f"Need two benchmark runs in {args.results_dir}")
+    documents = []
+    for path in paths:
+        with open(path, encoding="utf-8") as handle:
+            documents.append(json.load(handle))
+    base, head = documents
+    print(f"base {base['commit'][:10]} ({base['created']})  head {head['commit'][:10]} ({head['created']})")
+    print(f"{'dataset':>9} {'rows':>9} {'stage':>10} {'base (s)':>10} {'head (s)':>10} {'ratio':>7}")
+    regressions = 0
+    for dataset, rows, stage, before, after, regressed in compare(base, head, args.threshold):
+        regressions += regressed
+        ratio = after / before if before else float("inf")
+        flag = "  slower" if regressed else ""
+        print(f"{dataset:>9} {rows:>9} {stage:>10} {before:>10.3f} {after:>10.3f} {ratio:>6.2f}x{flag}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
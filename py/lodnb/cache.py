@@ -0,0 +1,160 @@
+"""Persistent on-disk cache for SPARQL responses.
+
+Responses are stored zlib-compressed in a single SQLite file, keyed by the
+endpoint URL, the requested media type and the normalized query text, so
+queries that differ only in whitespace or comments share one entry.
+Entries expire after a TTL and the least recently used ones are evicted
+once the cache grows beyond its size budget.
+
+Environment variables:
+
+- ``LODNB_CACHE_DIR``: base directory for all caches (default ``~/.cache/jupyter-nb-lod``)
+- ``LODNB_CACHE_TTL``: entry lifetime in seconds (default one day)
+- ``LODNB_CACHE_MAX_BYTES``: size budget of the SPARQL cache (default 256 MB)
+- ``LODNB_CACHE``: set to ``0`` to bypass the cache entirely
+- ``LODNB_OFFLINE``: set to ``1`` to answer only from the cache, even from stale entries
+"""
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+import zlib
+
+DEFAULT_TTL = 24 * 60 * 60
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+_TOKEN = re.compile(
+    r'''(?P<iri><[^<>"{}|^`\\\s]*>)'''
+    r'''|(?P<string>"""(?:[^"\\]|\\.|"(?!""))*"""|\'\'\'(?:[^'\\]|\\.|'(?!''))*\'\'\''''
+    r'''|"(?:[^"\\\n]|\\.)*"|'(?:[^'\\\n]|\\.)*')'''
+    r'''|(?P<comment>\#[^\n]*)'''
+    r'''|(?P<space>\s+)''',
+)
+
+
+class OfflineCacheMiss(LookupError):
+    """Raised in offline mode when a query has no cached response."""
+
+
+def cache_dir(*parts):
+    """Return (and create) a directory below the shared cache base."""
+    base = os.environ.get("LODNB_CACHE_DIR") or os.path.join(
+        os.path.expanduser("~"), ".cache", "jupyter-nb-lod"
+    )
+    path = os.path.join(base, *parts)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def is_offline():
+    return os.environ.get("LODNB_OFFLINE", "") not in ("", "0")
+
+
+def normalize_query(query):
+    """Strip comments and collapse whitespace outside IRIs and string literals."""
+    out = []
+    pos = 0
+    for match in _TOKEN.finditer(query):
+        if match.start() > pos:
+            out.append(query[pos:match.start()])
+        kind = match.lastgroup
+        if kind in ("iri", "string"):
+            out.append(match.group())
+        elif not out or not out[-1].endswith(" "):
+            out.append(" ")
+        pos = match.end()
+    out.append(query[pos:])
+    return "".join(out).strip()
+
+
+def cache_key(endpoint, query, accept):
+    text = "\n".join((endpoint, accept, normalize_query(query)))
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class ResultCache:
+    """SQLite-backed store of compressed response bodies with TTL and LRU eviction."""
+
+    def __init__(self, path=None, ttl=None, max_bytes=None):
+        self.path = path or os.path.join(cache_dir(), "sparql.sqlite")
+        self.ttl = ttl if ttl is not None else int(os.environ.get("LODNB_CACHE_TTL", DEFAULT_TTL))
+        self.max_bytes = max_bytes if max_bytes is not None else int(
+            os.environ.get("LODNB_CACHE_MAX_BYTES", DEFAULT_MAX_BYTES)
+        )
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            " key TEXT PRIMARY KEY, endpoint TEXT, created REAL, accessed REAL,"
+            " size INTEGER, body BLOB)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed)")
+        self._db.commit()
+
+    def get(self, key, allow_stale=False):
+        """Return the cached body for ``key`` or ``None`` if missing or expired."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT created, body FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            created, body = row
+            if not allow_stale and self.ttl >= 0 and time.time() - created > self.ttl:
+                return None
+            self._db.execute("UPDATE entries SET accessed = ? WHERE key = ?", (time.time(), key))
+            self._db.commit()
+        return zlib.decompress(body)
+
+    def put(self, key, endpoint, body):
+        blob = zlib.compress(body, 6)
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?)",
+                (key, endpoint, now, now, len(blob), sqlite3.Binary(blob)),
+            )
+            self._evict()
+            self._db.commit()
+
+    def _evict(self):
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in self._db.execute(
+            "SELECT key, size FROM entries ORDER BY accessed"
+        ).fetchall():
+            self._db.execute("DELETE FROM entries WHERE key = ?", (key,))
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def clear(self):
+        with self._lock:
+            self._db.execute("DELETE FROM entries")
+            self._db.commit()
+            self._db.execute("VACUUM")
+
+    def stats(self):
+        with self._lock:
+            count, size = self._db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries"
+            ).fetchone()
+        return {"entries": count, "bytes": size, "path": self.path}
+
+
+_default_cache = None
+_default_lock = threading.Lock()
+
+
+def get_cache():
+    """Return the process-wide cache, or ``None`` when disabled via ``LODNB_CACHE=0``."""
+    global _default_cache
+    if os.environ.get("LODNB_CACHE", "1") == "0" and not is_offline():
+        return None
+    with _default_lock:
+        if _default_cache is None:
+            _default_cache = ResultCache()
+        return _default_cache
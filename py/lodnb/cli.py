@@ -0,0 +1,131 @@
+"""Command line entry point for the analyses in py/.
+
+    python -m lodnb list                 # analyses and the endpoints they query
+    python -m lodnb fetch [name ...]     # refresh query results only (no plotting imports)
+    python -m lodnb run NAME [--imports] # run one analysis and report import time
+    python -m lodnb render [...]         # headless figures, see lodnb.render
+
+Only the standard library and the modules needed by a command are
+imported: ``list`` and ``fetch`` read the scripts with :mod:`ast` and never
+import pandas or matplotlib, so a query-only or cache-hit run starts
+quickly. ``run`` executes the script in-process and times every top-level
+import it triggers, grouped by package, so slow imports show up directly.
+"""
+import argparse
+import builtins
+import os
+import runpy
+import sys
+import time
+from collections import defaultdict
+
+from lodnb.trace import span
+
+PY_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class ImportTimer:
+    """Accumulate the wall time of outermost imports per top-level package."""
+
+    def __init__(self):
+        self.times = defaultdict(float)
+        self._depth = 0
+        self._original = None
+
+    def __enter__(self):
+        self._original = builtins.__import__
+
+        def timed_import(name, globals=None, locals=None, fromlist=(), level=0):
+            if self._depth or level or name.split(".", 1)[0] in sys.modules:
+                return self._original(name, globals, locals, fromlist, level)
+            self._depth += 1
+            start = time.perf_counter()
+            try:
+                return self._original(name, globals, locals, fromlist, level)
+            finally:
+                self._depth -= 1
+                self.times[name.split(".", 1)[0]] += time.perf_counter() - start
+
+        builtins.__import__ = timed_import
+        return self
+
+    def __exit__(self, *exc):
+        builtins.__import__ = self._original
+        return False
+
+    @property
+    def total(self):
+        return sum(self.times.values())
+
+    def report(self, limit=10, file=sys.stderr):
+        for package, seconds in sorted(self.times.items(), key=lambda item: -item[1])[:limit]:
+            print(f"  {seconds:7.3f}s  {package}", file=file)
+
+
+def _find(name):
+    from lodnb.runner import discover
+
+    for analysis in discover():
+        if analysis.name == name or analysis.name == name.removesuffix(".py"):
+            return analysis
+    raise SystemExit(f"Unknown analysis {name!r}; see 'python -m lodnb list'")
+
+
+def list_command(args):
+    from lodnb.runner import discover
+
+    for analysis in discover():
+        endpoints = sorted({spec.endpoint for spec in analysis.queries})
+        print(f"{analysis.name:35} {len(analysis.queries)} query(ies)  {' '.join(endpoints)}")
+    return 0
+
+
+def fetch_command(args):
+    from lodnb import runner
+
+    return runner.main(args.names)
+
+
+def run_command(args):
+    analysis = _find(args.name)
+    if args.headless:
+        os.environ["MPLBACKEND"] = "Agg"
+    if PY_DIR not in sys.path:
+        sys.path.insert(0, PY_DIR)
+    started = time.perf_counter()
+    with ImportTimer() as timer, span("script", script=analysis.name):
+        runpy.run_path(analysis.path, run_name="__main__")
+    elapsed = time.perf_counter() - started
+    print(f"{analysis.name}: {elapsed:.2f}s, of which imports {timer.total:.2f}s", file=sys.stderr)
+    if args.imports:
+        timer.report()
+    return 0
+
+
+def render_command(args):
+    from lodnb import render
+
+    return render.main(args.args)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m lodnb", description="Run the LOD analyses in py/.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("list", help="list the analyses").set_defaults(handler=list_command)
+    fetch = commands.add_parser("fetch", help="refresh query results without running the scripts")
+    fetch.add_argument("names", nargs="*")
+    fetch.set_defaults(handler=fetch_command)
+    run = commands.add_parser("run", help="run one analysis")
+    run.add_argument("name")
+    run.add_argument("--imports", action="store_true", help="list the slowest imports")
+    run.add_argument("--headless", action="store_true", help="use the non-interactive Agg backend")
+    run.set_defaults(handler=run_command)
+    render = commands.add_parser("render", help="render figures to files (see lodnb.render --help)")
+    render.add_argument("args", nargs=argparse.REMAINDER)
+    render.set_defaults(handler=render_command)
+    args = parser.parse_args(argv)
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
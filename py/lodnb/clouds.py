@@ -0,0 +1,241 @@
+"""Word clouds with a cached layout.
+
+``WordCloud.generate_from_frequencies`` places every word with a
+collision-avoiding random search over an occupancy map, which dominates
+the run time of wikidata-holywells-names.py. :func:`cached_wordcloud`
+stores the resulting public ``WordCloud.layout_`` (word, font size,
+position, orientation and colour per word) below the shared cache
+directory, keyed by the normalized frequency table and every parameter
+that affects placement (canvas size, mask, margins, font and size
+settings, colours). A cached layout is restored by assigning ``layout_``;
+``to_image`` draws it as after a fresh layout.
+
+When the frequencies changed, :func:`reuse_layout` updates the previous
+layout for the same canvas incrementally: a word whose relative frequency
+moved by at most ``tolerance`` keeps its position, orientation and colour,
+with its font size rescaled as ``WordCloud`` would (in place when it
+shrinks, re-placed when it grows). Changed and new words are placed into
+the space left by the kept ones with the same search ``WordCloud`` uses,
+and removed words free their space. The result is not the layout a fresh
+run would produce: words keep their places, so the cloud can end up less
+dense, and a word that no longer fits is dropped. When fewer than half of
+the words can be kept, or with ``repeat=True``, the full layout runs.
+
+A layout is independent of the output size: :func:`render_wordcloud`
+draws it at any width, so a high-resolution figure does not need a larger
+canvas (and a new layout)::
+
+    cloud = cached_wordcloud(frequencies, width=800, height=400, background_color="white")
+    plt.imshow(render_wordcloud(cloud, width=1600))
+"""
+import hashlib
+import json
+import os
+from random import Random
+
+import numpy as np
+
+from lodnb.cache import cache_dir
+
+DEFAULT_TOLERANCE = 0.1
+# Share of the new words that must keep their place for an incremental layout.
+MIN_KEPT = 0.5
+# WordCloud options that decide where words go and how they look.
+_LAYOUT_OPTIONS = (
+    "width", "height", "margin", "prefer_horizontal", "max_words", "min_font_size", "max_font_size",
+    "font_step", "relative_scaling", "font_path", "repeat", "colormap",
+)
+
+
+def _normalized(frequencies, max_words):
+    """Return ``[(word, frequency / max frequency), ...]`` of the ``max_words`` most frequent words."""
+    items = sorted(((str(word), float(count)) for word, count in frequencies.items() if count > 0),
+                   key=lambda item: item[1], reverse=True)[:max_words]
+    if not items:
+        raise ValueError("No words with a positive frequency")
+    top = items[0][1]
+    return [(word, count / top) for word, count in items]
+
+
+def _canvas_key(cloud):
+    options = {name: getattr(cloud, name, None) for name in _LAYOUT_OPTIONS}
+    options["colormap"] = getattr(options["colormap"], "name", options["colormap"])
+    color_func = getattr(cloud, "color_func", None)
+    options["color_func"] = getattr(color_func, "__qualname__", type(color_func).__name__)
+    if cloud.mask is not None:
+        options["mask"] = hashlib.sha256(np.ascontiguousarray(cloud.mask).tobytes()).hexdigest()
+    return hashlib.sha256(json.dumps(options, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+def _layout_key(canvas, normalized):
+    return hashlib.sha256((canvas + json.dumps(normalized)).encode("utf-8")).hexdigest()
+
+
+def _path(name):
+    return os.path.join(cache_dir("wordclouds"), name + ".json")
+
+
+def _color(color):
+    """Return ``color`` as a string PIL understands (``color_func`` may return RGB tuples)."""
+    if isinstance(color, str):
+        return color
+    return "rgb({}, {}, {})".format(*(int(value) for value in tuple(color)[:3]))
+
+
+def _save(name, layout):
+    entries = [
+        [[word, freq], int(font_size), [int(x), int(y)], None if orientation is None else int(orientation),
+         _color(color)]
+        for (word, freq), font_size, (x, y), orientation, color in layout
+    ]
+    path = _path(name)
+    with open(path + ".tmp", "w", encoding="utf-8") as handle:
+        json.dump(entries, handle)
+    os.replace(path + ".tmp", path)
+
+
+def _load(name):
+    from PIL import Image
+
+    try:
+        with open(_path(name), encoding="utf-8") as handle:
+            entries = json.load(handle)
+    except (OSError, ValueError):
+        return None
+    transpose = getattr(Image, "Transpose", int)
+    return [
+        ((word, freq), font_size, (x, y), None if orientation is None else transpose(orientation), color)
+        for (word, freq), font_size, (x, y), orientation, color in entries
+    ]
+
+
+def _font_size(entry, freq, relative_scaling):
+    """Scale the font size of a layout ``entry`` to ``freq`` the way ``WordCloud`` steps between words."""
+    (_, entry_freq), font_size = entry[0], entry[1]
+    return int(round((relative_scaling * freq / entry_freq + 1 - relative_scaling) * font_size))
+
+
+def _place(cloud, kept, pending):
+    """Place ``pending`` ``(word, freq, font_size)`` around the ``kept`` layout entries.
+
+    Follows ``WordCloud.generate_from_frequencies``: try the orientation
+    drawn at random, then the other one, then smaller fonts down to
+    ``min_font_size``. Words that do not fit are left out.
+    """
+    from PIL import Image, ImageDraw, ImageFont
+    from wordcloud.wordcloud import IntegralOccupancyMap
+
+    random_state = cloud.random_state if cloud.random_state is not None else Random()
+    boolean_mask = cloud._get_bolean_mask(cloud.mask) if cloud.mask is not None else None
+    occupancy = IntegralOccupancyMap(cloud.height, cloud.width, boolean_mask)
+    img_grey = Image.new("L", (cloud.width, cloud.height))
+    draw = ImageDraw.Draw(img_grey)
+
+    def occupy(word, font_size, x, y, orientation):
+        font = ImageFont.TransposedFont(ImageFont.truetype(cloud.font_path, font_size), orientation=orientation)
+        draw.text((y, x), word, fill="white", font=font)
+        img_array = np.asarray(img_grey)
+        if boolean_mask is not None:
+            img_array = img_array + boolean_mask
+        occupancy.update(img_array, x, y)
+
+    for (word, _), font_size, (x, y), orientation, _ in kept:
+        occupy(word, font_size, x, y, orientation)
+
+    layout = list(kept)
+    for word, freq, font_size in pending:
+        orientation = None if random_state.random() < cloud.prefer_horizontal else Image.ROTATE_90
+        tried_other_orientation = False
+        result = None
+        while font_size >= cloud.min_font_size:
+            font = ImageFont.TransposedFont(ImageFont.truetype(cloud.font_path, font_size), orientation=orientation)
+            box_size = draw.textbbox((0, 0), word, font=font, anchor="lt")
+            result = occupancy.sample_position(box_size[3] + cloud.margin, box_size[2] + cloud.margin,
+                                               random_state)
+            if result is not None:
+                break
+            if not tried_other_orientation and cloud.prefer_horizontal < 1:
+                orientation = Image.ROTATE_90 if orientation is None else None
+                tried_other_orientation = True
+            else:
+                font_size -= cloud.font_step
+                orientation = None
+        if result is None:
+            continue
+        x, y = (int(value) for value in np.array(result) + cloud.margin // 2)
+        occupy(word, font_size, x, y, orientation)
+        color = cloud.color_func(word, font_size=font_size, position=(x, y), orientation=orientation,
+                                 random_state=random_state, font_path=cloud.font_path)
+        layout.append(((word, freq), font_size, (x, y), orientation, color))
+    layout.sort(key=lambda entry: entry[0][1], reverse=True)
+    return layout
+
+
+def reuse_layout(cloud, previous, normalized, tolerance=DEFAULT_TOLERANCE):
+    """Update the ``previous`` layout of ``cloud`` to ``normalized`` frequencies, or return None.
+
+    Words whose relative frequency moved by at most ``tolerance`` keep their
+    place; the others are placed again around them. Returns None when fewer
+    than :data:`MIN_KEPT` of the words keep their place, or for ``repeat``
+    clouds, whose layouts list words more than once.
+    """
+    if cloud.repeat or not previous:
+        return None
+    rs = cloud.relative_scaling
+    before = {entry[0][0]: entry for entry in previous}
+    references = sorted(previous, key=lambda entry: entry[0][1])
+    kept = []
+    pending = []
+    for word, freq in normalized:
+        entry = before.get(word)
+        if entry is not None and abs(freq - entry[0][1]) <= tolerance * entry[0][1]:
+            font_size = _font_size(entry, freq, rs)
+            if font_size <= entry[1]:
+                kept.append(((word, freq), font_size) + tuple(entry[2:]))
+                continue
+        elif entry is None:
+            # Size a new word from the least frequent previous word at least as frequent.
+            entry = next((ref for ref in references if ref[0][1] >= freq), references[-1])
+        pending.append((word, freq, _font_size(entry, freq, rs)))
+    if len(kept) < MIN_KEPT * len(normalized):
+        return None
+    return _place(cloud, kept, pending)
+
+
+def cached_wordcloud(frequencies, tolerance=DEFAULT_TOLERANCE, **options):
+    """Return a ``WordCloud(**options)`` laid out for ``frequencies``, reusing cached layouts.
+
+    The returned object behaves like one after ``generate_from_frequencies``
+    (``to_image``, ``to_array``, ``plt.imshow``).
+    """
+    from wordcloud import WordCloud
+
+    cloud = WordCloud(**options)
+    normalized = _normalized(frequencies, cloud.max_words)
+    canvas = _canvas_key(cloud)
+    key = _layout_key(canvas, normalized)
+    layout = _load(key)
+    if layout is None:
+        previous = _load(canvas + "-latest")
+        if previous is not None:
+            layout = reuse_layout(cloud, previous, normalized, tolerance)
+        if layout is None:
+            layout = cloud.generate_from_frequencies(dict(normalized)).layout_
+        _save(key, layout)
+        _save(canvas + "-latest", layout)
+        layout = _load(key)
+    cloud.words_ = dict(normalized)
+    cloud.layout_ = layout
+    return cloud
+
+
+def render_wordcloud(cloud, width=None, scale=None):
+    """Return the image array of ``cloud`` at ``width`` pixels (or ``scale`` times its canvas)."""
+    if scale is None:
+        scale = width / cloud.width if width is not None else cloud.scale
+    previous = cloud.scale
+    cloud.scale = scale
+    try:
+        return cloud.to_array()
+    finally:
+        cloud.scale = previous
@@ -0,0 +1,162 @@
+"""Columnar conversion of SPARQL JSON results into typed DataFrames.
+
+Instead of building one dict per row and handing the list to
+``pd.DataFrame``, values are collected straight into per-variable columns
+and typed from their RDF term type and datatype:
+
+- ``xsd:integer`` and friends become ``int64`` (``Int64`` if values are missing)
+- ``xsd:decimal``, ``xsd:double`` and ``xsd:float`` become ``float64``
+- ``xsd:boolean`` becomes ``bool``, ``xsd:dateTime``/``xsd:date`` become datetimes; a column
+  with values pandas cannot represent (BCE or far-future dates) keeps its
+  strings and a warning is issued
+- IRIs and language-tagged literals (labels) become ``category``
+
+:func:`read_results` parses a response body incrementally with ``ijson``
+when it is installed, so the nested result document is never materialized;
+without ``ijson`` it falls back to :func:`json.load`.
+"""
+import json
+import warnings
+
+import pandas as pd
+
+from lodnb.trace import traced
+
+try:
+    import ijson
+except ImportError:  # optional dependency
+    ijson = None
+
+XSD = "http://www.w3.org/2001/XMLSchema#"
+INTEGER_TYPES = {
+    XSD + name for name in (
+        "integer", "int", "long", "short", "byte",
+        "nonNegativeInteger", "positiveInteger", "negativeInteger", "nonPositiveInteger",
+        "unsignedLong", "unsignedInt", "unsignedShort", "unsignedByte",
+    )
+}
+FLOAT_TYPES = {XSD + "decimal", XSD + "double", XSD + "float"}
+BOOLEAN_TYPES = {XSD + "boolean"}
+DATETIME_TYPES = {XSD + "dateTime", XSD + "date", XSD + "dateTimeStamp"}
+
+
+def _term_kind(cell):
+    """Reduce a SPARQL JSON term to the kind that decides the column dtype."""
+    term_type = cell.get("type")
+    if term_type == "uri":
+        return "uri"
+    if term_type == "bnode":
+        return "bnode"
+    datatype = cell.get("datatype")
+    if datatype in INTEGER_TYPES:
+        return "int"
+    if datatype in FLOAT_TYPES:
+        return "float"
+    if datatype in BOOLEAN_TYPES:
+        return "bool"
+    if datatype in DATETIME_TYPES:
+        return "datetime"
+    if "xml:lang" in cell:
+        return "label"
+    return "string"
+
+
+def _typed_series(name, values, kinds):
+    """Build a Series for one variable from raw string values and the kinds seen."""
+    has_missing = any(value is None for value in values)
+    if not kinds:
+        return pd.Series(values, name=name, dtype=object)
+    if kinds == {"int"}:
+        # Parsed exactly rather than through float64, which rounds integers above 2**53.
+        numbers = [int(value) if value is not None else None for value in values]
+        try:
+            return pd.Series(numbers, name=name, dtype="Int64" if has_missing else "int64")
+        except (OverflowError, TypeError, ValueError):
+            warnings.warn(
+                f"{name}: some integers are outside the int64 range; the column is kept as Python ints",
+                stacklevel=2,
+            )
+            return pd.Series(numbers, name=name, dtype=object)
+    if kinds <= {"int", "float"}:
+        return pd.to_numeric(pd.Series(values, name=name, dtype=object)).astype("float64")
+    if kinds == {"bool"} and not has_missing:
+        return pd.Series([value == "true" or value == "1" for value in values], name=name, dtype=bool)
+    if kinds == {"datetime"}:
+        raw = pd.Series(values, name=name, dtype=object)
+        converted = pd.to_datetime(raw, utc=True, errors="coerce", format="ISO8601")
+        lost = converted.isna() & raw.notna()
+        if not lost.any():
+            return converted
+        warnings.warn(
+            f"{name}: {lost.sum()} of {raw.notna().sum()} dates (e.g. {raw[lost].iloc[0]!r}) are outside "
+            "the datetime range; the column is kept as strings",
+            stacklevel=2,
+        )
+        return raw
+    if kinds <= {"uri", "label"} or (kinds <= {"string", "label"} and name.endswith("Label")):
+        return pd.Series(values, name=name, dtype="category")
+    return pd.Series(values, name=name, dtype=object)
+
+
+def bindings_to_frame(bindings, columns):
+    """Convert a list of SPARQL JSON bindings into a typed DataFrame.
+
+    ``columns`` lists the variables to extract, in output order.
+    """
+    data = {}
+    for name in columns:
+        cells = [binding.get(name) for binding in bindings]
+        values = [cell["value"] if cell is not None else None for cell in cells]
+        kinds = {_term_kind(cell) for cell in cells if cell is not None}
+        data[name] = _typed_series(name, values, kinds)
+    return pd.DataFrame(data, columns=list(columns))
+
+
+def results_to_frame(results, columns=None):
+    """Convert a decoded SPARQL JSON results document into a typed DataFrame."""
+    if columns is None:
+        columns = results.get("head", {}).get("vars", [])
+    return bindings_to_frame(results["results"]["bindings"], columns)
+
+
+@traced("frame", rows=True)
+def read_results(source, columns=None):
+    """Stream a SPARQL JSON results document from a binary file object into a DataFrame.
+
+    Only the variables in ``columns`` (all of ``head.vars`` by default) are kept.
+    """
+    if ijson is None:
+        return results_to_frame(json.load(source), columns)
+
+    wanted = set(columns) if columns is not None else None
+    head_vars = []
+    values = {}
+    kinds = {}
+    row = -1
+    var = None
+    cell = {}
+    for prefix, event, value in ijson.parse(source):
+        if prefix == "head.vars.item":
+            head_vars.append(value)
+        elif prefix == "results.bindings.item" and event == "start_map":
+            row += 1
+        elif prefix == "results.bindings.item" and event == "map_key":
+            var = value if wanted is None or value in wanted else None
+            cell = {}
+        elif var is not None and prefix.startswith("results.bindings.item.") and event == "string":
+            cell[prefix.rsplit(".", 1)[1]] = value
+        elif var is not None and prefix == f"results.bindings.item.{var}" and event == "end_map":
+            column = values.setdefault(var, [])
+            column.extend([None] * (row - len(column)))
+            column.append(cell.get("value"))
+            kinds.setdefault(var, set()).add(_term_kind(cell))
+            var = None
+
+    if columns is None:
+        columns = head_vars
+    data = {}
+    for name in columns:
+        column = values.get(name, [])
+        column.extend([None] * (row + 1 - len(column)))
+        data[name] = _typed_series(name, column, kinds.get(name, set()))
+    return pd.DataFrame(data, columns=list(columns))
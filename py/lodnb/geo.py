@@ -0,0 +1,84 @@
+"""Vectorized parsing of WKT point literals into GeoDataFrames.
+
+Wikidata returns coordinates as ``Point(lon lat)``, the NFDI4Objects graph
+as ``POINT(lon lat)``, and GeoSPARQL literals may carry a leading CRS IRI
+such as ``<http://www.opengis.net/def/crs/EPSG/0/4326> POINT(...)``. The
+whole column is parsed with one regular expression and the geometries are
+created in a single ``points_from_xy`` call instead of a Python loop.
+"""
+import pandas as pd
+
+from lodnb.trace import traced
+
+WGS84 = "EPSG:4326"
+WEB_MERCATOR = "EPSG:3857"
+
+_POINT_PATTERN = (
+    r"^\s*(?:<(?P<crs>[^>]*)>\s*)?"
+    r"(?i:POINT)\s*\(\s*(?P<x>[-+]?[0-9.]+(?:[eE][-+]?[0-9]+)?)"
+    r"\s+(?P<y>[-+]?[0-9.]+(?:[eE][-+]?[0-9]+)?)\s*\)\s*$"
+)
+_OGC_CRS = "http://www.opengis.net/def/crs/"
+# Wikidata prefixes coordinates on other globes with the globe's entity IRI.
+_EARTH = "http://www.wikidata.org/entity/Q2"
+
+
+def _crs_from_iri(iri):
+    """Map an OGC CRS IRI to a CRS string understood by pyproj."""
+    if iri.endswith("/OGC/1.3/CRS84"):
+        return WGS84
+    if "/EPSG/" in iri:
+        return "EPSG:" + iri.rstrip("/").rsplit("/", 1)[1]
+    raise ValueError(f"Unsupported CRS IRI: {iri}")
+
+
+def parse_points(values):
+    """Parse a column of WKT point literals.
+
+    Returns a DataFrame with float ``longitude``/``latitude`` columns (x/y in
+    the literal's CRS) aligned with ``values``, plus the detected CRS.
+    Unparseable, missing and off-Earth values become NaN.
+    """
+    values = pd.Series(values, dtype=object)
+    parts = values.where(values.notna(), "").astype(str).str.extract(_POINT_PATTERN)
+    coords = pd.DataFrame({
+        "longitude": pd.to_numeric(parts["x"], errors="coerce"),
+        "latitude": pd.to_numeric(parts["y"], errors="coerce"),
+    }, index=values.index)
+
+    iris = parts["crs"].fillna("").astype(str)
+    ogc = iris.str.startswith(_OGC_CRS)
+    off_earth = (iris != "") & ~ogc & (iris != _EARTH)
+    coords.loc[off_earth, ["longitude", "latitude"]] = float("nan")
+
+    crs_names = {_crs_from_iri(iri) for iri in iris[ogc].unique()}
+    if len(crs_names) > 1:
+        raise ValueError(f"Mixed CRS in one geometry column: {sorted(crs_names)}")
+    crs = crs_names.pop() if crs_names else WGS84
+    return coords, crs
+
+
+@traced("geometry", rows=True)
+def points_frame(df, column="geo", dropna=True):
+    """Return ``df`` as a GeoDataFrame with point geometries parsed from ``column``.
+
+    ``longitude`` and ``latitude`` columns are added; rows without a valid
+    point are dropped unless ``dropna`` is false.
+    """
+    import geopandas as gpd
+
+    coords, crs = parse_points(df[column])
+    df = df.assign(latitude=coords["latitude"], longitude=coords["longitude"])
+    if dropna:
+        df = df.dropna(subset=["latitude", "longitude"])
+    return gpd.GeoDataFrame(
+        df,
+        geometry=gpd.points_from_xy(df["longitude"], df["latitude"]),
+        crs=crs,
+    )
+
+
+@traced("reproject", rows=True)
+def reproject(gdf, crs=WEB_MERCATOR):
+    """Return ``gdf`` reprojected to ``crs`` (Web Mercator for the OSM basemaps by default)."""
+    return gdf.to_crs(crs)
@@ -0,0 +1,193 @@
+"""Incremental refresh of query results against stored snapshots.
+
+The last result of every query is kept as an Arrow snapshot in the
+:class:`lodnb.snapshots.SnapshotStore` that ``queryFrame`` also uses (under
+its own ``"incremental"`` keys), with the refresh state in its metadata
+(so this needs ``pyarrow``). A refresh first sends a cheap fingerprint
+query: the row count of the query without its label service, and the
+latest ``schema:dateModified`` of the key entities (the first projected
+variable, e.g. ``?item`` or ``?pokemon``). If the fingerprint is
+unchanged the snapshot is used as it is.
+
+Otherwise only the rows of entities modified since the snapshot are
+fetched and merged: the snapshot rows of those entities are replaced by
+the new rows. If the merged row count does not match the fingerprint
+(entities that stopped matching, endpoints without ``schema:dateModified``)
+the full result is fetched instead. Changes to other entities, such as a
+renamed county, only show up once a key entity or the row count changes.
+
+The fingerprint is only sent when the snapshot was last checked longer
+ago than the response cache TTL (``LODNB_CACHE_TTL``); in offline mode it
+is never sent and the snapshot, or the cached response, is used as it is.
+
+Queries that cannot be rewritten (aggregates, ``SELECT *``) are fetched in
+full and compared by content, so unchanged results are still reported as
+unchanged.
+
+Set ``LODNB_INCREMENTAL=1`` to let ``queryFrame`` answer from snapshots;
+``python -m lodnb.runner --incremental --render`` re-renders only the
+scripts whose results changed.
+"""
+import hashlib
+import io
+import json
+import os
+import re
+import time
+
+from lodnb.cache import get_cache, is_offline
+from lodnb.planner import SelectQuery, parse_select
+from lodnb.sparql import SPARQL_JSON, get_client
+
+DATE_MODIFIED = "<http://schema.org/dateModified>"
+XSD_DATETIME = "<http://www.w3.org/2001/XMLSchema#dateTime>"
+_MODIFIED = "lodnbModified"
+_ORDER_KEY = re.compile(r"(ASC|DESC)?\s*\(?\s*\?(\w+)\s*\)?", re.IGNORECASE)
+
+
+def enabled():
+    return os.environ.get("LODNB_INCREMENTAL", "") not in ("", "0")
+
+
+def _is_label_service(element):
+    return element[0] == "other" and re.match(r"SERVICE\s+wikibase:label\b", element[1], re.IGNORECASE)
+
+
+def fingerprint_query(parsed, key):
+    """Return the COUNT/MAX(dateModified) query for a parsed SELECT."""
+    elements = [element for element in parsed.elements if not _is_label_service(element)]
+    bound = {name for _, text in elements for name in re.findall(r"\?(\w+)", text)}
+    inner = SelectQuery("", parsed.distinct, [name for name in parsed.variables if name in bound],
+                        elements, parsed.modifiers)
+    return (
+        f"{parsed.prologue}SELECT (COUNT(*) AS ?rows) (MAX(?{_MODIFIED}) AS ?latest) WHERE {{\n"
+        f"  {{ {inner.text()} }}\n"
+        f"  OPTIONAL {{ ?{key} {DATE_MODIFIED} ?{_MODIFIED} }}\n}}"
+    )
+
+
+def delta_query(parsed, key, since):
+    """Return ``parsed`` restricted to key entities modified after ``since``."""
+    elements = [("triples", f"?{key} {DATE_MODIFIED} ?{_MODIFIED}")] + parsed.elements
+    elements.insert(1, ("other", f'FILTER(?{_MODIFIED} > "{since}"^^{XSD_DATETIME})'))
+    return SelectQuery(parsed.prologue, parsed.distinct, parsed.variables, elements, parsed.modifiers).text()
+
+
+def _live(client, query):
+    """Send ``query`` bypassing the response cache."""
+    if hasattr(client, "request"):
+        return client.request(query, SPARQL_JSON).content
+    return client.fetch(query, SPARQL_JSON)
+
+
+class Snapshot:
+    """The stored result of one query in the shared snapshot store, with its refresh state."""
+
+    def __init__(self, endpoint, query):
+        # Imported here: the snapshot store loads pyarrow, which the runner need not pay for.
+        from lodnb.snapshots import get_store, snapshot_key
+
+        self.endpoint = endpoint
+        self.query = query
+        self.key = snapshot_key(query, endpoint, "incremental")
+        self.store = get_store()
+
+    def load(self):
+        """Return ``(frame, meta)``, or ``(None, None)`` without a snapshot."""
+        meta = self.store.metadata(self.key)
+        if meta is None:
+            return None, None
+        return self.store.read_frame(self.key), meta
+
+    def save(self, frame, meta):
+        self.store.write(self.key, frame, query=self.query, endpoint=self.endpoint, **meta)
+
+    def checked(self):
+        """Return when the snapshot was last written or confirmed unchanged."""
+        return self.store.modified(self.key)
+
+    def touch(self):
+        """Record that the endpoint still returns the stored result."""
+        self.store.touch(self.key)
+
+
+def _fresh(snapshot):
+    """Whether the snapshot was checked within the response cache TTL."""
+    cache = get_cache()
+    if cache is None:
+        return False
+    return cache.ttl < 0 or time.time() - snapshot.checked() <= cache.ttl
+
+
+def _fingerprint(client, parsed, key):
+    bindings = json.loads(_live(client, fingerprint_query(parsed, key)))["results"]["bindings"]
+    row = bindings[0] if bindings else {}
+    rows = int(row["rows"]["value"]) if "rows" in row else 0
+    latest = row["latest"]["value"] if "latest" in row else None
+    return {"rows": rows, "latest": latest}
+
+
+def _merge(snapshot, delta, key, parsed):
+    """Replace the snapshot rows of the entities in ``delta`` by the delta rows."""
+    import pandas as pd
+
+    merged = pd.concat([snapshot[~snapshot[key].isin(delta[key])], delta], ignore_index=True)
+    for name in merged.columns:
+        if str(snapshot[name].dtype) == "category" and str(merged[name].dtype) != "category":
+            merged[name] = merged[name].astype("category")
+    order = re.search(r"\bORDER\s+BY\s+(.*?)(?:\bLIMIT\b|\bOFFSET\b|$)", parsed.modifiers, re.IGNORECASE)
+    if order:
+        keys = [(name, direction.upper() != "DESC") for direction, name in _ORDER_KEY.findall(order.group(1))]
+        keys = [(name, ascending) for name, ascending in keys if name in merged.columns]
+        if keys:
+            merged = merged.sort_values([name for name, _ in keys], ascending=[asc for _, asc in keys],
+                                        kind="stable", ignore_index=True)
+    return merged
+
+
+def refresh(query, endpoint, key=None):
+    """Return ``(frame, changed)`` for ``query``, updating its snapshot.
+
+    A snapshot checked within the cache TTL is returned unchanged without
+    contacting the endpoint. In offline mode the snapshot, or else the
+    cached response, is returned; nothing is sent.
+    """
+    from lodnb.frames import read_results
+
+    snapshot = Snapshot(endpoint, query)
+    frame, meta = snapshot.load()
+    if frame is not None and (is_offline() or _fresh(snapshot)):
+        return frame, False
+    client = get_client(endpoint)
+    if is_offline():
+        # Raises OfflineCacheMiss without a cached response.
+        return read_results(io.BytesIO(client.fetch(query, SPARQL_JSON))), True
+    parsed = parse_select(query)
+
+    if parsed is None:
+        body = _live(client, query)
+        digest = hashlib.sha256(body).hexdigest()
+        if frame is not None and meta.get("digest") == digest:
+            snapshot.touch()
+            return frame, False
+        frame = read_results(io.BytesIO(body))
+        snapshot.save(frame, {"digest": digest})
+        return frame, True
+
+    key = key or parsed.variables[0]
+    current = _fingerprint(client, parsed, key)
+    if frame is not None and meta.get("fingerprint") == current:
+        snapshot.touch()
+        return frame, False
+
+    if frame is not None and current["latest"] and meta.get("fingerprint", {}).get("latest"):
+        since = meta["fingerprint"]["latest"]
+        delta = read_results(io.BytesIO(_live(client, delta_query(parsed, key, since))), list(frame.columns))
+        merged = _merge(frame, delta, key, parsed)
+        if len(merged) == current["rows"]:
+            snapshot.save(merged, {"fingerprint": current})
+            return merged, True
+
+    frame = read_results(io.BytesIO(_live(client, query)))
+    snapshot.save(frame, {"fingerprint": current})
+    return frame, True
@@ -0,0 +1,122 @@
+"""Cached, pre-projected boundary layers for the map scripts.
+
+Reading gs_ireland_island.geojson and reprojecting it to Web Mercator on
+every run costs time proportional to the boundary's complexity. A layer is
+read and reprojected once, optionally simplified for a zoom level, and
+stored below the shared cache directory as GeoParquet (with ``pyarrow``)
+or otherwise as a pickle of WKB geometries. The cache entry is keyed by the
+source file's path, size and modification time, the target CRS and the
+simplification tolerance, so edits to the source invalidate it.
+
+:func:`boundary_layer` returns a :class:`Layer` that only loads when a map
+actually draws or accesses it::
+
+    ireland = boundary_layer(geojson_file, zoom=8)
+    ireland.plot(ax=ax, color="white", edgecolor="black")
+"""
+import hashlib
+import math
+import os
+
+import pandas as pd
+
+from lodnb.cache import cache_dir
+from lodnb.trace import span
+
+WEB_MERCATOR = "EPSG:3857"
+EARTH_CIRCUMFERENCE = 2 * math.pi * 6378137.0
+
+try:
+    import pyarrow  # noqa: F401
+except ImportError:  # optional dependency
+    pyarrow = None
+
+_layers = {}
+
+
+def zoom_tolerance(zoom):
+    """Return a simplification tolerance (Web Mercator metres) of half a pixel at ``zoom``."""
+    return EARTH_CIRCUMFERENCE / (256 * 2 ** zoom) / 2
+
+
+def _cache_path(path, crs, tolerance):
+    stat = os.stat(path)
+    identity = "\n".join((os.path.abspath(path), str(stat.st_size), str(stat.st_mtime_ns), str(crs), repr(tolerance)))
+    name = hashlib.sha256(identity.encode("utf-8")).hexdigest()
+    return os.path.join(cache_dir("layers"), name + (".parquet" if pyarrow is not None else ".pkl"))
+
+
+def _write(frame, cache_path):
+    if pyarrow is not None:
+        frame.to_parquet(cache_path)
+        return
+    table = pd.DataFrame(frame.drop(columns=frame.geometry.name))
+    table["__wkb"] = frame.geometry.to_wkb()
+    table.attrs["crs"] = frame.crs.to_string() if frame.crs is not None else None
+    table.to_pickle(cache_path)
+
+
+def _read(cache_path):
+    import geopandas as gpd
+
+    if pyarrow is not None:
+        return gpd.read_parquet(cache_path)
+    table = pd.read_pickle(cache_path)
+    geometry = gpd.GeoSeries.from_wkb(table.pop("__wkb"), crs=table.attrs.get("crs"))
+    return gpd.GeoDataFrame(table, geometry=geometry)
+
+
+def load_layer(path, crs=WEB_MERCATOR, zoom=None, tolerance=None):
+    """Return the layer at ``path`` reprojected to ``crs``, from the cache when possible.
+
+    ``zoom`` simplifies the geometries to half a pixel at that zoom level
+    (``crs`` must then be Web Mercator); ``tolerance`` sets it explicitly in
+    units of ``crs``.
+    """
+    if tolerance is None and zoom is not None:
+        tolerance = zoom_tolerance(zoom)
+    cache_path = _cache_path(path, crs, tolerance)
+    frame = _layers.get(cache_path)
+    if frame is not None:
+        return frame
+    with span("layer", path=os.path.basename(path)) as stage:
+        if os.path.exists(cache_path):
+            frame = _read(cache_path)
+            stage.add(hits=1)
+        else:
+            import geopandas as gpd
+
+            frame = gpd.read_file(path).to_crs(crs)
+            if tolerance:
+                frame = frame.set_geometry(frame.geometry.simplify(tolerance, preserve_topology=True))
+            _write(frame, cache_path)
+            stage.add(misses=1)
+        stage.set(rows=len(frame))
+    _layers[cache_path] = frame
+    return frame
+
+
+class Layer:
+    """A boundary layer that is loaded on first use."""
+
+    def __init__(self, path, crs=WEB_MERCATOR, zoom=None, tolerance=None):
+        self.path = path
+        self.crs = crs
+        self.zoom = zoom
+        self.tolerance = tolerance
+
+    @property
+    def frame(self):
+        return load_layer(self.path, self.crs, self.zoom, self.tolerance)
+
+    def at_zoom(self, zoom):
+        """Return the same layer simplified for ``zoom``."""
+        return Layer(self.path, self.crs, zoom)
+
+    def plot(self, *args, **kwargs):
+        return self.frame.plot(*args, **kwargs)
+
+
+def boundary_layer(path, crs=WEB_MERCATOR, zoom=None, tolerance=None):
+    """Return a lazily loaded :class:`Layer` for a boundary file."""
+    return Layer(path, crs, zoom, tolerance)
@@ -0,0 +1,196 @@
+"""Embedded SPARQL endpoints backed by local RDF dumps.
+
+A :class:`LocalEndpoint` loads one or more dumps (Turtle, N-Triples,
+RDF/XML, ..., optionally gzipped) once into an indexed in-memory rdflib
+store and answers the same query strings the scripts send to the live
+services. It has the interface of :class:`lodnb.sparql.SparqlClient`, so
+``queryFrame``, ``queryPages`` and the runner work unchanged and without
+any network access, which makes runs deterministic.
+
+Wikidata Query Service conveniences are emulated:
+
+- the WDQS prefixes (``wd:``, ``wdt:``, ``wikibase:``, ``bd:``, ...) are predefined
+- ``SERVICE wikibase:label`` is rewritten into ``OPTIONAL`` ``rdfs:label`` /
+  ``schema:description`` lookups for every ``?xLabel`` / ``?xDescription``
+  variable, in the requested language order, falling back to the entity id
+
+Endpoints are mapped to dumps with ``LODNB_LOCAL``, a whitespace-separated
+list of ``endpoint=path`` entries (repeat an endpoint for several dumps)::
+
+    LODNB_LOCAL="https://query.wikidata.org/sparql=dumps/ogham.nt.gz" python py/wikidata-ogham-sites.py
+
+For endpoints that serve a static document (the Solid Pod), SELECT queries
+requested as Turtle return the whole local graph, as the pod does.
+"""
+import gzip
+import json
+import os
+import re
+import threading
+
+from lodnb.sparql import SPARQL_JSON, TURTLE
+
+WDQS_PREFIXES = {
+    "wd": "http://www.wikidata.org/entity/",
+    "wds": "http://www.wikidata.org/entity/statement/",
+    "wdv": "http://www.wikidata.org/value/",
+    "wdt": "http://www.wikidata.org/prop/direct/",
+    "wdtn": "http://www.wikidata.org/prop/direct-normalized/",
+    "wikibase": "http://wikiba.se/ontology#",
+    "p": "http://www.wikidata.org/prop/",
+    "ps": "http://www.wikidata.org/prop/statement/",
+    "psv": "http://www.wikidata.org/prop/statement/value/",
+    "pq": "http://www.wikidata.org/prop/qualifier/",
+    "pqv": "http://www.wikidata.org/prop/qualifier/value/",
+    "pr": "http://www.wikidata.org/prop/reference/",
+    "prov": "http://www.w3.org/ns/prov#",
+    "bd": "http://www.bigdata.com/rdf#",
+    "rdf": "http://www.w3.org/1999/02/22-rdf-syntax-ns#",
+    "rdfs": "http://www.w3.org/2000/01/rdf-schema#",
+    "xsd": "http://www.w3.org/2001/XMLSchema#",
+    "owl": "http://www.w3.org/2002/07/owl#",
+    "skos": "http://www.w3.org/2004/02/skos/core#",
+    "schema": "http://schema.org/",
+    "geo": "http://www.opengis.net/ont/geosparql#",
+}
+DEFAULT_LANGUAGE = "en"
+
+_LABEL_SERVICE = re.compile(r"SERVICE\s+wikibase:label\s*\{", re.IGNORECASE)
+_LANGUAGE = re.compile(r'wikibase:language\s+"([^"]*)"')
+_SERVICE_PARAM = re.compile(r"bd:serviceParam\s+wikibase:language\s+\"[^\"]*\"\s*\.?")
+_LABEL_VARIABLE = re.compile(r"\?(\w+?)(Label|Description)\b")
+_LABEL_PREDICATES = {"Label": "rdfs:label", "Description": "schema:description"}
+_BRACE_SCAN = re.compile(r'[{}"\'<#]')
+_IRI_REST = re.compile(r"[^<>\"{}|^`\\\s]*>")
+
+
+def _closing_brace(text, start):
+    """Return the index of the ``}`` closing the block that opens before ``start``."""
+    depth = 1
+    pos = start
+    while depth:
+        match = _BRACE_SCAN.search(text, pos)
+        if match is None:
+            raise ValueError("Unbalanced braces in SPARQL query")
+        char = match.group()
+        if char == "{":
+            depth += 1
+            pos = match.end()
+        elif char == "}":
+            depth -= 1
+            pos = match.end()
+        elif char == "#":
+            newline = text.find("\n", match.end())
+            pos = len(text) if newline < 0 else newline
+        elif char == "<":
+            closing = _IRI_REST.match(text, match.end())
+            pos = closing.end() if closing else match.end()
+        else:
+            closing = text.find(char, match.end())
+            pos = len(text) if closing < 0 else closing + 1
+    return pos - 1
+
+
+def emulate_label_service(query):
+    """Rewrite ``SERVICE wikibase:label`` blocks into plain label lookups."""
+    match = _LABEL_SERVICE.search(query)
+    while match is not None:
+        end = _closing_brace(query, match.end())
+        body = query[match.end():end]
+        setting = _LANGUAGE.search(body)
+        languages = []
+        for language in (setting.group(1) if setting else DEFAULT_LANGUAGE).split(","):
+            language = language.strip()
+            if language == "[AUTO_LANGUAGE]":
+                language = DEFAULT_LANGUAGE
+            if language and language not in languages:
+                languages.append(language)
+
+        # Triples given explicitly inside the service are looked up as they are.
+        manual = _SERVICE_PARAM.sub(" ", body).strip()
+        lookups = [f"OPTIONAL {{ {manual} }}"] if manual else []
+        outside = query[:match.start()] + query[end + 1:]
+        seen = set()
+        for var, suffix in _LABEL_VARIABLE.findall(outside):
+            target = var + suffix
+            if target in seen or f"?{target}" in manual or not re.search(rf"\?{var}\b", outside):
+                continue
+            seen.add(target)
+            candidates = []
+            for index, language in enumerate(languages):
+                candidate = f"?{target}__{index}"
+                candidates.append(candidate)
+                lookups.append(
+                    f"OPTIONAL {{ ?{var} {_LABEL_PREDICATES[suffix]} {candidate} . "
+                    f'FILTER(LANG({candidate}) = "{language}") }}'
+                )
+            if suffix == "Label":
+                # WDQS labels items without a label in any language with their id.
+                candidates.append(f'REPLACE(STR(?{var}), "^.*[/#]", "")')
+            lookups.append(f"BIND(COALESCE({', '.join(candidates)}) AS ?{target})")
+
+        replacement = "\n".join(lookups)
+        query = query[:match.start()] + replacement + query[end + 1:]
+        match = _LABEL_SERVICE.search(query, match.start() + len(replacement))
+    return query
+
+
+def _query_form(query):
+    """Return SELECT, ASK, CONSTRUCT or DESCRIBE for ``query``."""
+    stripped = re.sub(r"(?im)^\s*(?:#.*|(?:PREFIX|BASE)\s+\S*\s*<[^>]*>)\s*$", "", query)
+    match = re.search(r"\b(SELECT|ASK|CONSTRUCT|DESCRIBE)\b", stripped, re.IGNORECASE)
+    return match.group(1).upper() if match else "SELECT"
+
+
+class LocalEndpoint:
+    """An rdflib graph loaded from local dumps, standing in for a remote SPARQL endpoint."""
+
+    def __init__(self, endpoint, paths):
+        from rdflib import Graph
+
+        self.endpoint = endpoint
+        self.paths = list(paths)
+        self.graph = Graph()
+        for path in self.paths:
+            self.load(path)
+        self._lock = threading.Lock()
+
+    def load(self, path):
+        """Add the triples of a dump file to the graph."""
+        from rdflib.util import guess_format
+
+        name = path[:-3] if path.endswith(".gz") else path
+        opener = gzip.open if path.endswith(".gz") else open
+        with opener(path, "rb") as handle:
+            self.graph.parse(handle, format=guess_format(name) or "turtle")
+
+    def fetch(self, query, accept=SPARQL_JSON):
+        """Answer ``query`` and return the response body as the live endpoint would."""
+        form = _query_form(query)
+        with self._lock:
+            if accept != SPARQL_JSON and form == "SELECT":
+                return self.graph.serialize(format="turtle", encoding="utf-8")
+            result = self.graph.query(emulate_label_service(query), initNs=WDQS_PREFIXES)
+            if form in ("CONSTRUCT", "DESCRIBE"):
+                return result.serialize(format="turtle", encoding="utf-8")
+            return result.serialize(format="json", encoding="utf-8")
+
+    def select(self, query):
+        return json.loads(self.fetch(query, SPARQL_JSON))
+
+    def turtle(self, query):
+        return self.fetch(query, TURTLE).decode("utf-8")
+
+    def close(self):
+        self.graph.close()
+
+
+def local_dumps():
+    """Return the ``{endpoint: [dump paths]}`` mapping configured in ``LODNB_LOCAL``."""
+    mapping = {}
+    for entry in os.environ.get("LODNB_LOCAL", "").split():
+        endpoint, sep, path = entry.rpartition("=")
+        if not sep or not endpoint:
+            raise ValueError(f"LODNB_LOCAL entries must be endpoint=path, got {entry!r}")
+        mapping.setdefault(endpoint, []).append(os.path.expanduser(path))
+    return mapping
@@ -0,0 +1,217 @@
+"""Point map rendering helpers.
+
+:func:`plot_categories` draws points coloured by a categorical column
+(e.g. county) as a single scatter collection. The column is factorized
+once and each point's colour is looked up from its category code, instead
+of filtering the frame and calling ``.plot()`` once per category, which
+scans all rows per category and creates one artist each.
+
+Above :data:`RASTER_THRESHOLD` points (``LODNB_RASTER_THRESHOLD``), a
+marker per point stalls matplotlib and bloats SVG output. The plotting
+functions then switch to raster mode: points are binned into an image of
+the axes' size in screen pixels with ``np.bincount`` (counts, or the sum
+or mean of a value column; the most frequent category for
+:func:`plot_categories`) and drawn as one ``imshow`` layer, so the cost of
+drawing and the output size depend on pixels, not points. The image is
+drawn at :data:`RASTER_ZORDER`, above basemaps and filled boundary layers
+like markers would be.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+
+RASTER_THRESHOLD = int(os.environ.get("LODNB_RASTER_THRESHOLD", "20000"))
+# Above images (basemaps, zorder 0) and polygon layers (zorder 1), next to markers.
+RASTER_ZORDER = 2
+
+
+def category_colors(categories, colors=None, cmap="tab20"):
+    """Map each category to a colour.
+
+    ``colors`` is a sequence of colours used in order (cycled when there are
+    more categories); otherwise ``cmap`` is resampled to one colour per
+    category.
+    """
+    import matplotlib.pyplot as plt
+
+    categories = list(categories)
+    if colors is None:
+        colormap = plt.get_cmap(cmap, max(len(categories), 1))
+        colors = [colormap(idx) for idx in range(len(categories))]
+    return {category: colors[idx % len(colors)] for idx, category in enumerate(categories)}
+
+
+def category_patches(mapping):
+    """Return legend handles for a ``{category: colour}`` mapping."""
+    from matplotlib.patches import Patch
+
+    return [Patch(color=color, label=category) for category, color in mapping.items()]
+
+
+def raster_extent(ax, x, y):
+    """Return ``(west, east, south, north)`` covering the points and whatever ``ax`` already shows."""
+    finite = np.isfinite(x) & np.isfinite(y)
+    west, east = np.min(x[finite], initial=np.inf), np.max(x[finite], initial=-np.inf)
+    south, north = np.min(y[finite], initial=np.inf), np.max(y[finite], initial=-np.inf)
+    if ax.has_data():
+        (x0, y0), (x1, y1) = ax.dataLim.get_points()
+        west, east, south, north = min(west, x0), max(east, x1), min(south, y0), max(north, y1)
+    if not np.isfinite([west, east, south, north]).all():
+        return 0.0, 1.0, 0.0, 1.0
+    pad_x = (east - west) * 0.01 or 1.0
+    pad_y = (north - south) * 0.01 or 1.0
+    return west - pad_x, east + pad_x, south - pad_y, north + pad_y
+
+
+def raster_shape(ax, extent):
+    """Return the ``(rows, columns)`` of a raster with square pixels that fits ``ax`` on screen."""
+    box = ax.get_window_extent()
+    west, east, south, north = extent
+    aspect = (north - south) / (east - west)
+    width = max(int(box.width), 1)
+    height = max(int(round(width * aspect)), 1)
+    if height > box.height >= 1:
+        height = max(int(box.height), 1)
+        width = max(int(round(height / aspect)), 1)
+    return height, width
+
+
+def _pixel_index(x, y, extent, shape):
+    """Return the flat pixel index of each point inside ``extent`` and the mask of those points."""
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    west, east, south, north = extent
+    height, width = shape
+    inside = np.isfinite(x) & np.isfinite(y) & (x >= west) & (x <= east) & (y >= south) & (y <= north)
+    col = np.minimum(((x[inside] - west) / (east - west) * width).astype(np.int64), width - 1)
+    row = np.minimum(((y[inside] - south) / (north - south) * height).astype(np.int64), height - 1)
+    return row * width + col, inside
+
+
+def bin_points(x, y, extent, shape, values=None, statistic="count"):
+    """Bin points into a ``shape`` raster over ``extent``, row 0 at the south edge.
+
+    ``statistic`` is ``"count"``, or ``"sum"``/``"mean"`` of ``values``
+    (missing values are ignored). Empty pixels are 0 for counts and sums
+    and NaN for means.
+    """
+    index, inside = _pixel_index(x, y, extent, shape)
+    size = shape[0] * shape[1]
+    if statistic == "count":
+        return np.bincount(index, minlength=size).reshape(shape)
+    if statistic not in ("sum", "mean"):
+        raise ValueError(f"Unknown raster statistic: {statistic!r}")
+    values = np.asarray(values, dtype=float)[inside]
+    valid = ~np.isnan(values)
+    sums = np.bincount(index[valid], weights=values[valid], minlength=size).reshape(shape)
+    if statistic == "sum":
+        return sums
+    counts = np.bincount(index[valid], minlength=size).reshape(shape)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(counts > 0, sums / counts, np.nan)
+
+
+def bin_categories(x, y, codes, extent, shape):
+    """Return the most frequent category code per pixel (-1 for empty pixels)."""
+    index, inside = _pixel_index(x, y, extent, shape)
+    codes = np.asarray(codes)[inside]
+    drawn = codes >= 0
+    n = int(codes.max()) + 1 if drawn.any() else 1
+    pairs, counts = np.unique(index[drawn] * n + codes[drawn], return_counts=True)
+    pixels, pair_codes = pairs // n, pairs % n
+    # Sorted by pixel, then count: the last entry of each pixel is its majority.
+    order = np.lexsort((counts, pixels))
+    pixels, pair_codes = pixels[order], pair_codes[order]
+    last = np.append(pixels[1:] != pixels[:-1], True)
+    dominant = np.full(shape[0] * shape[1], -1, dtype=np.int64)
+    dominant[pixels[last]] = pair_codes[last]
+    return dominant.reshape(shape)
+
+
+def use_raster(n, threshold=None):
+    """Return whether ``n`` points are drawn as a raster rather than as markers."""
+    return n > (RASTER_THRESHOLD if threshold is None else threshold)
+
+
+def _color_ramp(color, alpha=None):
+    """Return a colormap from a faint to the full ``color``."""
+    from matplotlib.colors import ListedColormap, to_rgba
+
+    rgba = np.tile(to_rgba(color), (256, 1))
+    rgba[:, 3] = np.linspace(0.3, 1.0, 256) * (1.0 if alpha is None else alpha)
+    return ListedColormap(rgba)
+
+
+def _draw_raster(ax, image, extent, **kwargs):
+    west, east, south, north = extent
+    kwargs.setdefault("zorder", RASTER_ZORDER)
+    return ax.imshow(image, extent=(west, east, south, north), origin="lower", interpolation="nearest", **kwargs)
+
+
+def plot_points(ax, gdf, column=None, statistic="mean", color=None, cmap=None, markersize=50, alpha=None,
+                label=None, threshold=None, shape=None, colorbar=False, **kwargs):
+    """Draw the point geometries of ``gdf`` as markers or, for many points, as one raster layer.
+
+    Without ``column`` the points are drawn in ``color`` (raster: shaded by
+    the count per pixel); with ``column`` they are coloured by its values
+    through ``cmap`` (raster: the ``statistic`` of the values per pixel).
+    ``kwargs`` only apply to markers. Returns the scatter collection or
+    the image, e.g. for a colour bar.
+    """
+    x = np.asarray(gdf.geometry.x)
+    y = np.asarray(gdf.geometry.y)
+    if not use_raster(len(x), threshold):
+        if column is None:
+            artist = ax.scatter(x, y, s=markersize, color=color, alpha=alpha, label=label, **kwargs)
+        else:
+            artist = ax.scatter(x, y, s=markersize, c=gdf[column], cmap=cmap, alpha=alpha, label=label, **kwargs)
+    else:
+        extent = raster_extent(ax, x, y)
+        shape = shape or raster_shape(ax, extent)
+        if column is None:
+            image = bin_points(x, y, extent, shape).astype(float)
+            image[image == 0] = np.nan
+            artist = _draw_raster(ax, image, extent, cmap=_color_ramp(color or "C0", alpha))
+            if label is not None:
+                # Images do not appear in legends; an empty scatter stands in.
+                ax.scatter([], [], color=color, alpha=alpha, label=label)
+        else:
+            image = bin_points(x, y, extent, shape, gdf[column].to_numpy(dtype=float), statistic)
+            if statistic != "mean":
+                image[image == 0] = np.nan
+            artist = _draw_raster(ax, image, extent, cmap=cmap, alpha=alpha)
+    if colorbar:
+        ax.figure.colorbar(artist, ax=ax)
+    return artist
+
+
+def plot_categories(ax, gdf, column, colors=None, cmap="tab20", markersize=50, threshold=None, shape=None,
+                    **kwargs):
+    """Scatter the point geometries of ``gdf`` coloured by ``column`` in one collection.
+
+    Categories are coloured in order of first appearance; rows with a
+    missing category are not drawn. Above the raster threshold each pixel
+    takes the colour of its most frequent category instead. Returns the
+    legend handles, one :class:`~matplotlib.patches.Patch` per category.
+    """
+    from matplotlib.colors import to_rgba_array
+
+    codes, uniques = pd.factorize(gdf[column])
+    mapping = category_colors(uniques, colors, cmap)
+    palette = to_rgba_array(list(mapping.values())) if mapping else np.empty((0, 4))
+
+    drawn = codes >= 0
+    points = gdf.geometry[drawn]
+    if use_raster(int(drawn.sum()), threshold):
+        x, y = np.asarray(points.x), np.asarray(points.y)
+        extent = raster_extent(ax, x, y)
+        dominant = bin_categories(x, y, codes[drawn], extent, shape or raster_shape(ax, extent))
+        image = np.zeros(dominant.shape + (4,))
+        filled = dominant >= 0
+        image[filled] = palette[dominant[filled]]
+        image[filled, 3] *= kwargs.get("alpha") if kwargs.get("alpha") is not None else 1.0
+        _draw_raster(ax, image, extent)
+    else:
+        ax.scatter(points.x, points.y, s=markersize, c=palette[codes[drawn]], **kwargs)
+    return category_patches(mapping)
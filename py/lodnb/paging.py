@@ -0,0 +1,120 @@
+"""LIMIT/OFFSET pagination for large SELECT result sets.
+
+A query is split into ordered pages that are fetched concurrently by a
+small thread pool and yielded strictly in order as DataFrames, so a
+consumer can append each page to a file or a list of frames while the
+next pages are still downloading. At most ``workers`` pages are in
+flight at any time, which bounds peak memory to a few pages.
+
+Every endpoint also has a process-wide limit on concurrent page requests
+(:data:`ENDPOINT_LIMITS`), shared by all paginated queries against it.
+"""
+import io
+import re
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from lodnb.cache import normalize_query
+from lodnb.sparql import WIKIDATA, get_client
+
+# WDQS allows five concurrent queries per client; be gentler with smaller services.
+ENDPOINT_LIMITS = {WIKIDATA: 5}
+DEFAULT_ENDPOINT_LIMIT = 3
+
+_TAIL = re.compile(r"(?:\s+(?:LIMIT|OFFSET)\s+\d+)+\s*$", re.IGNORECASE)
+_NUMBER = re.compile(r"(LIMIT|OFFSET)\s+(\d+)", re.IGNORECASE)
+_ALIAS = re.compile(r"\(.*?\bAS\s+(\?\w+)\s*\)", re.IGNORECASE)
+
+_slots = {}
+_slots_lock = threading.Lock()
+
+
+def endpoint_slots(endpoint):
+    """Return the semaphore that bounds concurrent requests to ``endpoint``."""
+    with _slots_lock:
+        slots = _slots.get(endpoint)
+        if slots is None:
+            limit = ENDPOINT_LIMITS.get(endpoint, DEFAULT_ENDPOINT_LIMIT)
+            slots = _slots[endpoint] = threading.BoundedSemaphore(limit)
+        return slots
+
+
+def projected_variables(query):
+    """Return the variables of the outermost SELECT clause, in order."""
+    match = re.search(r"\bSELECT\b(.*?)(?:\bWHERE\b|\{)", query, re.IGNORECASE | re.DOTALL)
+    if match is None:
+        raise ValueError("Only SELECT queries can be paginated")
+    projection = match.group(1)
+    aliases = _ALIAS.findall(projection)
+    plain = re.findall(r"\?\w+", _ALIAS.sub(" ", projection))
+    if not plain and not aliases:
+        raise ValueError("SELECT * queries need an explicit order_by to be paginated")
+    return plain + aliases
+
+
+def split_query(query, order_by=None):
+    """Split ``query`` into an ordered base query, start offset and row cap.
+
+    A trailing LIMIT becomes the total row cap and a trailing OFFSET the
+    start offset. Queries without ORDER BY are ordered by their projected
+    variables (or ``order_by``) so pages do not overlap.
+    """
+    query = normalize_query(query)
+    tail = _TAIL.search(query)
+    limit, offset = None, 0
+    if tail is not None:
+        for keyword, value in _NUMBER.findall(tail.group()):
+            if keyword.upper() == "LIMIT":
+                limit = int(value)
+            else:
+                offset = int(value)
+        query = query[:tail.start()]
+    outer = query[query.rfind("}") + 1:]
+    if not re.search(r"\bORDER\s+BY\b", outer, re.IGNORECASE):
+        keys = order_by or projected_variables(query)
+        query = f"{query} ORDER BY {' '.join(keys)}"
+    return query, offset, limit
+
+
+def iter_pages(query, endpoint=WIKIDATA, page_size=10000, workers=4, columns=None, order_by=None):
+    """Yield the results of ``query`` page by page as DataFrames, in order."""
+    from lodnb.frames import read_results
+
+    base, start, limit = split_query(query, order_by)
+    client = get_client(endpoint)
+    slots = endpoint_slots(endpoint)
+
+    def fetch_page(offset, size):
+        with slots:
+            body = client.fetch(f"{base} LIMIT {size} OFFSET {offset}")
+        return read_results(io.BytesIO(body), columns)
+
+    def page_bounds():
+        offset = start
+        while limit is None or offset < start + limit:
+            size = page_size if limit is None else min(page_size, start + limit - offset)
+            yield offset, size
+            offset += size
+
+    bounds = page_bounds()
+    pending = deque()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        try:
+            for offset, size in bounds:
+                pending.append((size, pool.submit(fetch_page, offset, size)))
+                if len(pending) >= workers:
+                    break
+            while pending:
+                size, future = pending.popleft()
+                page = future.result()
+                if len(page):
+                    yield page
+                if len(page) < size:
+                    break
+                next_bounds = next(bounds, None)
+                if next_bounds is not None:
+                    pending.append((next_bounds[1], pool.submit(fetch_page, *next_bounds)))
+        finally:
+            for _, future in pending:
+                future.cancel()
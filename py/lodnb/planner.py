@@ -0,0 +1,376 @@
+"""Consolidation of overlapping SELECT queries into one superset query.
+
+Several scripts send nearly the same query: the Pokémon mass query only
+adds ``?pokemon wdt:P2067 ?mass`` to the colour query, and the Ogham map
+query requires ``wdt:P625`` where the Ogham sites query has it OPTIONAL.
+The planner splits each WHERE clause into its top-level elements (triple
+blocks, OPTIONALs, FILTERs, SERVICEs, ...) and merges queries that share
+the same non-triple elements and solution modifiers. The merged query keeps
+the triple blocks common to all members required; the other triple blocks
+of each member become one OPTIONAL group, so one request answers all of
+them.
+
+Each member becomes a :class:`View` of the merged result: rows are kept
+where the member's own group matched (all of its new variables are bound),
+then projected to its variables and de-duplicated for DISTINCT queries. A
+member may only ignore an OPTIONAL block it does not have if it is
+DISTINCT, since the extra block can multiply rows. Queries are not merged
+when OPTIONAL blocks of different members share variables, since an
+earlier block would then constrain a later one.
+
+Consolidation is opt-in: with ``LODNB_CONSOLIDATE=1`` the runner (and
+``lodnb.render``/``lodnb.cli``, which discover the scripts the same way)
+plans the queries of all scripts, fetches the merged queries instead of the
+members and publishes the plan through ``LODNB_PLAN`` to the scripts it
+runs. ``queryFrame`` only answers from a merged query when such a plan was
+activated; it never scans the scripts itself, so a query sent from a
+notebook is sent as written.
+"""
+import hashlib
+import json
+import os
+import re
+import threading
+from dataclasses import asdict, dataclass, field
+
+from lodnb.cache import cache_dir, normalize_query
+
+PLAN_ENV = "LODNB_PLAN"
+
+_SELECT = re.compile(
+    r"^(?P<prologue>(?:(?:PREFIX\s+\S*\s*<[^>]*>|BASE\s+<[^>]*>)\s*)*)"
+    r"SELECT\s+(?P<distinct>DISTINCT\s+)?(?P<variables>(?:\?\w+\s*)+?)\s*(?:WHERE\s*)?\{",
+    re.IGNORECASE,
+)
+_VARIABLE = re.compile(r"\?(\w+)")
+_KEYWORD = re.compile(r"^(OPTIONAL|FILTER|SERVICE|BIND|MINUS|VALUES|GRAPH)\b", re.IGNORECASE)
+
+
+@dataclass
+class SelectQuery:
+    """A plain SELECT query split into prologue, projection, WHERE elements and modifiers."""
+
+    prologue: str
+    distinct: bool
+    variables: list
+    elements: list
+    modifiers: str
+
+    def text(self):
+        parts = []
+        for kind, text in self.elements:
+            if kind == "triples":
+                parts.append(text + " .")
+            elif kind == "optional":
+                parts.append(f"OPTIONAL {{ {text} }}")
+            else:
+                parts.append(text)
+        distinct = "DISTINCT " if self.distinct else ""
+        variables = " ".join("?" + name for name in self.variables)
+        body = "\n  ".join(parts)
+        return f"{self.prologue}SELECT {distinct}{variables} WHERE {{\n  {body}\n}} {self.modifiers}".strip()
+
+
+@dataclass
+class View:
+    """How to derive one member query's results from a merged query's results."""
+
+    source: str
+    variables: list
+    distinct: bool
+    required: list = field(default_factory=list)
+
+    def apply(self, frame, columns=None):
+        """Filter and project a DataFrame of the merged query into this view."""
+        for name in self.required:
+            frame = frame[frame[name].notna()]
+        frame = frame[list(columns or self.variables)]
+        if self.distinct:
+            frame = frame.drop_duplicates()
+        frame = frame.reset_index(drop=True)
+        for name in frame.columns:
+            dtype = str(frame[name].dtype)
+            if dtype == "category":
+                frame[name] = frame[name].cat.remove_unused_categories()
+            elif dtype == "Int64" and not frame[name].isna().any():
+                frame[name] = frame[name].astype("int64")
+        return frame
+
+
+def _split_elements(body):
+    """Split a WHERE group into top-level ``(kind, text)`` elements."""
+    elements = []
+    start = 0
+    depth = 0
+    pos = 0
+
+    def close(end):
+        text = body[start:end].strip().rstrip(".").strip()
+        if text:
+            keyword = _KEYWORD.match(text)
+            if keyword is None:
+                elements.append(("triples", text))
+            elif keyword.group(1).upper() == "OPTIONAL":
+                inner = text[keyword.end():].strip()[1:-1].strip().rstrip(".").strip()
+                elements.append(("optional", inner))
+            else:
+                elements.append(("other", text))
+
+    while pos < len(body):
+        char = body[pos]
+        if char in "\"'":
+            closing = body.find(char, pos + 1)
+            while closing > 0 and body[closing - 1] == "\\":
+                closing = body.find(char, closing + 1)
+            pos = len(body) if closing < 0 else closing + 1
+            continue
+        if char == "<" and re.match(r"<[^<>\"{}|^`\\\s]*>", body[pos:]):
+            pos = body.index(">", pos) + 1
+            continue
+        if char in "{(":
+            depth += 1
+        elif char in "})":
+            depth -= 1
+            if depth == 0 and (char == "}" or _KEYWORD.match(body[start:].lstrip())):
+                close(pos + 1)
+                start = pos + 1
+        elif char == "." and depth == 0 and (pos + 1 == len(body) or body[pos + 1].isspace()):
+            close(pos)
+            start = pos + 1
+        pos += 1
+    close(len(body))
+    return elements
+
+
+def parse_select(query):
+    """Parse ``query`` into a :class:`SelectQuery`, or ``None`` if it cannot be consolidated.
+
+    Only SELECT queries with a plain variable projection qualify; SELECT *,
+    projected expressions, aggregates and sub-selects are left alone.
+    """
+    text = normalize_query(query)
+    match = _SELECT.match(text)
+    if match is None:
+        return None
+    depth = 1
+    pos = match.end()
+    while depth and pos < len(text):
+        if text[pos] == "{":
+            depth += 1
+        elif text[pos] == "}":
+            depth -= 1
+        pos += 1
+    if depth:
+        return None
+    body = text[match.end():pos - 1]
+    modifiers = text[pos:].strip()
+    if re.search(r"\b(GROUP\s+BY|HAVING|SELECT|UNION)\b", body + " " + modifiers, re.IGNORECASE):
+        return None
+    return SelectQuery(
+        prologue=match.group("prologue"),
+        distinct=bool(match.group("distinct")),
+        variables=_VARIABLE.findall(match.group("variables")),
+        elements=_split_elements(body),
+        modifiers=modifiers,
+    )
+
+
+def merge(queries):
+    """Merge parsed queries into one superset query.
+
+    Returns ``(merged, views)`` with one :class:`View` per input query, or
+    ``None`` if they cannot be answered exactly from a single query.
+    """
+    first = queries[0]
+    others = [kind_text for kind_text in first.elements if kind_text[0] == "other"]
+    for query in queries:
+        if query.modifiers != first.modifiers or query.prologue != first.prologue:
+            return None
+        if [element for element in query.elements if element[0] == "other"] != others:
+            return None
+
+    triple_sets = [{text for kind, text in query.elements if kind == "triples"} for query in queries]
+    common = set.intersection(*triple_sets)
+    required_vars = {name for text in common for name in _VARIABLE.findall(text)}
+
+    # The triples a member has beyond the common ones form one OPTIONAL group,
+    # placed where its first extra triple was, so chained triples match together.
+    members = []
+    for query in queries:
+        extra = [text for kind, text in query.elements if kind == "triples" and text not in common]
+        group = " . ".join(extra) if extra else None
+        own = []
+        for kind, text in query.elements:
+            if kind == "triples" and text in common:
+                own.append(("triples", text))
+            elif kind == "triples":
+                if text == extra[0]:
+                    own.append(("optional", group))
+            elif kind == "optional":
+                own.append(("optional", text))
+        members.append((group, own))
+
+    elements = []
+    owners = {}
+    for index, (_, own) in enumerate(members):
+        for element in own:
+            if element not in elements:
+                elements.append(element)
+            owners.setdefault(element, set()).add(index)
+
+    # OPTIONALs bind their variables for the OPTIONALs after them; blocks that share
+    # variables must belong to the same members, or one would constrain the other.
+    optionals = [element for element in elements if element[0] == "optional"]
+    for position, element in enumerate(optionals):
+        names = set(_VARIABLE.findall(element[1])) - required_vars
+        for other in optionals[position + 1:]:
+            if names & set(_VARIABLE.findall(other[1])) and owners[element] != owners[other]:
+                return None
+
+    variables = []
+    views = []
+    for index, (query, (group, own)) in enumerate(zip(queries, members)):
+        if any(index not in owners[element] for element in optionals) and not query.distinct:
+            # An OPTIONAL block the member does not have can multiply its rows.
+            return None
+        required = []
+        if group is not None:
+            required = [name for name in dict.fromkeys(_VARIABLE.findall(group)) if name not in required_vars]
+            if not required:
+                return None
+        for name in query.variables + required:
+            if name not in variables:
+                variables.append(name)
+        views.append(View("", query.variables, query.distinct, required))
+
+    merged = SelectQuery(
+        prologue=first.prologue,
+        distinct=all(query.distinct for query in queries),
+        variables=variables,
+        elements=[element for element in elements if element[0] != "other"] + others,
+        modifiers=first.modifiers,
+    )
+    source = merged.text()
+    for view in views:
+        view.source = source
+    return merged, views
+
+
+def plan(queries):
+    """Plan ``(endpoint, query)`` pairs; returns ``{(endpoint, normalized query): View}``.
+
+    Queries are merged greedily in the given order; queries that cannot be
+    merged with any other are not part of the plan.
+    """
+    groups = []
+    for endpoint, query in queries:
+        parsed = parse_select(query)
+        if parsed is None:
+            continue
+        key = (endpoint, normalize_query(query))
+        for group in groups:
+            if group["endpoint"] != endpoint or any(member[0] == key for member in group["members"]):
+                continue
+            if merge([member[1] for member in group["members"]] + [parsed]) is not None:
+                group["members"].append((key, parsed))
+                break
+        else:
+            if not any(key == member[0] for group in groups for member in group["members"]):
+                groups.append({"endpoint": endpoint, "members": [(key, parsed)]})
+
+    views = {}
+    for group in groups:
+        if len(group["members"]) < 2:
+            continue
+        _, group_views = merge([member[1] for member in group["members"]])
+        for (key, _), view in zip(group["members"], group_views):
+            views[key] = view
+    return views
+
+
+def enabled():
+    return os.environ.get("LODNB_CONSOLIDATE", "0") == "1"
+
+
+_default_plan = None
+_active_plan = None
+_default_lock = threading.Lock()
+
+
+def default_plan():
+    """Return the plan over the JSON SELECT queries of all scripts in py/."""
+    global _default_plan
+    with _default_lock:
+        if _default_plan is None:
+            from lodnb.runner import discover
+            from lodnb.sparql import SPARQL_JSON
+
+            queries = [
+                (spec.endpoint, spec.text)
+                for analysis in discover(consolidate=False)
+                for spec in analysis.queries
+                if spec.accept == SPARQL_JSON and not spec.page_size
+            ]
+            _default_plan = plan(queries)
+        return _default_plan
+
+
+def save_plan(views, path=None):
+    """Write ``views`` as JSON (by default below the cache directory) and return the path."""
+    entries = [[endpoint, query, asdict(view)] for (endpoint, query), view in sorted(views.items())]
+    document = json.dumps(entries, sort_keys=True)
+    if path is None:
+        digest = hashlib.sha256(document.encode("utf-8")).hexdigest()
+        path = os.path.join(cache_dir("plans"), digest + ".json")
+    with open(path + ".tmp", "w", encoding="utf-8") as handle:
+        handle.write(document)
+    os.replace(path + ".tmp", path)
+    return path
+
+
+def load_plan(path):
+    """Read a plan written by :func:`save_plan`."""
+    with open(path, encoding="utf-8") as handle:
+        entries = json.load(handle)
+    return {(endpoint, query): View(**view) for endpoint, query, view in entries}
+
+
+def activate(views):
+    """Answer member queries from ``views`` in this process and in the scripts it starts."""
+    global _active_plan
+    with _default_lock:
+        _active_plan = views
+    os.environ[PLAN_ENV] = save_plan(views)
+
+
+def active_plan():
+    """Return the activated plan, reading ``LODNB_PLAN`` in processes started by the runner."""
+    global _active_plan
+    with _default_lock:
+        if _active_plan is None and os.environ.get(PLAN_ENV):
+            _active_plan = load_plan(os.environ[PLAN_ENV])
+        return _active_plan or {}
+
+
+def find_view(query, endpoint):
+    """Return the :class:`View` answering ``query`` from a merged query of the active plan, if any."""
+    return active_plan().get((endpoint, normalize_query(query)))
+
+
+def consolidate(analyses):
+    """Replace the member queries of ``analyses`` by the merged queries they are answered from.
+
+    With consolidation enabled, the plan is also activated (:func:`activate`).
+    """
+    from lodnb.sparql import SPARQL_JSON
+
+    if not enabled():
+        return analyses
+    views = default_plan()
+    activate(views)
+    for analysis in analyses:
+        for spec in analysis.queries:
+            view = views.get((spec.endpoint, normalize_query(spec.text)))
+            if view is not None and spec.accept == SPARQL_JSON and not spec.page_size:
+                spec.text = view.source
+    return analyses
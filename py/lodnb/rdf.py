@@ -0,0 +1,327 @@
+"""Turtle / N-Triples ingestion into columnar DataFrames.
+
+:func:`iter_triples` runs rdflib's Turtle or N-Triples parser with a sink
+that hands each triple on as plain Python terms instead of adding it to a
+``Graph``, so no graph or index is built and memory stays bounded by a
+small queue of triples (plus, for Turtle, the document text, which rdflib
+reads whole; N-Triples is read line by line). :func:`read_subjects` makes
+a single pass over the triples and keeps only the requested predicates,
+building one row per subject:
+
+    read_subjects(stream, SITE, {"spatialType": ONTOLOGY + "spatialType"})
+
+This replaces looking up each subject's properties with ``g.value``.
+
+For repeated local queries, :class:`TripleStore` keeps the triples in a
+SQLite file with dictionary-encoded terms and SPO and POS indexes.
+
+Terms are plain strings for IRIs, ``_:label`` strings for blank nodes and
+:class:`Literal` tuples for literals.
+"""
+import os
+import queue
+import sqlite3
+import threading
+from collections import namedtuple
+
+import pandas as pd
+
+from lodnb.cache import cache_dir
+from lodnb.frames import _term_kind, _typed_series
+
+RDF = "http://www.w3.org/1999/02/22-rdf-syntax-ns#"
+RDF_TYPE = RDF + "type"
+
+# Triples handed from the parser thread to the consumer per batch, and batches in flight.
+BATCH_SIZE = 1000
+MAX_BATCHES = 16
+
+
+class Literal(namedtuple("Literal", "value datatype lang")):
+    """An RDF literal; ``datatype`` and ``lang`` are ``None`` when absent."""
+
+    __slots__ = ()
+
+    def __new__(cls, value, datatype=None, lang=None):
+        return super().__new__(cls, value, datatype, lang)
+
+    def __str__(self):
+        return self.value
+
+
+def _converter():
+    """Return a function converting rdflib terms to plain strings and :class:`Literal` tuples."""
+    from rdflib import BNode
+    from rdflib import Literal as RDFLiteral
+
+    def term(node):
+        if isinstance(node, RDFLiteral):
+            datatype = str(node.datatype) if node.datatype is not None else None
+            return Literal(str(node), datatype, node.language.lower() if node.language else None)
+        if isinstance(node, BNode):
+            return "_:" + str(node)
+        return str(node)
+
+    return term
+
+
+class _Stop(Exception):
+    """Raised in the parser thread when the consumer stopped reading."""
+
+
+def _sink(emit):
+    """Return an rdflib ``Graph`` whose ``add`` passes each triple to ``emit`` instead of storing it."""
+    from rdflib import Graph
+
+    class Sink(Graph):
+        def add(self, triple):
+            emit(triple)
+            return self
+
+    return Sink()
+
+
+def iter_triples(source, base=None, format="turtle"):
+    """Yield the ``(subject, predicate, object)`` triples of a Turtle or N-Triples document.
+
+    ``source`` is a path, bytes, or a text or binary file object. N-Triples
+    is a subset of Turtle, so the default format reads both; ``format="nt"``
+    reads N-Triples line by line. Triples are yielded while the document is
+    parsed in a background thread.
+    """
+    term = _converter()
+    batches = queue.Queue(MAX_BATCHES)
+    stopped = threading.Event()
+    batch = []
+
+    def put(item):
+        while not stopped.is_set():
+            try:
+                batches.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+        raise _Stop()
+
+    def emit(triple):
+        batch.append((term(triple[0]), term(triple[1]), term(triple[2])))
+        if len(batch) >= BATCH_SIZE:
+            put(batch[:])
+            batch.clear()
+
+    def parse():
+        try:
+            sink = _sink(emit)
+            if isinstance(source, (str, os.PathLike)):
+                sink.parse(source=os.fspath(source), format=format, publicID=base)
+            elif isinstance(source, bytes):
+                sink.parse(data=source, format=format, publicID=base)
+            else:
+                sink.parse(source=source, format=format, publicID=base)
+            put(batch)
+            put(None)
+        except _Stop:
+            pass
+        except BaseException as exc:  # re-raised in the consumer
+            try:
+                put(exc)
+            except _Stop:
+                pass
+
+    thread = threading.Thread(target=parse, name="lodnb-rdf-parser", daemon=True)
+    thread.start()
+    try:
+        while True:
+            item = batches.get()
+            if item is None:
+                return
+            if isinstance(item, BaseException):
+                raise item
+            yield from item
+    finally:
+        stopped.set()
+        thread.join()
+
+
+def _cell(term):
+    """Describe ``term`` like a SPARQL JSON binding, for the column typing in :mod:`lodnb.frames`."""
+    if isinstance(term, Literal):
+        cell = {"type": "literal", "value": term.value}
+        if term.datatype:
+            cell["datatype"] = term.datatype
+        if term.lang:
+            cell["xml:lang"] = term.lang
+        return cell
+    return {"type": "bnode" if term.startswith("_:") else "uri", "value": term}
+
+
+def triples_to_frame(triples, columns, subject_type=None):
+    """Collect the objects of selected predicates into one row per subject.
+
+    ``columns`` maps output column names to predicate IRIs; the first
+    object of each predicate is kept. With ``subject_type``, the rows are
+    exactly the subjects typed with that class (also those without any of
+    the predicates); otherwise every subject with one of the predicates.
+    """
+    names = {predicate: name for name, predicate in columns.items()}
+    typed = {}
+    rows = {}
+    for subject, predicate, obj in triples:
+        if subject_type is not None and predicate == RDF_TYPE and obj == subject_type:
+            typed[subject] = None
+        name = names.get(predicate)
+        if name is not None:
+            rows.setdefault(subject, {}).setdefault(name, obj)
+
+    subjects = list(typed if subject_type is not None else rows)
+    data = {"subject": pd.Series(subjects, name="subject", dtype="category")}
+    for name in columns:
+        cells = [_cell(rows[s][name]) if name in rows.get(s, ()) else None for s in subjects]
+        values = [cell["value"] if cell is not None else None for cell in cells]
+        kinds = {_term_kind(cell) for cell in cells if cell is not None}
+        data[name] = _typed_series(name, values, kinds)
+    return pd.DataFrame(data, columns=["subject", *columns])
+
+
+def read_subjects(source, subject_type, columns, base=None):
+    """Stream ``source`` once and return the ``columns`` predicates of every ``subject_type`` instance."""
+    return triples_to_frame(iter_triples(source, base), columns, subject_type)
+
+
+def _encode(term):
+    """Return the N-Triples form of ``term``, used as its unique key in the store."""
+    if isinstance(term, Literal):
+        value = term.value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n").replace("\r", "\\r")
+        if term.lang:
+            return f'"{value}"@{term.lang}'
+        if term.datatype:
+            return f'"{value}"^^<{term.datatype}>'
+        return f'"{value}"'
+    if term.startswith("_:"):
+        return term
+    return f"<{term}>"
+
+
+class TripleStore:
+    """On-disk triple store with dictionary-encoded terms and SPO/POS indexes.
+
+    Loading streams the document in batches, so memory stays bounded by the
+    batch size and the term id cache.
+    """
+
+    BATCH_SIZE = 10000
+    TERM_CACHE_SIZE = 200000
+
+    def __init__(self, path=None):
+        self.path = path or os.path.join(cache_dir("rdf"), "store.sqlite")
+        self._db = sqlite3.connect(self.path)
+        self._db.executescript(
+            "CREATE TABLE IF NOT EXISTS terms ("
+            " id INTEGER PRIMARY KEY, term TEXT UNIQUE, value TEXT, datatype TEXT, lang TEXT);"
+            "CREATE TABLE IF NOT EXISTS triples ("
+            " s INTEGER, p INTEGER, o INTEGER, PRIMARY KEY (s, p, o)) WITHOUT ROWID;"
+            "CREATE INDEX IF NOT EXISTS triples_pos ON triples (p, o, s);"
+        )
+        self._ids = {}
+
+    def _term_ids(self, terms):
+        """Return ids for ``terms`` (a set), inserting the unknown ones."""
+        if len(self._ids) > self.TERM_CACHE_SIZE:
+            self._ids.clear()
+        missing = [term for term in terms if _encode(term) not in self._ids]
+        if missing:
+            rows = []
+            for term in missing:
+                if isinstance(term, Literal):
+                    rows.append((_encode(term), term.value, term.datatype, term.lang))
+                else:
+                    rows.append((_encode(term), term, None, None))
+            self._db.executemany(
+                "INSERT OR IGNORE INTO terms (term, value, datatype, lang) VALUES (?, ?, ?, ?)", rows
+            )
+            keys = [row[0] for row in rows]
+            for start in range(0, len(keys), 500):
+                chunk = keys[start:start + 500]
+                marks = ",".join("?" * len(chunk))
+                self._ids.update(self._db.execute(
+                    f"SELECT term, id FROM terms WHERE term IN ({marks})", chunk
+                ).fetchall())
+        return {term: self._ids[_encode(term)] for term in terms}
+
+    def load(self, source, base=None):
+        """Stream a Turtle or N-Triples document into the store; returns the number of triples read."""
+        count = 0
+        batch = []
+
+        def flush():
+            ids = self._term_ids({term for triple in batch for term in triple})
+            self._db.executemany(
+                "INSERT OR IGNORE INTO triples VALUES (?, ?, ?)",
+                [(ids[s], ids[p], ids[o]) for s, p, o in batch],
+            )
+            batch.clear()
+
+        for triple in iter_triples(source, base):
+            batch.append(triple)
+            count += 1
+            if len(batch) >= self.BATCH_SIZE:
+                flush()
+        if batch:
+            flush()
+        self._db.commit()
+        return count
+
+    def _lookup(self, term):
+        row = self._db.execute("SELECT id FROM terms WHERE term = ?", (_encode(term),)).fetchone()
+        return row[0] if row else None
+
+    @staticmethod
+    def _decode(term, value, datatype, lang):
+        if term.startswith("<") or term.startswith("_:"):
+            return value
+        return Literal(value, datatype, lang)
+
+    def triples(self, subject=None, predicate=None, obj=None):
+        """Yield the triples matching a pattern; ``None`` matches any term."""
+        where = []
+        params = []
+        for column, term in (("s", subject), ("p", predicate), ("o", obj)):
+            if term is None:
+                continue
+            term_id = self._lookup(term)
+            if term_id is None:
+                return
+            where.append(f"t.{column} = ?")
+            params.append(term_id)
+        sql = (
+            "SELECT ts.term, ts.value, ts.datatype, ts.lang,"
+            " tp.term, tp.value, tp.datatype, tp.lang,"
+            " tobj.term, tobj.value, tobj.datatype, tobj.lang"
+            " FROM triples t JOIN terms ts ON ts.id = t.s"
+            " JOIN terms tp ON tp.id = t.p JOIN terms tobj ON tobj.id = t.o"
+        )
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        for row in self._db.execute(sql, params):
+            yield self._decode(*row[0:4]), self._decode(*row[4:8]), self._decode(*row[8:12])
+
+    def __len__(self):
+        return self._db.execute("SELECT COUNT(*) FROM triples").fetchone()[0]
+
+    def subjects_frame(self, subject_type, columns):
+        """Like :func:`read_subjects`, answered from the POS index."""
+        def matching():
+            yield from self.triples(predicate=RDF_TYPE, obj=subject_type)
+            for predicate in columns.values():
+                yield from self.triples(predicate=predicate)
+
+        return triples_to_frame(matching(), columns, subject_type)
+
+    def clear(self):
+        self._db.execute("DELETE FROM triples")
+        self._db.execute("DELETE FROM terms")
+        self._db.commit()
+        self._ids.clear()
+
+    def close(self):
+        self._db.close()
@@ -0,0 +1,62 @@
+"""Local point-in-polygon assignment of points to regions.
+
+Instead of joining items to counties on the endpoint (``wdt:P189`` /
+``oghamonto:within``), which makes queries heavier and repeats rows per
+item, points are assigned to the polygons of a boundary layer such as
+gs_ireland_island.geojson (one feature per county, named in ``NAME``).
+All points are tested in one vectorized query against an STRtree over the
+polygons, so the cost grows with n log m rather than n × m.
+"""
+import numpy as np
+import pandas as pd
+
+
+def assign_regions(points, regions, column="NAME", max_distance=None, distance_crs=None):
+    """Return the ``column`` value of the region containing each point.
+
+    ``points`` is a GeoDataFrame or GeoSeries of points; ``regions`` a
+    GeoDataFrame of polygons or the path of a boundary file, loaded through
+    :func:`lodnb.layers.load_layer` in the points' CRS. Points on a border
+    get the first matching region. Points outside every region are assigned
+    to the nearest one within ``max_distance`` if given, and are missing
+    otherwise. ``max_distance`` is in units of ``distance_crs`` (the points'
+    CRS by default); give a metric CRS such as ``"EPSG:2157"`` for Ireland,
+    since Web Mercator units are far from metres at these latitudes. The
+    result is a categorical Series aligned with ``points``.
+    """
+    import shapely
+
+    geometry = points.geometry if hasattr(points, "geometry") else points
+    if isinstance(regions, str):
+        from lodnb.layers import load_layer
+
+        regions = load_layer(regions, crs=geometry.crs)
+    elif geometry.crs is not None and regions.crs != geometry.crs:
+        regions = regions.to_crs(geometry.crs)
+
+    polygons = np.asarray(regions.geometry.array)
+    tree = shapely.STRtree(polygons)
+    point_index, region_index = tree.query(np.asarray(geometry.array), predicate="within")
+    # Keep the first region per point.
+    first = np.unique(point_index, return_index=True)[1]
+    assigned = np.full(len(geometry), -1, dtype=np.int64)
+    assigned[point_index[first]] = region_index[first]
+
+    if max_distance is not None:
+        outside = np.flatnonzero(assigned < 0)
+        if len(outside):
+            near_tree, near_geometry = tree, geometry.iloc[outside]
+            if distance_crs is not None:
+                near_tree = shapely.STRtree(np.asarray(regions.geometry.to_crs(distance_crs).array))
+                near_geometry = near_geometry.to_crs(distance_crs)
+            near_point, near_region = near_tree.query_nearest(
+                np.asarray(near_geometry.array), max_distance=max_distance, all_matches=False
+            )
+            assigned[outside[near_point]] = near_region
+
+    names = regions[column].to_numpy()
+    categories = pd.unique(names)
+    codes = np.full(len(geometry), -1, dtype=np.int64)
+    matched = assigned >= 0
+    codes[matched] = pd.Index(categories).get_indexer(names[assigned[matched]])
+    return pd.Series(pd.Categorical.from_codes(codes, categories), index=geometry.index, name=column)
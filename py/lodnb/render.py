@@ -0,0 +1,205 @@
+"""Headless batch rendering of the analysis scripts to image files.
+
+Each script runs in a worker process with the non-interactive Agg backend.
+``plt.show()`` is replaced by a function that saves every open figure as
+``<name>-<n>.<format>`` into the output directory and closes it.
+
+The figures of a script are keyed by a hash of its inputs and code: the
+script source, the sources of :mod:`lodnb`, the data files next to the
+scripts it mentions (e.g. gs_ireland_island.geojson), the cached response
+bodies of its queries and the output settings. If the key matches the
+manifest written by the previous run and all files exist, the script is
+skipped. Scripts whose queries are all cached run offline from exactly
+the hashed responses; otherwise they fetch live and are always rendered.
+
+Usage::
+
+    python -m lodnb.render [--out DIR] [--format png svg webp] [--workers N] [name ...]
+"""
+import argparse
+import contextlib
+import hashlib
+import json
+import multiprocessing
+import os
+import runpy
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from lodnb.cache import cache_key, get_cache
+from lodnb.runner import PY_DIR, discover
+from lodnb.trace import span
+
+DEFAULT_OUT_DIR = os.path.join(os.path.dirname(PY_DIR), "figures")
+DEFAULT_FORMATS = ("png",)
+DEFAULT_DPI = 150
+MANIFEST_SUFFIX = ".render.json"
+
+
+def _code_digest():
+    """Hash the sources of the lodnb package."""
+    digest = hashlib.sha256()
+    package_dir = os.path.dirname(os.path.abspath(__file__))
+    for filename in sorted(os.listdir(package_dir)):
+        if filename.endswith(".py"):
+            digest.update(filename.encode("utf-8"))
+            with open(os.path.join(package_dir, filename), "rb") as handle:
+                digest.update(handle.read())
+    return digest.hexdigest()
+
+
+def input_key(analysis, formats, dpi, code_digest=None):
+    """Return the render key of ``analysis``, or ``None`` if a query result is not cached."""
+    digest = hashlib.sha256()
+    digest.update((code_digest or _code_digest()).encode("ascii"))
+    digest.update(json.dumps([sorted(formats), dpi]).encode("utf-8"))
+    with open(analysis.path, "rb") as handle:
+        source = handle.read()
+    digest.update(source)
+
+    py_dir = os.path.dirname(analysis.path)
+    for filename in sorted(os.listdir(py_dir)):
+        if not filename.endswith(".py") and filename.encode("utf-8") in source:
+            with open(os.path.join(py_dir, filename), "rb") as handle:
+                digest.update(handle.read())
+
+    cache = get_cache()
+    for spec in analysis.queries:
+        if spec.page_size or cache is None:
+            return None
+        body = cache.get(cache_key(spec.endpoint, spec.text, spec.accept), allow_stale=True)
+        if body is None:
+            return None
+        digest.update(hashlib.sha256(body).digest())
+    return digest.hexdigest()
+
+
+def _read_manifest(path):
+    try:
+        with open(path, encoding="utf-8") as handle:
+            return json.load(handle)
+    except (OSError, ValueError):
+        return None
+
+
+def is_current(name, key, out_dir):
+    """Return whether the figures of ``name`` were already rendered for ``key``."""
+    if key is None:
+        return False
+    manifest = _read_manifest(os.path.join(out_dir, name + MANIFEST_SUFFIX))
+    if manifest is None or manifest.get("key") != key:
+        return False
+    return all(os.path.exists(os.path.join(out_dir, filename)) for filename in manifest["files"])
+
+
+def render_file(name, path, out_dir, formats, dpi, offline):
+    """Run the script at ``path`` headless and save its figures (runs in a worker process)."""
+    import matplotlib
+
+    matplotlib.use("Agg", force=True)
+    import matplotlib.pyplot as plt
+
+    script_dir = os.path.dirname(path)
+    if script_dir not in sys.path:
+        sys.path.insert(0, script_dir)
+
+    files = []
+
+    def save_figures(*args, **kwargs):
+        for number in plt.get_fignums():
+            figure = plt.figure(number)
+            index = len(files) // len(formats) + 1
+            for fmt in formats:
+                filename = f"{name}-{index}.{fmt}"
+                with span("render", figure=filename):
+                    figure.savefig(os.path.join(out_dir, filename), format=fmt, dpi=dpi, bbox_inches="tight")
+                files.append(filename)
+        plt.close("all")
+
+    plt.show = save_figures
+    # Worker processes are reused, so the offline switch is restored afterwards.
+    previous = os.environ.get("LODNB_OFFLINE")
+    if offline:
+        os.environ["LODNB_OFFLINE"] = "1"
+    try:
+        with span("script", script=name), open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            runpy.run_path(path, run_name="__main__")
+            save_figures()
+    finally:
+        plt.close("all")
+        if previous is None:
+            os.environ.pop("LODNB_OFFLINE", None)
+        else:
+            os.environ["LODNB_OFFLINE"] = previous
+    return files
+
+
+def render_all(analyses, out_dir=DEFAULT_OUT_DIR, formats=DEFAULT_FORMATS, dpi=DEFAULT_DPI,
+               workers=None, force=False):
+    """Render ``analyses`` in a process pool, yielding ``(name, files, error)`` as they finish.
+
+    ``files`` is ``None`` for scripts that were skipped because their
+    inputs did not change.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    code_digest = _code_digest()
+    keys = {analysis.name: input_key(analysis, formats, dpi, code_digest) for analysis in analyses}
+    pending = []
+    for analysis in analyses:
+        if not force and is_current(analysis.name, keys[analysis.name], out_dir):
+            yield analysis.name, None, None
+        else:
+            pending.append(analysis)
+    if not pending:
+        return
+
+    # Spawned workers start with a fresh matplotlib state and their own cache connection.
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+        futures = {
+            pool.submit(render_file, analysis.name, analysis.path, out_dir, tuple(formats), dpi,
+                        keys[analysis.name] is not None): analysis
+            for analysis in pending
+        }
+        for future in as_completed(futures):
+            analysis = futures[future]
+            try:
+                files = future.result()
+            except Exception as exc:
+                yield analysis.name, [], exc
+                continue
+            manifest = {"key": keys[analysis.name], "files": files}
+            with open(os.path.join(out_dir, analysis.name + MANIFEST_SUFFIX), "w", encoding="utf-8") as handle:
+                json.dump(manifest, handle, indent=1)
+            yield analysis.name, files, None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Render the figures of the py/ analyses to files.")
+    parser.add_argument("names", nargs="*", help="analysis names (default: all)")
+    parser.add_argument("--out", default=DEFAULT_OUT_DIR, help="output directory")
+    parser.add_argument("--format", nargs="+", default=list(DEFAULT_FORMATS), choices=["png", "svg", "webp"])
+    parser.add_argument("--dpi", type=int, default=DEFAULT_DPI)
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--force", action="store_true", help="render even if the inputs are unchanged")
+    args = parser.parse_args(argv)
+
+    analyses = discover()
+    if args.names:
+        analyses = [analysis for analysis in analyses if analysis.name in args.names]
+    started = time.perf_counter()
+    failures = 0
+    for name, files, error in render_all(analyses, args.out, args.format, args.dpi, args.workers, args.force):
+        if error is not None:
+            failures += 1
+            status = f"failed: {error}"
+        elif files is None:
+            status = "unchanged"
+        else:
+            status = f"{len(files)} file(s)"
+        print(f"{time.perf_counter() - started:7.2f}s  {name}: {status}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
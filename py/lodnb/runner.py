@@ -0,0 +1,246 @@
+"""Concurrent refresh of every analysis script in py/.
+
+The runner reads the scripts without executing them, collects the SPARQL
+queries they send (module-level query strings or string constants imported
+from lodnb, passed to ``queryFrame``, ``querySparql``, ``queryPages`` or
+``querySolidPod``) and fetches all of them concurrently with asyncio.
+Requests to one endpoint are bounded by the same per-endpoint limits as
+paginated queries; HTTP 429/503 responses are retried with backoff by
+:class:`lodnb.sparql.SparqlClient`.
+
+Responses land in the on-disk cache, so as soon as all queries of a script
+are done the script itself can run (``--render``) in offline mode, reading
+its results from the cache while the remaining queries are still in flight.
+The wall time of a refresh approaches that of the slowest query. With
+``--incremental`` the results are refreshed through :mod:`lodnb.incremental`
+and only scripts whose results changed are rendered again.
+
+Usage::
+
+    python -m lodnb.runner [--render] [--incremental] [name ...]
+"""
+import argparse
+import ast
+import asyncio
+import importlib
+import os
+import sys
+import time
+from dataclasses import dataclass, field
+
+from lodnb import sparql
+from lodnb.paging import DEFAULT_ENDPOINT_LIMIT, ENDPOINT_LIMITS
+
+PY_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_QUERY_FUNCTIONS = {"queryFrame", "querySparql", "queryPages", "querySolidPod"}
+
+
+@dataclass
+class QuerySpec:
+    """One SPARQL query sent by an analysis script."""
+
+    name: str
+    endpoint: str
+    text: str
+    accept: str = sparql.SPARQL_JSON
+    page_size: int = None
+
+
+@dataclass
+class Analysis:
+    """An analysis script and the queries it depends on."""
+
+    name: str
+    path: str
+    queries: list = field(default_factory=list)
+
+
+def _constant(node, names, imports=None):
+    """Resolve ``node`` to a string constant, a module-level string or a ``lodnb`` constant.
+
+    ``imports`` maps names imported with ``from lodnb.<module> import ...``
+    to their module; other names are looked up in :mod:`lodnb.sparql`.
+    """
+    if isinstance(node, ast.Constant) and isinstance(node.value, str):
+        return node.value
+    if isinstance(node, ast.Name):
+        if node.id in names:
+            return names[node.id]
+        module = sparql
+        if imports and node.id in imports:
+            module = importlib.import_module(imports[node.id])
+        value = getattr(module, node.id, None)
+        if isinstance(value, str):
+            return value
+    return None
+
+
+def _script_queries(tree):
+    names = {}
+    imports = {}
+    for node in tree.body:
+        if isinstance(node, ast.ImportFrom) and (node.module or "").startswith("lodnb."):
+            imports.update({alias.asname or alias.name: node.module for alias in node.names})
+        elif isinstance(node, ast.Assign) and len(node.targets) == 1 and isinstance(node.targets[0], ast.Name):
+            value = _constant(node.value, {})
+            if value is not None:
+                names[node.targets[0].id] = value
+
+    queries = []
+    for node in ast.walk(tree):
+        if not (isinstance(node, ast.Call) and isinstance(node.func, ast.Name)):
+            continue
+        function = node.func.id
+        if function not in _QUERY_FUNCTIONS:
+            continue
+        args = list(node.args)
+        keywords = {keyword.arg: keyword.value for keyword in node.keywords}
+        if function == "querySolidPod":
+            endpoint_node, query_node = (args + [None, None])[:2]
+            accept = sparql.TURTLE
+        else:
+            query_node = args[0] if args else keywords.get("query")
+            endpoint_node = args[1] if len(args) > 1 else keywords.get("endpoint")
+            accept = sparql.SPARQL_JSON
+        text = _constant(query_node, names, imports) if query_node is not None else None
+        endpoint = _constant(endpoint_node, names, imports) if endpoint_node is not None else sparql.WIKIDATA
+        if text is None or endpoint is None:
+            continue
+        page_size = None
+        if function == "queryPages":
+            page_size = _constant_int(keywords.get("page_size")) or 10000
+        queries.append(QuerySpec(query_node.id if isinstance(query_node, ast.Name) else function,
+                                 endpoint, text, accept, page_size))
+    return queries
+
+
+def _constant_int(node):
+    if isinstance(node, ast.Constant) and isinstance(node.value, int):
+        return node.value
+    return None
+
+
+def discover(py_dir=PY_DIR, consolidate=True):
+    """Return the analyses in ``py_dir`` together with their queries.
+
+    With ``consolidate``, queries answered from a merged query (see
+    :mod:`lodnb.planner`) are replaced by that query.
+    """
+    analyses = []
+    for filename in sorted(os.listdir(py_dir)):
+        if not filename.endswith(".py"):
+            continue
+        path = os.path.join(py_dir, filename)
+        with open(path, encoding="utf-8") as handle:
+            tree = ast.parse(handle.read(), filename=path)
+        analyses.append(Analysis(filename[:-3], path, _script_queries(tree)))
+    if consolidate and py_dir == PY_DIR:
+        from lodnb.planner import consolidate as consolidate_queries
+
+        consolidate_queries(analyses)
+    return analyses
+
+
+def _fetch(spec):
+    """Fetch one query into the cache (blocking; runs in a worker thread).
+
+    Returns whether the result may have changed; with ``LODNB_INCREMENTAL``
+    JSON SELECT queries refresh their snapshot instead.
+    """
+    if spec.accept == sparql.SPARQL_JSON and not spec.page_size:
+        from lodnb import incremental
+
+        if incremental.enabled():
+            return incremental.refresh(spec.text, spec.endpoint)[1]
+    if spec.page_size:
+        from lodnb.paging import iter_pages
+
+        for _ in iter_pages(spec.text, spec.endpoint, spec.page_size):
+            pass
+    else:
+        sparql.get_client(spec.endpoint).fetch(spec.text, spec.accept)
+    return True
+
+
+async def fetch_all(analyses, on_complete=None):
+    """Fetch the queries of all ``analyses`` concurrently.
+
+    ``on_complete(analysis, error, changed)`` is awaited as soon as every
+    query of an analysis has finished; ``error`` is the first exception
+    raised, if any, and ``changed`` whether any of its results changed.
+    """
+    limits = {}
+    tasks = {}
+
+    def limit(endpoint):
+        if endpoint not in limits:
+            limits[endpoint] = asyncio.Semaphore(ENDPOINT_LIMITS.get(endpoint, DEFAULT_ENDPOINT_LIMIT))
+        return limits[endpoint]
+
+    async def run_query(spec):
+        async with limit(spec.endpoint):
+            return await asyncio.to_thread(_fetch, spec)
+
+    async def run_analysis(analysis):
+        # Identical queries of different scripts share a single task.
+        keys = [(spec.endpoint, spec.accept, spec.text) for spec in analysis.queries]
+        for key, spec in zip(keys, analysis.queries):
+            if key not in tasks:
+                tasks[key] = asyncio.ensure_future(run_query(spec))
+        results = await asyncio.gather(*(tasks[key] for key in keys), return_exceptions=True)
+        error = next((result for result in results if isinstance(result, BaseException)), None)
+        changed = not results or any(result is True for result in results)
+        if on_complete is not None:
+            await on_complete(analysis, error, changed)
+        return analysis, error
+
+    return await asyncio.gather(*(run_analysis(analysis) for analysis in analyses))
+
+
+async def render_script(analysis):
+    """Run an analysis script headless, answering its queries from the cache."""
+    env = dict(os.environ, MPLBACKEND="Agg", LODNB_OFFLINE="1")
+    process = await asyncio.create_subprocess_exec(
+        sys.executable, analysis.path, env=env,
+        stdout=asyncio.subprocess.DEVNULL, stderr=asyncio.subprocess.PIPE,
+    )
+    _, stderr = await process.communicate()
+    if process.returncode != 0:
+        lines = stderr.decode("utf-8", "replace").strip().splitlines()
+        raise RuntimeError(lines[-1] if lines else f"exit status {process.returncode}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Refresh the SPARQL results of the py/ analyses concurrently.")
+    parser.add_argument("names", nargs="*", help="analysis names (default: all)")
+    parser.add_argument("--render", action="store_true", help="run each script once its queries are cached")
+    parser.add_argument("--incremental", action="store_true",
+                        help="refresh result snapshots incrementally and render only changed scripts")
+    args = parser.parse_args(argv)
+    if args.incremental:
+        os.environ["LODNB_INCREMENTAL"] = "1"
+
+    analyses = discover()
+    if args.names:
+        analyses = [analysis for analysis in analyses if analysis.name in args.names]
+    started = time.perf_counter()
+    failures = 0
+
+    async def on_complete(analysis, error, changed):
+        nonlocal failures
+        if error is None and args.render and changed:
+            try:
+                await render_script(analysis)
+            except RuntimeError as exc:
+                error = exc
+        failures += error is not None
+        status = ("ok" if changed else "unchanged") if error is None else f"failed: {error}"
+        print(f"{time.perf_counter() - started:7.2f}s  {analysis.name}: {status}")
+
+    asyncio.run(fetch_all(analyses, on_complete))
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,134 @@
+"""One query and one GeoDataFrame for several Wikidata site maps.
+
+The Italian site maps (catacombs, Roman theatres, archaeological sites in
+Chieti) differed only in one class or region filter, and each sent its own
+query, parsed its own points and reprojected them. A :class:`SiteFilter`
+describes one map; :func:`sites_query` fetches the items of any number of
+filters in a single query, tagging every row with the filter it matched
+(``?filter``). Filters constraining the same properties share one
+``VALUES`` block, so the query grows by one row per map::
+
+    df = queryFrame(sites_query([CATACOMBS, ROMAN_THEATRES, CHIETI_SITES]))
+    gdf = sites_frame(df)
+    for site_filter in ITALY_SITE_MAPS:
+        plot_site_map(gdf, site_filter)
+
+An item matching several filters appears once per filter.
+"""
+from dataclasses import dataclass
+
+ARCHAEOLOGICAL_SITE = "Q839954"
+ITALY = "Q38"
+
+# (field, property path) of the optional constraints, most selective first.
+_CONSTRAINTS = (
+    ("instance", "wdt:P31"),
+    ("region", "wdt:P131"),
+    ("country", "wdt:P17"),
+)
+
+
+@dataclass(frozen=True)
+class SiteFilter:
+    """The items shown on one site map.
+
+    Items are instances of ``base`` or a subclass of it, optionally also
+    direct instances of ``instance``, located in ``country`` (``wdt:P17``)
+    and in the administrative unit ``region`` (``wdt:P131``); all given as
+    QIDs. ``name`` tags the rows of this filter, ``label`` names the points
+    in the legend.
+    """
+
+    name: str
+    label: str
+    title: str
+    instance: str = None
+    country: str = None
+    region: str = None
+    base: str = ARCHAEOLOGICAL_SITE
+
+
+CATACOMBS = SiteFilter("catacombs", "catacombs", "Map of catacombs in Italy", instance="Q172896", country=ITALY)
+ROMAN_THEATRES = SiteFilter("roman-theatres", "Roman theatres", "Map of Roman theatres in Italy",
+                            instance="Q19757", country=ITALY)
+CHIETI_SITES = SiteFilter("chieti", "archaeological sites", "Map of archaeological sites in Chieti",
+                          country=ITALY, region="Q13138")
+ITALY_SITE_MAPS = (CATACOMBS, ROMAN_THEATRES, CHIETI_SITES)
+
+
+def sites_query(filters, language="[AUTO_LANGUAGE],en"):
+    """Return one SELECT query for the items of all ``filters``, tagged by ``?filter``."""
+    if not filters:
+        raise ValueError("No site filters given")
+    if len({site_filter.name for site_filter in filters}) != len(filters):
+        raise ValueError("Site filter names must be unique")
+    groups = {}
+    for site_filter in filters:
+        fields = tuple(field for field, _ in _CONSTRAINTS if getattr(site_filter, field))
+        groups.setdefault(fields, []).append(site_filter)
+
+    branches = []
+    for fields, members in groups.items():
+        variables = " ".join(f"?{name}" for name in ("filter", "base") + fields)
+        rows = "\n      ".join(
+            "(" + " ".join([f'"{member.name}"', f"wd:{member.base}"]
+                           + [f"wd:{getattr(member, field)}" for field in fields]) + ")"
+            for member in members
+        )
+        patterns = [f"?item {path} ?{field}." for field, path in _CONSTRAINTS if field in fields]
+        patterns.append("?item (wdt:P31/(wdt:P279*)) ?base.")
+        branches.append(
+            "{\n    VALUES (" + variables + ") {\n      " + rows + "\n    }\n    "
+            + "\n    ".join(patterns) + "\n  }"
+        )
+    return (
+        "SELECT DISTINCT ?filter ?item ?itemLabel ?geo ?img WHERE {\n  "
+        + " UNION ".join(branches)
+        + "\n  ?item wdt:P625 ?geo.\n"
+        "  OPTIONAL { ?item wdt:P18 ?img }\n"
+        f'  SERVICE wikibase:label {{ bd:serviceParam wikibase:language "{language}". }}\n'
+        "}\n"
+    )
+
+
+ITALY_SITES_QUERY = sites_query(ITALY_SITE_MAPS)
+
+
+def sites_frame(df, filters=ITALY_SITE_MAPS):
+    """Return the rows of a :func:`sites_query` result as points in Web Mercator.
+
+    Points are parsed and reprojected once for all maps; ``filter`` becomes
+    a categorical column ordered like ``filters``.
+    """
+    import pandas as pd
+
+    from lodnb.geo import points_frame, reproject
+
+    gdf = reproject(points_frame(df, "geo"))
+    gdf["filter"] = pd.Categorical(gdf["filter"].astype(object),
+                                   categories=[site_filter.name for site_filter in filters])
+    return gdf
+
+
+def plot_site_map(gdf, site_filter, ax=None, color="red", markersize=50, zoom=None):
+    """Draw the points of ``site_filter`` from a :func:`sites_frame` result over an OSM basemap.
+
+    Returns the axes, or None if the filter matched no items.
+    """
+    import matplotlib.pyplot as plt
+
+    from lodnb.maps import plot_points
+    from lodnb.tiles import add_basemap
+
+    points = gdf[gdf["filter"] == site_filter.name]
+    if points.empty:
+        print(f"No data retrieved for {site_filter.label}.")
+        return None
+    if ax is None:
+        _, ax = plt.subplots(figsize=(12, 8))
+    plot_points(ax, points, color=color, markersize=markersize, alpha=0.7, label=site_filter.label)
+    add_basemap(ax, zoom=zoom)
+    ax.set_axis_off()
+    ax.set_title(site_filter.title)
+    ax.legend()
+    return ax
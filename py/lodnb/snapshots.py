@@ -0,0 +1,269 @@
+"""Memory-mapped columnar snapshots of query results.
+
+Every result set can be written as an uncompressed Arrow IPC file below
+the shared cache directory, together with its query metadata (query text,
+endpoint, row count, a digest of the response it was built from).
+Geometry columns of GeoDataFrames are stored as WKB with GeoParquet-style
+``geo`` metadata. Readers open the files memory-mapped: selecting columns
+and filtering rows only touches the pages of the columns involved, so
+several notebooks or worker processes reading the same Ogham or Pokémon
+result share one copy of the file in the page cache instead of each
+re-fetching and rebuilding it. ``read_table`` returns Arrow columns backed
+by the map; ``read_frame`` converts them to pandas, which copies the
+selected columns.
+
+``queryFrame`` answers from a snapshot when the response it got (from the
+endpoint or the response cache) has the digest the snapshot was built from,
+skipping the JSON conversion, and writes one otherwise.
+:mod:`lodnb.incremental` keeps its snapshots in the same store under their
+own keys (``snapshot_key(query, endpoint, "incremental")``), with its
+refresh state in the metadata, so rewriting one kind of snapshot never
+replaces the other. Snapshots need
+``pyarrow``; without it, or with ``LODNB_SNAPSHOTS=0``, results are
+converted as before.
+
+Reading a snapshot elsewhere::
+
+    from lodnb.snapshots import SnapshotStore, snapshot_key
+    store = SnapshotStore()
+    df = store.read_frame(snapshot_key(oghamQuery), columns=["item", "countyLabel"],
+                          filters=[("countyLabel", "in", ["Kerry", "Cork"])])
+
+    python -m lodnb.snapshots list
+"""
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+
+from lodnb.cache import cache_dir, cache_key
+
+try:
+    import pyarrow
+except ImportError:  # optional dependency
+    pyarrow = None
+
+SUFFIX = ".arrow"
+_METADATA_KEY = b"lodnb"
+_GEO_KEY = b"geo"
+_OPERATORS = {
+    "==": lambda field, value: field == value,
+    "=": lambda field, value: field == value,
+    "!=": lambda field, value: field != value,
+    "<": lambda field, value: field < value,
+    "<=": lambda field, value: field <= value,
+    ">": lambda field, value: field > value,
+    ">=": lambda field, value: field >= value,
+    "in": lambda field, value: field.isin(value),
+    "not in": lambda field, value: ~field.isin(value),
+}
+
+
+def enabled():
+    return pyarrow is not None and os.environ.get("LODNB_SNAPSHOTS", "1") != "0"
+
+
+def snapshot_key(query, endpoint=None, kind=None):
+    """Return the snapshot name of ``query``, shared with the response cache key.
+
+    ``kind`` names snapshots of the same query kept by another writer.
+    """
+    from lodnb.sparql import SPARQL_JSON, WIKIDATA
+
+    key = cache_key(endpoint or WIKIDATA, query, SPARQL_JSON)
+    return f"{key}-{kind}" if kind else key
+
+
+def filter_expression(filters):
+    """Turn ``[(column, op, value), ...]`` (all must hold) into a ``pyarrow.dataset`` expression.
+
+    A list of such lists is a disjunction, as for ``pandas.read_parquet``.
+    Expressions are passed through unchanged.
+    """
+    import pyarrow.dataset as ds
+
+    if filters is None or isinstance(filters, ds.Expression):
+        return filters
+    if filters and isinstance(filters[0], list):
+        expression = None
+        for conjunction in filters:
+            term = filter_expression(conjunction)
+            expression = term if expression is None else expression | term
+        return expression
+    expression = None
+    for column, op, value in filters:
+        if op not in _OPERATORS:
+            raise ValueError(f"Unsupported filter operator: {op!r}")
+        term = _OPERATORS[op](ds.field(column), value)
+        expression = term if expression is None else expression & term
+    return expression
+
+
+class SnapshotStore:
+    """Arrow IPC snapshots in one directory, opened memory-mapped."""
+
+    def __init__(self, path=None):
+        if pyarrow is None:
+            raise ImportError("Snapshots require pyarrow")
+        self.path = path or cache_dir("snapshots", "arrow")
+
+    def _file(self, key):
+        return os.path.join(self.path, key + SUFFIX)
+
+    def exists(self, key):
+        return os.path.exists(self._file(key))
+
+    def keys(self):
+        return sorted(name[:-len(SUFFIX)] for name in os.listdir(self.path) if name.endswith(SUFFIX))
+
+    def write(self, key, frame, **metadata):
+        """Store ``frame`` (a DataFrame or GeoDataFrame) as ``key`` with ``metadata``.
+
+        The file is written next to the target and renamed into place, so
+        readers never see a partial snapshot.
+        """
+        import pyarrow.ipc
+
+        geo = {}
+        if hasattr(frame, "geometry") and hasattr(frame, "crs"):
+            import pandas as pd
+
+            geometry_columns = [name for name in frame.columns if str(frame[name].dtype) == "geometry"]
+            table_frame = pd.DataFrame(frame)
+            for name in geometry_columns:
+                crs = frame[name].crs
+                geo[name] = {"encoding": "WKB", "crs": crs.to_string() if crs is not None else None}
+                table_frame[name] = frame[name].to_wkb()
+            frame = table_frame
+        table = pyarrow.Table.from_pandas(frame, preserve_index=False)
+        meta = {"rows": len(frame), "created": time.strftime("%Y-%m-%dT%H:%M:%S"), **metadata}
+        schema_metadata = dict(table.schema.metadata or {})
+        schema_metadata[_METADATA_KEY] = json.dumps(meta).encode("utf-8")
+        if geo:
+            schema_metadata[_GEO_KEY] = json.dumps({
+                "version": "1.0.0", "primary_column": next(iter(geo)), "columns": geo,
+            }).encode("utf-8")
+        table = table.replace_schema_metadata(schema_metadata)
+
+        path = self._file(key)
+        partial = f"{path}.{os.getpid()}.tmp"
+        with pyarrow.OSFile(partial, "wb") as sink, pyarrow.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+        os.replace(partial, path)
+        return path
+
+    def modified(self, key):
+        """Return the modification time of ``key``, or 0 if missing."""
+        try:
+            return os.path.getmtime(self._file(key))
+        except FileNotFoundError:
+            return 0
+
+    def touch(self, key):
+        """Mark ``key`` as current without rewriting it."""
+        os.utime(self._file(key))
+
+    def metadata(self, key):
+        """Return the metadata of ``key`` without reading any column, or None if missing."""
+        import pyarrow.ipc
+
+        try:
+            with pyarrow.memory_map(self._file(key)) as source:
+                schema = pyarrow.ipc.open_file(source).schema
+        except FileNotFoundError:
+            return None
+        return json.loads(schema.metadata.get(_METADATA_KEY, b"{}"))
+
+    def read_table(self, key, columns=None, filters=None):
+        """Return ``key`` as an Arrow table backed by the memory-mapped file.
+
+        ``columns`` selects columns and ``filters`` rows (see
+        :func:`filter_expression`); both are applied while scanning, so
+        unused columns are never read.
+        """
+        import pyarrow.dataset as ds
+        import pyarrow.fs
+
+        dataset = ds.dataset(self._file(key), format="ipc", filesystem=pyarrow.fs.LocalFileSystem(use_mmap=True))
+        table = dataset.to_table(columns=columns, filter=filter_expression(filters))
+        return table.replace_schema_metadata(dataset.schema.metadata)
+
+    def read_frame(self, key, columns=None, filters=None, geometry=True):
+        """Return ``key`` as a DataFrame; WKB columns become geometries (a GeoDataFrame) with ``geometry``.
+
+        The conversion to pandas copies the selected columns out of the map.
+        """
+        table = self.read_table(key, columns, filters)
+        frame = table.to_pandas()
+        geo = json.loads((table.schema.metadata or {}).get(_GEO_KEY, b"{}"))
+        present = {name: spec for name, spec in geo.get("columns", {}).items() if name in frame.columns}
+        if geometry and present:
+            import geopandas as gpd
+
+            for name, spec in present.items():
+                frame[name] = gpd.GeoSeries.from_wkb(frame[name], crs=spec["crs"])
+            primary = geo["primary_column"] if geo["primary_column"] in present else next(iter(present))
+            frame = gpd.GeoDataFrame(frame, geometry=primary)
+        return frame
+
+    def delete(self, key):
+        try:
+            os.remove(self._file(key))
+        except FileNotFoundError:
+            pass
+
+
+_store = None
+
+
+def get_store():
+    global _store
+    if _store is None:
+        _store = SnapshotStore()
+    return _store
+
+
+def results_frame(body, query, endpoint, columns=None):
+    """Return the DataFrame of the SPARQL JSON response ``body`` to ``query``.
+
+    The snapshot of ``query`` is used when it was built from the same
+    response; otherwise the response is converted and the snapshot
+    rewritten with all of its columns.
+    """
+    import io
+
+    from lodnb.frames import read_results
+
+    if not enabled():
+        return read_results(io.BytesIO(body), columns)
+    store = get_store()
+    key = snapshot_key(query, endpoint)
+    digest = hashlib.sha256(body).hexdigest()
+    meta = store.metadata(key)
+    if meta is not None and meta.get("digest") == digest:
+        return store.read_frame(key, list(columns) if columns else None)
+    frame = read_results(io.BytesIO(body))
+    store.write(key, frame, query=query, endpoint=endpoint, digest=digest)
+    return frame[list(columns)] if columns else frame
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Inspect the Arrow snapshots of query results.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("list", help="list the snapshots with their size and query")
+    args = parser.parse_args(argv)
+
+    store = SnapshotStore()
+    if args.command == "list":
+        for key in store.keys():
+            meta = store.metadata(key) or {}
+            size = os.path.getsize(store._file(key)) / 2 ** 20
+            query = " ".join((meta.get("query") or "").split())[:60]
+            print(f"{key[:12]}  {meta.get('rows', '?'):>8} rows  {size:8.2f} MB  {meta.get('created', '')}  {query}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,171 @@
+"""SPARQL client shared by the analysis scripts.
+
+Every endpoint gets one pooled ``requests.Session``, so repeated queries
+against query.wikidata.org or graph.nfdi4objects.net reuse keep-alive
+connections instead of paying a new TCP and TLS handshake per query.
+Responses go through the on-disk cache in :mod:`lodnb.cache`.
+"""
+import json
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from lodnb.cache import OfflineCacheMiss, cache_key, get_cache, is_offline
+from lodnb.trace import span
+
+WIKIDATA = "https://query.wikidata.org/sparql"
+NFDI4OBJECTS = "https://graph.nfdi4objects.net/api/sparql"
+FUZZY_SL = "https://fuzzy-sl.wikibase.cloud/query/sparql"
+
+USER_AGENT = "jupyter-nb-lod/0.1 (https://github.com/Research-Squirrel-Engineers/jupyter-nb-lod)"
+
+SPARQL_JSON = "application/sparql-results+json"
+TURTLE = "text/turtle"
+
+# Queries longer than this are sent as a form POST to stay clear of URL limits.
+MAX_GET_LENGTH = 2000
+
+# Rate limiting and overload responses are retried with exponential backoff.
+RETRY_STATUSES = {429, 503}
+MAX_RETRIES = 4
+BACKOFF_SECONDS = 2.0
+
+
+class SparqlClient:
+    """A keep-alive HTTP session bound to a single SPARQL endpoint."""
+
+    def __init__(self, endpoint, timeout=120, pool_size=8, cache=None):
+        self.endpoint = endpoint
+        self.timeout = timeout
+        self.cache = cache if cache is not None else get_cache()
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update({
+            "User-Agent": USER_AGENT,
+            "Accept-Encoding": "gzip, deflate",
+        })
+
+    def request(self, query, accept=SPARQL_JSON):
+        """Send ``query`` and return the raw ``requests.Response``.
+
+        HTTP 429 and 503 responses are retried up to :data:`MAX_RETRIES`
+        times, waiting for ``Retry-After`` or an exponential backoff.
+        """
+        headers = {"Accept": accept}
+        for attempt in range(MAX_RETRIES + 1):
+            if len(query) > MAX_GET_LENGTH:
+                response = self.session.post(
+                    self.endpoint, data={"query": query}, headers=headers, timeout=self.timeout
+                )
+            else:
+                response = self.session.get(
+                    self.endpoint, params={"query": query}, headers=headers, timeout=self.timeout
+                )
+            if response.status_code not in RETRY_STATUSES or attempt == MAX_RETRIES:
+                break
+            time.sleep(_retry_delay(response, attempt))
+        response.raise_for_status()
+        return response
+
+    def fetch(self, query, accept=SPARQL_JSON):
+        """Return the response body for ``query``, answering from the cache when possible."""
+        offline = is_offline()
+        key = cache_key(self.endpoint, query, accept)
+        with span("fetch", endpoint=self.endpoint) as stage:
+            if self.cache is not None:
+                body = self.cache.get(key, allow_stale=offline)
+                if body is not None:
+                    stage.add(hits=1, cached_bytes=len(body))
+                    return body
+            if offline:
+                raise OfflineCacheMiss(f"No cached response for query against {self.endpoint}")
+            body = self.request(query, accept).content
+            stage.add(misses=1, bytes=len(body))
+            if self.cache is not None:
+                self.cache.put(key, self.endpoint, body)
+            return body
+
+    def select(self, query):
+        """Run a SELECT query and return the decoded SPARQL JSON document."""
+        return json.loads(self.fetch(query, SPARQL_JSON))
+
+    def turtle(self, query):
+        """Run a CONSTRUCT/DESCRIBE query (or fetch a Turtle document) as text."""
+        return self.fetch(query, TURTLE).decode("utf-8")
+
+    def close(self):
+        self.session.close()
+
+
+def _retry_delay(response, attempt):
+    retry_after = response.headers.get("Retry-After", "")
+    if retry_after.isdigit():
+        return float(retry_after)
+    return BACKOFF_SECONDS * 2 ** attempt
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(endpoint=WIKIDATA):
+    """Return the shared client for ``endpoint``, creating it on first use.
+
+    Endpoints mapped to local dumps in ``LODNB_LOCAL`` get an embedded
+    :class:`lodnb.local.LocalEndpoint` instead.
+    """
+    with _clients_lock:
+        client = _clients.get(endpoint)
+        if client is None:
+            from lodnb.local import LocalEndpoint, local_dumps
+
+            dumps = local_dumps().get(endpoint)
+            if dumps:
+                client = LocalEndpoint(endpoint, dumps)
+            else:
+                client = SparqlClient(endpoint)
+            _clients[endpoint] = client
+        return client
+
+
+def querySparql(query, endpoint=WIKIDATA):
+    """Run a SELECT query and return its result bindings."""
+    return get_client(endpoint).select(query)["results"]["bindings"]
+
+
+def queryFrame(query, endpoint=WIKIDATA, columns=None):
+    """Run a SELECT query and return its results as a typed DataFrame.
+
+    When the runner activated a consolidation plan (:mod:`lodnb.planner`),
+    queries that overlap with another script's query are answered from
+    the merged query. With
+    ``LODNB_INCREMENTAL=1`` results come from :mod:`lodnb.incremental`
+    snapshots; otherwise an unchanged response is read from its Arrow
+    snapshot (:mod:`lodnb.snapshots`) instead of being converted again.
+    """
+    from lodnb import incremental
+    from lodnb.planner import find_view
+    from lodnb.snapshots import results_frame
+
+    view = find_view(query, endpoint)
+    source = view.source if view is not None else query
+    if incremental.enabled():
+        frame = incremental.refresh(source, endpoint)[0]
+        if view is None:
+            return frame[list(columns)] if columns else frame
+    else:
+        frame = results_frame(get_client(endpoint).fetch(source), source, endpoint, None if view else columns)
+        if view is None:
+            return frame
+    return view.apply(frame, columns)
+
+
+def queryPages(query, endpoint=WIKIDATA, page_size=10000, workers=4, columns=None):
+    """Run a SELECT query in LIMIT/OFFSET pages, yielding one DataFrame per page."""
+    from lodnb.paging import iter_pages
+
+    return iter_pages(query, endpoint, page_size, workers, columns)
@@ -0,0 +1,287 @@
+"""Content-addressed cache of Wikimedia Commons thumbnails for ``wdt:P18`` images.
+
+The site queries select ``OPTIONAL { ?item wdt:P18 ?img }``, whose values
+are ``Special:FilePath`` URLs of Commons files. :class:`ThumbnailStore`
+downloads each image once, at the largest configured width, and stores it
+pre-resized to every width in :data:`DEFAULT_WIDTHS` as JPEG. Files are
+named by the SHA-256 of their content (identical images share one file) and
+an SQLite index maps ``(file name, width)`` to the content digest, so a
+cached thumbnail is a single index lookup and a disk read.
+
+Downloading from Commons is opt-in: only with ``LODNB_THUMBNAILS=1`` (and
+not ``LODNB_OFFLINE=1``) are missing images fetched, concurrently by a
+bounded thread pool; otherwise only stored thumbnails are used. A local
+directory of original images can stand in for Commons; it is read
+regardless of ``LODNB_THUMBNAILS``::
+
+    store = ThumbnailStore(source="tests/images")
+
+Prefetch the thumbnails of a script's images (always downloads)::
+
+    python -m lodnb.thumbnails prefetch "http://commons.wikimedia.org/wiki/Special:FilePath/Teatro%20romano.jpg"
+"""
+import argparse
+import hashlib
+import io
+import os
+import sqlite3
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote, unquote
+
+from lodnb.cache import OfflineCacheMiss, cache_dir, is_offline
+from lodnb.sparql import USER_AGENT
+
+COMMONS_FILE_PATH = "https://commons.wikimedia.org/wiki/Special:FilePath/{name}?width={width}"
+DEFAULT_WIDTHS = (160, 320, 640)
+# Commons is asked for few images at a time, as its robot policy requests.
+DEFAULT_WORKERS = 4
+JPEG_QUALITY = 85
+
+
+def commons_file_name(value):
+    """Return the Commons file name of a ``wdt:P18`` value (URL or plain name)."""
+    name = unquote(str(value).rsplit("Special:FilePath/", 1)[-1].split("?", 1)[0])
+    if name.lower().startswith("file:"):
+        name = name[5:]
+    return name.replace("_", " ").strip()
+
+
+def fetching_enabled():
+    """Whether missing thumbnails may be downloaded from Commons."""
+    return os.environ.get("LODNB_THUMBNAILS", "0") == "1" and not is_offline()
+
+
+class CommonsSource:
+    """Reads images from Wikimedia Commons at a requested width."""
+
+    remote = True
+
+    def __init__(self, timeout=60):
+        self.timeout = timeout
+        self._session = None
+
+    def read(self, name, width):
+        if self._session is None:
+            import requests
+
+            self._session = requests.Session()
+            self._session.headers["User-Agent"] = USER_AGENT
+        url = COMMONS_FILE_PATH.format(name=quote(name.replace(" ", "_")), width=width)
+        response = self._session.get(url, timeout=self.timeout)
+        response.raise_for_status()
+        return response.content
+
+
+class DirectorySource:
+    """Reads original images from a local directory, a stand-in for Commons in tests."""
+
+    remote = False
+
+    def __init__(self, path):
+        self.path = path
+
+    def read(self, name, width):
+        for candidate in (name, name.replace(" ", "_")):
+            path = os.path.join(self.path, candidate)
+            if os.path.exists(path):
+                with open(path, "rb") as handle:
+                    return handle.read()
+        raise FileNotFoundError(f"{name} is not in {self.path}")
+
+
+def _resized(data, widths):
+    """Return ``{width: jpeg bytes}`` of the image ``data`` scaled down to each width."""
+    from PIL import Image
+
+    image = Image.open(io.BytesIO(data))
+    image.load()
+    if image.mode in ("RGBA", "LA", "P"):
+        image = image.convert("RGBA")
+        background = Image.new("RGB", image.size, "white")
+        background.paste(image, mask=image.getchannel("A"))
+        image = background
+    else:
+        image = image.convert("RGB")
+    out = {}
+    for width in widths:
+        scaled = image
+        if image.width > width:
+            scaled = image.resize((width, max(1, round(image.height * width / image.width))), Image.LANCZOS)
+        buffer = io.BytesIO()
+        scaled.save(buffer, format="JPEG", quality=JPEG_QUALITY, optimize=True)
+        out[width] = buffer.getvalue()
+    return out
+
+
+class ThumbnailStore:
+    """Pre-resized thumbnails on disk, addressed by content and indexed by file name and width."""
+
+    def __init__(self, source=None, path=None, widths=DEFAULT_WIDTHS, fetch=None):
+        if path is None and isinstance(source, str):
+            # Stand-in directories get their own store next to the Commons one.
+            digest = hashlib.sha1(os.path.abspath(source).encode("utf-8")).hexdigest()[:12]
+            path = cache_dir("thumbnails", "dir-" + digest)
+        if source is None:
+            source = CommonsSource()
+        elif isinstance(source, str):
+            source = DirectorySource(source)
+        self.source = source
+        # None follows LODNB_THUMBNAILS for remote sources.
+        self.fetch = fetch
+        self.widths = tuple(sorted(widths))
+        self.path = path or cache_dir("thumbnails")
+        self.objects = os.path.join(self.path, "objects")
+        os.makedirs(self.objects, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(os.path.join(self.path, "index.sqlite"), check_same_thread=False, timeout=30)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS thumbnails (name TEXT, width INTEGER, digest TEXT, PRIMARY KEY (name, width))"
+        )
+        self._db.commit()
+
+    def _object_path(self, digest):
+        return os.path.join(self.objects, digest[:2], digest + ".jpg")
+
+    def _stored(self, name, width):
+        with self._lock:
+            row = self._db.execute(
+                "SELECT digest FROM thumbnails WHERE name = ? AND width = ?", (name, width)
+            ).fetchone()
+        if row is None:
+            return None
+        path = self._object_path(row[0])
+        return path if os.path.exists(path) else None
+
+    def _download(self, name):
+        data = self.source.read(name, self.widths[-1])
+        entries = []
+        for width, jpeg in _resized(data, self.widths).items():
+            digest = hashlib.sha256(jpeg).hexdigest()
+            path = self._object_path(digest)
+            if not os.path.exists(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                partial = f"{path}.{threading.get_ident()}.tmp"
+                with open(partial, "wb") as handle:
+                    handle.write(jpeg)
+                os.replace(partial, path)
+            entries.append((name, width, digest))
+        with self._lock:
+            self._db.executemany("INSERT OR REPLACE INTO thumbnails VALUES (?, ?, ?)", entries)
+            self._db.commit()
+
+    def _may_fetch(self):
+        if is_offline():
+            return False
+        if self.fetch is not None:
+            return self.fetch
+        return not getattr(self.source, "remote", True) or fetching_enabled()
+
+    def _width(self, width):
+        """Return the smallest stored width that is at least ``width``."""
+        if width is None:
+            return self.widths[-1]
+        return next((stored for stored in self.widths if stored >= width), self.widths[-1])
+
+    def get(self, image, width=None):
+        """Return the path of the thumbnail of ``image`` (a P18 value), fetching it if allowed."""
+        name = commons_file_name(image)
+        width = self._width(width)
+        path = self._stored(name, width)
+        if path is not None:
+            return path
+        if not self._may_fetch():
+            raise OfflineCacheMiss(f"No thumbnail of {name} in {self.path}")
+        self._download(name)
+        return self._stored(name, width)
+
+    def prefetch(self, images, workers=DEFAULT_WORKERS):
+        """Fetch the thumbnails of all ``images`` not stored yet; returns the number fetched.
+
+        Images that cannot be fetched are skipped; nothing is fetched unless allowed.
+        """
+        names = {commons_file_name(image) for image in images if isinstance(image, str) and image}
+        missing = sorted(name for name in names if any(self._stored(name, width) is None for width in self.widths))
+        if not missing or not self._may_fetch():
+            return 0
+
+        def fetch(name):
+            try:
+                self._download(name)
+                return True
+            except Exception as exc:  # one broken file must not stop the batch
+                print(f"Thumbnail of {name} not fetched: {exc}", file=sys.stderr)
+                return False
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            return sum(pool.map(fetch, missing))
+
+    def thumbnails(self, images, width=None, workers=DEFAULT_WORKERS):
+        """Return the thumbnail paths of ``images`` in order (None where there is none)."""
+        images = list(images)
+        self.prefetch(images, workers)
+        width = self._width(width)
+        return [
+            self._stored(commons_file_name(image), width) if isinstance(image, str) and image else None
+            for image in images
+        ]
+
+
+_stores = {}
+
+
+def get_store(source=None):
+    key = source if isinstance(source, str) or source is None else id(source)
+    if key not in _stores:
+        _stores[key] = ThumbnailStore(source)
+    return _stores[key]
+
+
+def contact_sheet(df, image="img", label="itemLabel", width=160, columns=6, title=None, store=None, limit=None):
+    """Draw the thumbnails of the rows of ``df`` with an image in a grid and return the figure.
+
+    Returns None when none of the images has a thumbnail.
+    """
+    import matplotlib.pyplot as plt
+    from PIL import Image
+
+    rows = df[df[image].notna()]
+    if limit is not None:
+        rows = rows.head(limit)
+    store = store or get_store()
+    paths = store.thumbnails(rows[image].astype(str), width)
+    cells = [(path, text) for path, text in zip(paths, rows[label].astype(str)) if path is not None]
+    if not cells:
+        return None
+    grid_rows = max(1, -(-len(cells) // columns))
+    fig, axes = plt.subplots(grid_rows, columns, figsize=(2.2 * columns, 2.4 * grid_rows), squeeze=False)
+    for ax in axes.flat:
+        ax.set_axis_off()
+    for ax, (path, text) in zip(axes.flat, cells):
+        with Image.open(path) as thumbnail:
+            ax.imshow(thumbnail)
+        ax.set_title(text[:28], fontsize=8)
+    if title:
+        fig.suptitle(title)
+    fig.tight_layout()
+    return fig
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Manage the local Commons thumbnail store.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    prefetch = commands.add_parser("prefetch", help="download the thumbnails of P18 values or Commons file names")
+    prefetch.add_argument("images", nargs="+")
+    prefetch.add_argument("--source", help="directory with original images instead of Commons")
+    prefetch.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+    args = parser.parse_args(argv)
+
+    store = ThumbnailStore(args.source, fetch=True)
+    fetched = store.prefetch(args.images, args.workers)
+    print(f"{fetched} of {len(set(args.images))} images fetched into {store.path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
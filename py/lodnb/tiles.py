@@ -0,0 +1,273 @@
+"""Offline basemap tiles shared by all map scripts.
+
+Tiles are kept per provider in an MBTiles (SQLite) file below the shared
+cache directory and are only downloaded when missing. Stitched basemap
+images are cached as well, both in memory and on disk, keyed by provider,
+zoom and tile range, so drawing several maps over the same extent (as
+wikidata-ogham-sites-map.py does) decodes and stitches the tiles once.
+
+:func:`add_basemap` is a drop-in replacement for ``contextily.add_basemap``
+for axes in Web Mercator (EPSG:3857). With ``LODNB_OFFLINE=1`` only stored
+tiles are used and rendering never touches the tile server.
+
+Prefetch tiles for a bounding box (lon/lat) and zoom range::
+
+    python -m lodnb.tiles prefetch --bbox -10.7 51.4 -5.4 55.5 --zoom 5 9
+
+The OpenStreetMap tile usage policy forbids bulk downloads, so a prefetch
+above zoom :data:`PREFETCH_MAX_ZOOM` or of more than
+:data:`PREFETCH_MAX_TILES` missing tiles is refused unless forced
+(``--force``, for providers that allow it), and OpenStreetMap tiles are
+never fetched with more than two threads.
+"""
+import argparse
+import hashlib
+import io
+import math
+import os
+import sqlite3
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import requests
+
+from lodnb.cache import OfflineCacheMiss, cache_dir, is_offline
+from lodnb.sparql import USER_AGENT
+from lodnb.trace import current, traced
+
+OSM_MAPNIK = "https://tile.openstreetmap.org/{z}/{x}/{y}.png"
+TILE_SIZE = 256
+EARTH_RADIUS = 6378137.0
+ORIGIN = math.pi * EARTH_RADIUS
+MAX_ZOOM = 19
+# Prefetch limits (see the OpenStreetMap tile usage policy).
+PREFETCH_MAX_ZOOM = 13
+PREFETCH_MAX_TILES = 1000
+OSM_MAX_WORKERS = 2
+
+
+def _provider_url(source):
+    """Return the URL template for a contextily/xyzservices provider or a template string."""
+    if source is None:
+        return OSM_MAPNIK
+    if isinstance(source, str):
+        return source
+    return source.build_url(x="{x}", y="{y}", z="{z}")
+
+
+def _provider_name(url):
+    return hashlib.sha1(url.encode("utf-8")).hexdigest()[:12]
+
+
+class TileStore:
+    """Tiles of one provider in an MBTiles file, downloaded on demand."""
+
+    def __init__(self, source=None, path=None, timeout=30):
+        self.url = _provider_url(source)
+        self.path = path or os.path.join(cache_dir("tiles"), _provider_name(self.url) + ".mbtiles")
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        # Created here rather than on first download: prefetch threads share it.
+        self._session = requests.Session()
+        self._session.headers["User-Agent"] = USER_AGENT
+        self._db = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+        self._db.executescript(
+            "CREATE TABLE IF NOT EXISTS metadata (name TEXT PRIMARY KEY, value TEXT);"
+            "CREATE TABLE IF NOT EXISTS tiles (zoom_level INTEGER, tile_column INTEGER,"
+            " tile_row INTEGER, tile_data BLOB);"
+            "CREATE UNIQUE INDEX IF NOT EXISTS tile_index ON tiles (zoom_level, tile_column, tile_row);"
+        )
+        self._db.executemany(
+            "INSERT OR IGNORE INTO metadata VALUES (?, ?)",
+            [("name", self.url), ("format", "png"), ("type", "baselayer")],
+        )
+        self._db.commit()
+
+    def _stored(self, z, x, y):
+        # MBTiles rows follow the TMS scheme, counted from the bottom.
+        with self._lock:
+            row = self._db.execute(
+                "SELECT tile_data FROM tiles WHERE zoom_level = ? AND tile_column = ? AND tile_row = ?",
+                (z, x, (1 << z) - 1 - y),
+            ).fetchone()
+        return row[0] if row else None
+
+    def _download(self, z, x, y):
+        response = self._session.get(self.url.format(x=x, y=y, z=z), timeout=self.timeout)
+        response.raise_for_status()
+        data = response.content
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO tiles VALUES (?, ?, ?, ?)",
+                (z, x, (1 << z) - 1 - y, sqlite3.Binary(data)),
+            )
+            self._db.commit()
+        return data
+
+    def has(self, z, x, y):
+        return self._stored(z, x, y) is not None
+
+    def get(self, z, x, y):
+        """Return the encoded tile ``z/x/y``, downloading it unless offline."""
+        data = self._stored(z, x, y)
+        if data is not None:
+            current().add(hits=1)
+            return data
+        if is_offline():
+            raise OfflineCacheMiss(f"Tile {z}/{x}/{y} is not in {self.path}")
+        data = self._download(z, x, y)
+        current().add(misses=1, bytes=len(data))
+        return data
+
+    def prefetch(self, tiles, workers=2, force=False):
+        """Download all missing ``(z, x, y)`` tiles; returns the number fetched.
+
+        Raises ValueError instead of downloading tiles above
+        :data:`PREFETCH_MAX_ZOOM` or more than :data:`PREFETCH_MAX_TILES`
+        tiles, unless ``force`` is set.
+        """
+        missing = [tile for tile in tiles if not self.has(*tile)]
+        if not force:
+            zoom = max((z for z, _, _ in missing), default=0)
+            if zoom > PREFETCH_MAX_ZOOM:
+                raise ValueError(f"Refusing to prefetch tiles at zoom {zoom} (above {PREFETCH_MAX_ZOOM}); "
+                                 "bulk downloads break the tile usage policy, pass force=True if allowed")
+            if len(missing) > PREFETCH_MAX_TILES:
+                raise ValueError(f"Refusing to prefetch {len(missing)} tiles (more than {PREFETCH_MAX_TILES}); "
+                                 "bulk downloads break the tile usage policy, pass force=True if allowed")
+        if self.url == OSM_MAPNIK:
+            workers = min(workers, OSM_MAX_WORKERS)
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            list(pool.map(lambda tile: self._download(*tile), missing))
+        return len(missing)
+
+
+def tile_range(bounds, z):
+    """Return the inclusive tile index ranges covering Web Mercator ``bounds``."""
+    west, south, east, north = bounds
+    n = 1 << z
+    scale = n / (2 * ORIGIN)
+
+    def clamp(value):
+        return min(max(int(math.floor(value)), 0), n - 1)
+
+    return (
+        clamp((west + ORIGIN) * scale), clamp((east + ORIGIN) * scale),
+        clamp((ORIGIN - north) * scale), clamp((ORIGIN - south) * scale),
+    )
+
+
+def lonlat_tile_range(bounds, z):
+    """Like :func:`tile_range` for ``(west, south, east, north)`` in degrees."""
+    west, south, east, north = bounds
+
+    def mercator(lon, lat):
+        lat = max(min(lat, 85.0511), -85.0511)
+        return (
+            math.radians(lon) * EARTH_RADIUS,
+            math.log(math.tan(math.pi / 4 + math.radians(lat) / 2)) * EARTH_RADIUS,
+        )
+
+    x0, y0 = mercator(west, south)
+    x1, y1 = mercator(east, north)
+    return tile_range((x0, y0, x1, y1), z)
+
+
+def auto_zoom(bounds, width_px):
+    """Pick the zoom whose tiles roughly match ``width_px`` across ``bounds``."""
+    width = max(bounds[2] - bounds[0], 1.0)
+    zoom = math.log2(width_px / TILE_SIZE * 2 * ORIGIN / width)
+    return int(min(max(round(zoom), 0), MAX_ZOOM))
+
+
+_stores = {}
+_images = {}
+
+
+def get_store(source=None):
+    url = _provider_url(source)
+    if url not in _stores:
+        _stores[url] = TileStore(url)
+    return _stores[url]
+
+
+def basemap_image(bounds, zoom, source=None):
+    """Return ``(image, extent)`` of the stitched tiles covering ``bounds`` at ``zoom``."""
+    from PIL import Image
+
+    store = get_store(source)
+    x0, x1, y0, y1 = tile_range(bounds, zoom)
+    key = (store.url, zoom, x0, x1, y0, y1)
+    if key in _images:
+        return _images[key]
+
+    n = 1 << zoom
+    size = 2 * ORIGIN / n
+    extent = (-ORIGIN + x0 * size, -ORIGIN + (x1 + 1) * size, ORIGIN - (y1 + 1) * size, ORIGIN - y0 * size)
+    path = os.path.join(
+        cache_dir("tiles", "stitched"),
+        hashlib.sha1(repr(key).encode("utf-8")).hexdigest() + ".npz",
+    )
+    if os.path.exists(path):
+        image = np.load(path)["image"]
+    else:
+        image = np.zeros(((y1 - y0 + 1) * TILE_SIZE, (x1 - x0 + 1) * TILE_SIZE, 3), dtype=np.uint8)
+        for x in range(x0, x1 + 1):
+            for y in range(y0, y1 + 1):
+                tile = Image.open(io.BytesIO(store.get(zoom, x, y))).convert("RGB")
+                if tile.size != (TILE_SIZE, TILE_SIZE):
+                    tile = tile.resize((TILE_SIZE, TILE_SIZE))
+                top, left = (y - y0) * TILE_SIZE, (x - x0) * TILE_SIZE
+                image[top:top + TILE_SIZE, left:left + TILE_SIZE] = np.asarray(tile)
+        np.savez_compressed(path, image=image)
+    _images[key] = (image, extent)
+    return image, extent
+
+
+@traced("basemap")
+def add_basemap(ax, zoom=None, source=None, interpolation="bilinear", **kwargs):
+    """Draw the basemap behind the current extent of ``ax`` (EPSG:3857).
+
+    The basemap is drawn at zorder -1 (unless ``zorder`` is given), below
+    everything drawn on the map before or after it.
+    """
+    xmin, xmax, ymin, ymax = ax.axis()
+    bounds = (xmin, ymin, xmax, ymax)
+    if zoom is None:
+        zoom = auto_zoom(bounds, ax.get_window_extent().width)
+    image, extent = basemap_image(bounds, zoom, source)
+    kwargs.setdefault("zorder", -1)
+    ax.imshow(image, extent=extent, interpolation=interpolation, **kwargs)
+    ax.axis((xmin, xmax, ymin, ymax))
+    return ax
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Manage the local basemap tile store.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    prefetch = commands.add_parser("prefetch", help="download all tiles of a bounding box and zoom range")
+    prefetch.add_argument("--bbox", nargs=4, type=float, required=True, metavar=("WEST", "SOUTH", "EAST", "NORTH"))
+    prefetch.add_argument("--zoom", nargs=2, type=int, required=True, metavar=("MIN", "MAX"))
+    prefetch.add_argument("--source", default=OSM_MAPNIK, help="tile URL template")
+    prefetch.add_argument("--workers", type=int, default=2)
+    prefetch.add_argument("--force", action="store_true",
+                          help=f"allow zooms above {PREFETCH_MAX_ZOOM} and more than {PREFETCH_MAX_TILES} tiles")
+    args = parser.parse_args(argv)
+
+    store = get_store(args.source)
+    tiles = []
+    for z in range(args.zoom[0], args.zoom[1] + 1):
+        x0, x1, y0, y1 = lonlat_tile_range(args.bbox, z)
+        tiles.extend((z, x, y) for x in range(x0, x1 + 1) for y in range(y0, y1 + 1))
+    try:
+        fetched = store.prefetch(tiles, args.workers, force=args.force)
+    except ValueError as error:
+        parser.error(str(error).replace("pass force=True", "use --force"))
+    print(f"{fetched} of {len(tiles)} tiles downloaded into {store.path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,273 @@
+"""Per-stage timing and memory traces of the analysis pipeline.
+
+The stages every script shares are wrapped in spans: ``fetch`` (endpoint or
+cache, with cache hits/misses, the bytes transferred on misses and the
+bytes read from the cache on hits as ``cached_bytes``), ``frame`` (SPARQL JSON to
+DataFrame, with rows), ``geometry`` and ``reproject`` (with rows),
+``layer`` (boundary layers), ``basemap`` (tiles, with hits and downloads)
+and ``render`` (one saved figure). Each span records its wall time and the
+peak resident set size of the process when it ended.
+
+Tracing is off unless ``LODNB_TRACE`` is set:
+
+- ``LODNB_TRACE=1`` prints a summary table per stage to stderr at exit;
+- ``LODNB_TRACE=path`` also appends every span to ``path`` as one JSON
+  line; with ``LODNB_TRACE_FORMAT=otlp`` each line is an OpenTelemetry
+  OTLP/JSON ``resourceSpans`` document, as read by the collector's
+  ``otlpjsonfile`` receiver.
+
+Lines are appended as spans end, so the worker processes of
+:mod:`lodnb.render` and the runner can share one file. Summarize it with::
+
+    python -m lodnb.trace summary trace.jsonl
+"""
+import argparse
+import atexit
+import contextlib
+import functools
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+SUMMED = ("bytes", "cached_bytes", "rows", "hits", "misses")
+
+_local = threading.local()
+_lock = threading.Lock()
+_records = []
+_trace_id = uuid.uuid4().hex
+
+
+def enabled():
+    return os.environ.get("LODNB_TRACE", "") not in ("", "0")
+
+
+def peak_rss():
+    """Return the peak resident set size of this process in bytes, or None if unknown."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+class Span:
+    """One timed stage; numeric attributes set with :meth:`add` accumulate."""
+
+    def __init__(self, name, attributes):
+        self.name = name
+        self.attributes = attributes
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = None
+        self.start = time.time()
+        self._started = time.perf_counter()
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def add(self, **counts):
+        for key, value in counts.items():
+            self.attributes[key] = self.attributes.get(key, 0) + value
+
+    def record(self):
+        return {
+            "trace": _trace_id,
+            "span": self.span_id,
+            "parent": self.parent_id,
+            "name": self.name,
+            "start": self.start,
+            "seconds": time.perf_counter() - self._started,
+            "peak_rss": peak_rss(),
+            "pid": os.getpid(),
+            **self.attributes,
+        }
+
+
+class _NoSpan:
+    def set(self, **attributes):
+        pass
+
+    def add(self, **counts):
+        pass
+
+
+_NO_SPAN = _NoSpan()
+
+
+def _stack():
+    if not hasattr(_local, "stack"):
+        _local.stack = []
+    return _local.stack
+
+
+@contextlib.contextmanager
+def span(name, **attributes):
+    """Time the stage ``name``; yields its :class:`Span` (a no-op when tracing is off)."""
+    if not enabled():
+        yield _NO_SPAN
+        return
+    stage = Span(name, attributes)
+    stack = _stack()
+    stage.parent_id = stack[-1].span_id if stack else None
+    stack.append(stage)
+    try:
+        yield stage
+    except BaseException as exc:
+        stage.set(error=type(exc).__name__)
+        raise
+    finally:
+        stack.pop()
+        _emit(stage.record())
+
+
+def current():
+    """Return the innermost open span of this thread (a no-op span if there is none)."""
+    stack = _stack() if enabled() else None
+    return stack[-1] if stack else _NO_SPAN
+
+
+def traced(name, rows=False):
+    """Decorate a function so every call is a ``name`` span; with ``rows`` the result length is recorded."""
+
+    def decorate(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not enabled():
+                return function(*args, **kwargs)
+            with span(name) as stage:
+                result = function(*args, **kwargs)
+                if rows:
+                    stage.set(rows=len(result))
+                return result
+
+        return wrapper
+
+    return decorate
+
+
+def _otlp_value(value):
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def to_otlp(record):
+    """Return ``record`` as an OTLP/JSON ``resourceSpans`` document with one span."""
+    attributes = {key: value for key, value in record.items()
+                  if key not in ("trace", "span", "parent", "name", "start", "seconds", "pid") and value is not None}
+    start = int(record["start"] * 1e9)
+    otlp_span = {
+        "traceId": record["trace"],
+        "spanId": record["span"],
+        "name": record["name"],
+        "kind": 1,
+        "startTimeUnixNano": str(start),
+        "endTimeUnixNano": str(start + int(record["seconds"] * 1e9)),
+        "attributes": [{"key": key, "value": _otlp_value(value)} for key, value in attributes.items()],
+    }
+    if record["parent"]:
+        otlp_span["parentSpanId"] = record["parent"]
+    resource_attributes = [
+        {"key": "service.name", "value": {"stringValue": "lodnb"}},
+        {"key": "process.pid", "value": {"intValue": str(record["pid"])}},
+    ]
+    return {"resourceSpans": [{
+        "resource": {"attributes": resource_attributes},
+        "scopeSpans": [{"scope": {"name": "lodnb"}, "spans": [otlp_span]}],
+    }]}
+
+
+def from_otlp(document):
+    """Yield the records of an OTLP/JSON document written by :func:`to_otlp`."""
+    for resource_spans in document.get("resourceSpans", []):
+        for scope_spans in resource_spans.get("scopeSpans", []):
+            for otlp_span in scope_spans.get("spans", []):
+                record = {
+                    "name": otlp_span["name"],
+                    "seconds": (int(otlp_span["endTimeUnixNano"]) - int(otlp_span["startTimeUnixNano"])) / 1e9,
+                }
+                for attribute in otlp_span.get("attributes", []):
+                    value = next(iter(attribute["value"].values()))
+                    record[attribute["key"]] = int(value) if "intValue" in attribute["value"] else value
+                yield record
+
+
+def _emit(record):
+    path = os.environ.get("LODNB_TRACE", "")
+    with _lock:
+        if not _records:
+            atexit.register(_print_summary)
+        _records.append(record)
+        if path not in ("", "0", "1"):
+            line = to_otlp(record) if os.environ.get("LODNB_TRACE_FORMAT") == "otlp" else record
+            with open(path, "a", encoding="utf-8") as handle:
+                handle.write(json.dumps(line) + "\n")
+
+
+def summarize(records):
+    """Return one row per stage: calls, seconds, summed bytes/cached bytes/rows/hits/misses and the highest peak RSS."""
+    stages = {}
+    for record in records:
+        stage = stages.setdefault(record["name"], {"calls": 0, "seconds": 0.0, "peak_rss": None,
+                                                   **{key: 0 for key in SUMMED}})
+        stage["calls"] += 1
+        stage["seconds"] += record["seconds"]
+        for key in SUMMED:
+            stage[key] += record.get(key) or 0
+        if record.get("peak_rss") is not None:
+            stage["peak_rss"] = max(stage["peak_rss"] or 0, record["peak_rss"])
+    return stages
+
+
+def format_summary(records):
+    lines = [f"{'stage':<10} {'calls':>6} {'wall (s)':>9} {'MB':>9} {'cached MB':>10} {'rows':>9} {'peak RSS MB':>12} "
+             f"{'hits':>6} {'misses':>7}"]
+    for name, stage in sorted(summarize(records).items(), key=lambda item: -item[1]["seconds"]):
+        rss = f"{stage['peak_rss'] / 2 ** 20:.0f}" if stage["peak_rss"] is not None else "-"
+        lines.append(
+            f"{name:<10} {stage['calls']:>6} {stage['seconds']:>9.3f} {stage['bytes'] / 2 ** 20:>9.2f} "
+            f"{stage['cached_bytes'] / 2 ** 20:>10.2f} {stage['rows']:>9} {rss:>12} {stage['hits']:>6} {stage['misses']:>7}"
+        )
+    return "\n".join(lines)
+
+
+def _print_summary():
+    with _lock:
+        records = list(_records)
+    if records:
+        print(format_summary(records), file=sys.stderr)
+
+
+def read_trace(path):
+    """Return the records of a trace file in either format."""
+    records = []
+    with open(path, encoding="utf-8") as handle:
+        for line in handle:
+            if line.strip():
+                document = json.loads(line)
+                records.extend(from_otlp(document) if "resourceSpans" in document else [document])
+    return records
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Summarize lodnb trace files.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    summary = commands.add_parser("summary", help="print the per-stage summary of trace files")
+    summary.add_argument("paths", nargs="+")
+    args = parser.parse_args(argv)
+    print(format_summary([record for path in args.paths for record in read_trace(path)]))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
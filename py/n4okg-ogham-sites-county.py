@@ -1,59 +1,45 @@
-from SPARQLWrapper import SPARQLWrapper, JSON
-import pandas as pd
+import os
 import matplotlib.pyplot as plt
+from lodnb.aggregate import share_with_others
+from lodnb.geo import points_frame, reproject
+from lodnb.regions import assign_regions
+from lodnb.sparql import NFDI4OBJECTS, queryFrame
 
-def querySparql(query):
-    sparql = SPARQLWrapper("https://graph.nfdi4objects.net/api/sparql")
-    sparql.setQuery(query)
-    sparql.setReturnFormat(JSON)
-    results = sparql.queryAndConvert()
-    return results['results']['bindings']
+# County boundaries (one feature per county, named in NAME)
+geojson_file = os.path.join(os.path.dirname(__file__), "gs_ireland_island.geojson")
 
-# SPARQL Query for Samian Ware Kiln Sites
+# SPARQL Query: stone count and location per Ogham site
 oghamQuery = """
 PREFIX oghamonto: <http://ontology.ogham.link/>
-PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
-SELECT ?county (count(distinct ?stone) as ?count) WHERE {
+SELECT ?item ?geo (count(distinct ?stone) as ?count) WHERE {
  ?item <http://www.w3.org/1999/02/22-rdf-syntax-ns#type> <http://ontology.ogham.link/OghamSite> .
- ?item oghamonto:within ?c .
- ?c a oghamonto:County .
- ?c rdfs:label ?county .
+ ?item <http://www.opengis.net/ont/geosparql#hasGeometry> ?item_geom .
+ ?item_geom <http://www.opengis.net/ont/geosparql#asWKT> ?geo .
  ?stone oghamonto:disclosedAt ?item .
  ?stone a oghamonto:OghamStone_CIIC .
-} GROUP BY ?county ORDER BY DESC(?count)
+} GROUP BY ?item ?geo
 """
 
-# Fetch data using the SPARQL query
-sparql_results = querySparql(oghamQuery)
+# Fetch the SPARQL results as a typed DataFrame (?count is an xsd:integer)
+sites = queryFrame(oghamQuery, NFDI4OBJECTS)
 
-# Convert SPARQL JSON results into a DataFrame
-data = []
-for result in sparql_results:
-    data.append({
-        "county": result.get("county", {}).get("value", None),
-        "count": int(result.get("count", {}).get("value", 0))
-    })
-
-df = pd.DataFrame(data)
+# Assign each site to its county locally and sum the stones per county. County names are the
+# NAME values of the boundary file; sites up to 10 km offshore (measured in Irish Transverse
+# Mercator) go to the nearest county.
+sites = reproject(points_frame(sites, "geo"))
+sites["county"] = assign_regions(sites, geojson_file, "NAME", max_distance=10000, distance_crs="EPSG:2157")
+df = (
+    sites.groupby("county", observed=True)["count"].sum()
+    .sort_values(ascending=False).reset_index()
+)
+df["county"] = df["county"].astype(str)
 
 # Check if DataFrame is populated
 if df.empty:
     print("No data retrieved from the query.")
 else:
-    # Calculate the total number of stones.
-    total_count = df["count"].sum()
-    
-    # Compute the percentage for each county.
-    df["percentage"] = df["count"] / total_count * 100
-
-    # Separate counties with a percentage >= 3% from those with less than 3%.
-    major_df = df[df["percentage"] >= 3].copy()
-    minor_df = df[df["percentage"] < 3].copy()
-
-    # If there are counties with less than 3%, combine them into an 'Other' category.
-    if not minor_df.empty:
-        other_count = minor_df["count"].sum()
-        major_df = pd.concat([major_df, pd.DataFrame([{"county": "Other", "count": other_count}])], ignore_index=True)
+    # Keep counties with a share of at least 3% and combine the rest into an 'Other' category.
+    major_df = share_with_others(df, "county", "count", 3, other_label="Other", inclusive=True)
     
     # Optional: Sort the categories by count in descending order.
     major_df = major_df.sort_values("count", ascending=False)
@@ -1,16 +1,11 @@
-from SPARQLWrapper import SPARQLWrapper, TURTLE
-import pandas as pd
-from rdflib import Graph, Namespace
-from rdflib.namespace import RDF, RDFS
+import io
 import matplotlib.pyplot as plt
+from lodnb.rdf import read_subjects
+from lodnb.sparql import TURTLE, get_client
 
 # Function to query Solid Pod and retrieve data in TURTLE format
 def querySolidPod(sparql_endpoint, query):
-    sparql = SPARQLWrapper(sparql_endpoint)
-    sparql.setQuery(query)
-    sparql.setReturnFormat(TURTLE)  # Request Turtle format
-    results = sparql.query().convert()
-    return results
+    return get_client(sparql_endpoint).fetch(query, TURTLE)
 
 # SPARQL Query
 solid_pod_query = """
@@ -28,24 +23,12 @@ sparql_endpoint = "https://fuzzy-sl.solidweb.org/campanian-ignimbrite-geo/ci_ful
 # Query the endpoint
 turtle_data = querySolidPod(sparql_endpoint, solid_pod_query)
 
-# Parse Turtle data with rdflib
-g = Graph()
-g.parse(data=turtle_data, format="turtle")
+# Ontology namespace of the Site class and its properties
+site_ns = "http://fuzzy-sl.squirrel.link/ontology/"
 
-# Extract namespaces
-site_ns = Namespace("http://fuzzy-sl.squirrel.link/ontology/")
-
-# Process RDF data into a DataFrame
-data = []
-for s, p, o in g:
-    if (p == RDF.type) and (o == site_ns.Site):
-        # Extract related properties
-        spatial_type = g.value(s, site_ns.spatialType)
-        data.append({
-            "spatialType": str(spatial_type).replace("http://fuzzy-sl.squirrel.link/ontology/", "") if spatial_type else "Unknown"
-        })
-
-df = pd.DataFrame(data)
+# Stream the Turtle once, keeping only the spatial type of every Site
+df = read_subjects(io.BytesIO(turtle_data), site_ns + "Site", {"spatialType": site_ns + "spatialType"})
+df["spatialType"] = df["spatialType"].astype(object).str.replace(site_ns, "", regex=False).fillna("Unknown")
 
 # Check if DataFrame is populated
 if not df.empty and 'spatialType' in df:
@@ -0,0 +1,23 @@
+import os
+import sys
+
+import pytest
+
+# The tests import lodnb the way the scripts do, from py/.
+PY_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PY_DIR not in sys.path:
+    sys.path.insert(0, PY_DIR)
+
+
+@pytest.fixture(autouse=True)
+def isolated_cache(tmp_path, monkeypatch):
+    """Give every test its own cache directory and the default switches."""
+    monkeypatch.setenv("LODNB_CACHE_DIR", str(tmp_path / "cache"))
+    for name in ("LODNB_OFFLINE", "LODNB_CONSOLIDATE", "LODNB_PLAN", "LODNB_INCREMENTAL", "LODNB_LOCAL",
+                 "LODNB_TRACE", "LODNB_SNAPSHOTS"):
+        monkeypatch.delenv(name, raising=False)
+    # Process-wide stores are opened again below the test's cache directory.
+    from lodnb import cache, snapshots
+
+    monkeypatch.setattr(cache, "_default_cache", None)
+    monkeypatch.setattr(snapshots, "_store", None)
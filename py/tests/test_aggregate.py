@@ -0,0 +1,60 @@
+import pytest
+
+pd = pytest.importorskip("pandas")
+
+from lodnb.aggregate import count_by, grouped_bar, share_with_others, top_k_per_group  # noqa: E402
+
+
+@pytest.fixture
+def pokemon():
+    return pd.DataFrame({
+        "type": pd.Series(["fire", "water", "fire", "grass", "water", "fire", "water"], dtype="category"),
+        "name": ["Charmander", "Squirtle", "Vulpix", "Oddish", "Psyduck", "Ponyta", "Poliwag"],
+        "mass": [8.5, 9.0, 9.9, 5.4, 19.6, 30.0, 12.4],
+    })
+
+
+def test_top_k_matches_groupby_nlargest(pokemon):
+    groups = pokemon.groupby("type", observed=True)
+    expected = pd.concat([rows.nlargest(2, "mass") for _, rows in groups], ignore_index=True)
+    result = top_k_per_group(pokemon, "type", "mass", 2)
+    pd.testing.assert_frame_equal(result, expected)
+    assert result["name"].tolist() == ["Ponyta", "Vulpix", "Oddish", "Psyduck", "Poliwag"]
+
+
+def test_top_k_keeps_ties_in_original_order():
+    df = pd.DataFrame({"g": ["a", "a", "a", "b"], "v": [1, 2, 2, 3], "id": [0, 1, 2, 3]})
+    assert top_k_per_group(df, "g", "v", 1)["id"].tolist() == [1, 3]
+    assert top_k_per_group(df, "g", "v", 5)["id"].tolist() == [1, 2, 0, 3]
+
+
+def test_count_by(pokemon):
+    counts = count_by(pokemon, ["type"])
+    assert dict(zip(counts["type"], counts["count"])) == {"fire": 3, "grass": 1, "water": 3}
+
+
+def test_share_with_others():
+    df = pd.DataFrame({"county": pd.Series(["Kerry", "Cork", "Mayo", "Clare"], dtype="category"),
+                       "count": [60, 30, 7, 3]})
+    shares = share_with_others(df, "county", threshold=5)
+    assert shares["county"].tolist() == ["Kerry", "Cork", "Mayo", "Others"]
+    assert shares["count"].tolist() == [60, 30, 7, 3]
+    assert shares["percentage"].tolist() == pytest.approx([60, 30, 7, 3])
+    assert share_with_others(df, "county", threshold=7)["county"].tolist() == ["Kerry", "Cork", "Others"]
+    assert share_with_others(df, "county", threshold=7, inclusive=True)["county"].tolist() == \
+        ["Kerry", "Cork", "Mayo", "Others"]
+    assert "Others" not in share_with_others(df, "county", threshold=1)["county"].tolist()
+
+
+def test_grouped_bar_draws_one_container(pokemon):
+    matplotlib = pytest.importorskip("matplotlib")
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    colors = {"fire": "red", "water": "blue", "grass": "green"}
+    fig, ax = plt.subplots()
+    handles = grouped_bar(ax, pokemon, "name", "mass", "type", colors)
+    assert len(ax.containers) == 1 and len(ax.patches) == len(pokemon)
+    assert [handle.get_label() for handle in handles] == ["fire", "water", "grass"]
+    assert matplotlib.colors.to_hex(ax.patches[1].get_facecolor()) == "#0000ff"
+    plt.close(fig)
@@ -0,0 +1,71 @@
+import io
+import json
+
+import pytest
+
+pytest.importorskip("requests")
+pytest.importorskip("matplotlib")
+pytest.importorskip("geopandas")
+pytest.importorskip("scipy")
+pytest.importorskip("rdflib")
+
+from lodnb import bench  # noqa: E402
+from lodnb.bench import DATASETS, MockEndpoint, compare, run_pipeline  # noqa: E402
+
+
+def test_mock_endpoint_serves_every_dataset():
+    import requests
+
+    with MockEndpoint() as endpoint:
+        for dataset, (_, content_type, stages, _) in DATASETS.items():
+            response = requests.post(endpoint.url(dataset, 50), data={"query": "SELECT * {}"})
+            assert response.headers["Content-Type"] == content_type
+            assert response.content == endpoint.body(dataset, 50)
+            assert set(run_pipeline(endpoint, dataset, 50)) == set(stages)
+        assert requests.get(endpoint.url("unknown", 50)).status_code == 404
+        assert requests.get(endpoint.url("ogham", 50) + "x").status_code == 404
+
+
+def test_synthetic_results_have_the_requested_rows():
+    from lodnb.frames import read_results
+    from lodnb.rdf import read_subjects
+
+    with MockEndpoint(seed=1) as endpoint:
+        frame = read_results(io.BytesIO(endpoint.body("ogham", 120)))
+        assert len(frame) == 120 and frame["geo"].str.startswith("Point(").all()
+        sites = read_subjects(endpoint.body("solidpod", 30), bench.SITE_NS + "Site",
+                              {"spatialType": bench.SITE_NS + "spatialType"})
+        assert len(sites) == 30 and sites["spatialType"].notna().all()
+
+
+def _document(commit, seconds):
+    return {"commit": commit, "dirty": False, "created": f"2024-01-0{len(commit)}T00:00:00",
+            "results": [{"dataset": "ogham", "rows": 1000, "stage": stage, "seconds": value}
+                        for stage, value in seconds.items()]}
+
+
+def test_compare_flags_only_real_regressions():
+    base = _document("a", {"fetch": 1.0, "frame": 0.001, "kde": 0.5})
+    head = _document("bb", {"fetch": 1.1, "frame": 0.005, "kde": 0.7, "render": 1.0})
+    flagged = {stage: regressed for _, _, stage, _, _, regressed in compare(base, head)}
+    # Stages below MIN_SECONDS are noise; stages missing from the base are not compared.
+    assert flagged == {"fetch": False, "frame": False, "kde": True}
+
+
+def test_run_and_compare_from_the_command_line(tmp_path, monkeypatch, capsys):
+    monkeypatch.setattr(bench, "_git", lambda *args: "0123456789abcdef" if args[0] == "rev-parse" else "")
+    results = str(tmp_path / "benchmarks")
+    assert bench.main(["--results-dir", results, "run", "--datasets", "pokemon", "--sizes", "100"]) == 0
+    saved = list((tmp_path / "benchmarks").iterdir())
+    assert len(saved) == 1 and saved[0].name.endswith("-0123456789.json")
+    document = json.loads(saved[0].read_text(encoding="utf-8"))
+    assert {record["stage"] for record in document["results"]} == set(DATASETS["pokemon"][2])
+
+    slower = dict(document, created="9999-01-01T00:00:00",
+                  results=[dict(record, seconds=record["seconds"] * 10 + 1) for record in document["results"]])
+    (tmp_path / "benchmarks" / "9999-slower.json").write_text(json.dumps(slower), encoding="utf-8")
+    capsys.readouterr()
+    assert bench.main(["--results-dir", results, "compare"]) == 1
+    assert "slower" in capsys.readouterr().out
+    assert bench.main(["--results-dir", results, "compare", str(tmp_path / "benchmarks" / "9999-slower.json"),
+                       str(saved[0])]) == 0
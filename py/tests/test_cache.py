@@ -0,0 +1,91 @@
+import os
+import zlib
+
+import pytest
+
+from lodnb import cache
+from lodnb.cache import ResultCache, cache_key, get_cache, normalize_query
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cache, "time", clock)
+    return clock
+
+
+def test_normalize_query_keeps_iris_and_strings():
+    query = """
+    # Ogham stones
+    SELECT ?item   WHERE {
+      ?item rdfs:label "two  spaces # not a comment" .   # trailing
+      ?item <http://example.org/a#b> '''long
+    text''' .
+    }
+    """
+    assert normalize_query(query) == (
+        "SELECT ?item WHERE { ?item rdfs:label \"two  spaces # not a comment\" . "
+        "?item <http://example.org/a#b> '''long\n    text''' . }"
+    )
+
+
+def test_cache_key_ignores_layout_only():
+    endpoint, accept = "https://query.wikidata.org/sparql", "application/sparql-results+json"
+    key = cache_key(endpoint, "SELECT ?s WHERE { ?s ?p ?o }", accept)
+    assert cache_key(endpoint, "SELECT ?s\nWHERE {?s ?p ?o}  # all", accept) != key
+    assert cache_key(endpoint, "SELECT  ?s WHERE {  ?s ?p ?o }\n# all", accept) == key
+    assert cache_key(endpoint, "SELECT ?s WHERE { ?s ?p ?o }", "text/turtle") != key
+    assert cache_key("https://example.org/sparql", "SELECT ?s WHERE { ?s ?p ?o }", accept) != key
+
+
+def test_entries_expire_after_the_ttl(tmp_path, clock):
+    store = ResultCache(str(tmp_path / "sparql.sqlite"), ttl=60, max_bytes=10 ** 6)
+    store.put("k", "endpoint", b"body")
+    clock.now += 60
+    assert store.get("k") == b"body"
+    clock.now += 1
+    assert store.get("k") is None
+    assert store.get("k", allow_stale=True) == b"body"
+    assert store.get("missing", allow_stale=True) is None
+
+
+def test_negative_ttl_never_expires(tmp_path, clock):
+    store = ResultCache(str(tmp_path / "sparql.sqlite"), ttl=-1, max_bytes=10 ** 6)
+    store.put("k", "endpoint", b"body")
+    clock.now += 10 ** 9
+    assert store.get("k") == b"body"
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path, clock):
+    body = os.urandom(1000)  # incompressible, so each entry is just over 1000 bytes
+    size = len(zlib.compress(body, 6))
+    store = ResultCache(str(tmp_path / "sparql.sqlite"), ttl=-1, max_bytes=2 * size)
+    store.put("a", "endpoint", body)
+    clock.now += 1
+    store.put("b", "endpoint", body)
+    clock.now += 1
+    assert store.get("a") == body
+    clock.now += 1
+    store.put("c", "endpoint", body)
+    assert store.get("b") is None
+    assert store.get("a") == store.get("c") == body
+    assert store.stats()["entries"] == 2 and store.stats()["bytes"] == 2 * size
+    store.clear()
+    assert store.stats()["entries"] == 0
+
+
+def test_get_cache_switches(monkeypatch, tmp_path):
+    assert get_cache() is get_cache()
+    assert get_cache().path.startswith(str(tmp_path / "cache"))
+    monkeypatch.setenv("LODNB_CACHE", "0")
+    assert get_cache() is None
+    monkeypatch.setenv("LODNB_OFFLINE", "1")
+    assert get_cache() is not None
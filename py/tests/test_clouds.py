@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("wordcloud")
+
+from lodnb.clouds import cached_wordcloud, render_wordcloud, reuse_layout  # noqa: E402
+
+FREQUENCIES = {"Brigid": 40, "Patrick": 25, "Columba": 12, "Ciarán": 7, "Mary": 30, "John": 5}
+
+
+def tuple_colors(word, **kwargs):
+    return (len(word) * 20, 80, 160)
+
+
+def test_cached_layout_draws_the_same_image():
+    options = dict(width=200, height=100, random_state=1, color_func=tuple_colors)
+    first = cached_wordcloud(FREQUENCIES, **options)
+    second = cached_wordcloud(FREQUENCIES, **options)
+    assert second.layout_ == first.layout_
+    assert all(isinstance(color, str) for *_, color in second.layout_)
+    assert np.array_equal(second.to_array(), first.to_array())
+    assert render_wordcloud(second, width=400).shape == (200, 400, 3)
+
+
+def _words_overlap(cloud):
+    from PIL import Image, ImageDraw, ImageFont
+
+    covered = np.zeros((cloud.height, cloud.width), dtype=int)
+    for (word, _), font_size, (x, y), orientation, _ in cloud.layout_:
+        image = Image.new("L", (cloud.width, cloud.height))
+        font = ImageFont.TransposedFont(ImageFont.truetype(cloud.font_path, font_size), orientation=orientation)
+        ImageDraw.Draw(image).text((y, x), word, fill="white", font=font)
+        covered += np.asarray(image) > 0
+    return bool((covered > 1).any())
+
+
+def test_reuse_layout_keeps_unchanged_words_in_place():
+    options = dict(width=300, height=150, random_state=1)
+    previous = cached_wordcloud(FREQUENCIES, **options)
+    before = {entry[0][0]: entry for entry in previous.layout_}
+    changed = dict(FREQUENCIES, John=20, Ciarán=6.5, Aidan=9)
+    del changed["Columba"]
+    cloud = cached_wordcloud(changed, **options)
+    after = {entry[0][0]: entry for entry in cloud.layout_}
+    assert "Columba" not in after and "Aidan" in after
+    for word in ("Brigid", "Patrick", "Mary"):
+        assert after[word][1:] == before[word][1:]
+    assert after["Ciarán"][2] == before["Ciarán"][2] and after["Ciarán"][1] < before["Ciarán"][1]
+    assert after["John"][1] > before["John"][1]
+    assert not _words_overlap(cloud)
+
+
+def test_reuse_layout_refuses_large_changes():
+    from wordcloud import WordCloud
+
+    cloud = WordCloud(width=200, height=100, random_state=1)
+    previous = cached_wordcloud(FREQUENCIES, width=200, height=100, random_state=1).layout_
+    normalized = [(word, freq) for (word, freq), *_ in previous]
+    assert reuse_layout(cloud, previous, normalized) is not None
+    assert reuse_layout(cloud, previous, [(word, freq / 2) for word, freq in normalized]) is None
+    assert reuse_layout(WordCloud(width=200, height=100, repeat=True), previous, normalized) is None
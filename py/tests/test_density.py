@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("scipy")
+
+from lodnb.density import density_raster, kde_grid, point_density  # noqa: E402
+
+
+@pytest.fixture
+def sites():
+    rng = np.random.default_rng(0)
+    # A dense north-western and a sparse south-eastern cluster.
+    centers = np.array([[-9.0e5, 7.2e6], [-7.0e5, 7.0e6]])
+    xy = centers[(rng.random(5000) < 0.3).astype(int)] + rng.normal(scale=2e4, size=(5000, 2))
+    return xy[:, 0], xy[:, 1]
+
+
+def test_grid_density_matches_gaussian_kde(sites):
+    from scipy.stats import gaussian_kde
+
+    x, y = sites
+    exact = gaussian_kde(np.vstack([x, y]))(np.vstack([x, y]))
+    grid = point_density(x, y, method="grid", normalize=False)
+    assert np.abs(grid - exact).max() / exact.max() < 0.01
+
+
+def test_grid_integrates_to_one(sites):
+    grid, _, step = kde_grid(*sites, gridsize=256)
+    assert grid.sum() * step[0] * step[1] == pytest.approx(1.0, rel=1e-3)
+
+
+def test_auto_method_keeps_small_inputs_exact(sites):
+    x, y = sites[0][:500], sites[1][:500]
+    assert np.array_equal(point_density(x, y), point_density(x, y, method="exact"))
+    density = point_density(x, y)
+    assert density.min() == 0 and density.max() == 1
+
+
+def test_bandwidth_methods_and_errors(sites):
+    x, y = sites
+    scott = point_density(x, y, method="grid", normalize=False)
+    wide = point_density(x, y, method="grid", bw_method=1.0, normalize=False)
+    assert wide.max() < scott.max()
+    with pytest.raises(ValueError, match="Unknown density method"):
+        point_density(x, y, method="histogram")
+
+
+def test_density_raster_extent_covers_the_points(sites):
+    x, y = sites
+    image, extent = density_raster(x, y, gridsize=128)
+    assert image.shape == (128, 128) and image.min() == 0 and image.max() == 1
+    west, east, south, north = extent
+    assert west < x.min() and east > x.max() and south < y.min() and north > y.max()
+    # Rows run south to north, columns west to east: the peak sits on the north-western cluster.
+    row, column = np.unravel_index(image.argmax(), image.shape)
+    peak = (west + (column + 0.5) / 128 * (east - west), south + (row + 0.5) / 128 * (north - south))
+    assert np.hypot(peak[0] + 9.0e5, peak[1] - 7.2e6) < 2e4
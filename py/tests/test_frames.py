@@ -0,0 +1,57 @@
+import io
+import json
+import warnings
+
+import pytest
+
+pd = pytest.importorskip("pandas")
+
+from lodnb.frames import XSD, read_results  # noqa: E402
+
+
+def _results(values, datatype=XSD + "dateTime", name="date"):
+    bindings = [{name: {"type": "literal", "datatype": datatype, "value": value}} for value in values]
+    return io.BytesIO(json.dumps({"head": {"vars": [name]}, "results": {"bindings": bindings}}).encode())
+
+
+def test_datetimes_are_parsed():
+    frame = read_results(_results(["2001-02-03T00:00:00Z", "1850-01-01T00:00:00Z"]))
+    assert str(frame["date"].dtype).startswith("datetime64[")
+    assert frame["date"].dt.year.tolist() == [2001, 1850]
+
+
+def test_mixed_iso_formats_are_parsed():
+    values = ["2001-02-03", "2001-02-03T04:05:06.5Z", "2001-02-03T04:05:06+02:00"]
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        frame = read_results(_results(values))
+    assert frame["date"].notna().all()
+    assert frame["date"].dt.hour.tolist() == [0, 4, 2]
+
+
+def test_unrepresentable_datetimes_keep_their_strings():
+    values = ["2001-02-03T00:00:00Z", "2001-02-30T00:00:00Z"]
+    with pytest.warns(UserWarning, match="date: 1 of 2 dates"):
+        frame = read_results(_results(values))
+    assert frame["date"].tolist() == values
+
+
+def test_bce_datetimes_are_not_lost():
+    # Parsed where pandas' datetime resolution reaches 350 BCE, kept as strings otherwise.
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        frame = read_results(_results(["2001-02-03T00:00:00Z", "-0350-01-01T00:00:00Z"]))
+    assert frame["date"].notna().all()
+
+
+def test_integers_beyond_int64_are_kept_exact():
+    with pytest.warns(UserWarning, match="stones: some integers"):
+        frame = read_results(_results(["1", "99999999999999999999"], XSD + "integer", "stones"))
+    assert frame["stones"].tolist() == [1, 99999999999999999999]
+    assert read_results(_results(["1", "2"], XSD + "integer", "stones"))["stones"].dtype == "int64"
+
+
+def test_large_integers_with_gaps_are_not_rounded():
+    bindings = [{"n": {"type": "literal", "datatype": XSD + "integer", "value": "9007199254740993"}}, {}]
+    frame = read_results(io.BytesIO(json.dumps({"head": {"vars": ["n"]}, "results": {"bindings": bindings}}).encode()))
+    assert frame["n"].dtype == "Int64" and frame["n"][0] == 9007199254740993
@@ -0,0 +1,67 @@
+import math
+
+import pytest
+
+pd = pytest.importorskip("pandas")
+
+from lodnb.geo import WGS84, parse_points  # noqa: E402
+
+EPSG = "http://www.opengis.net/def/crs/EPSG/0/"
+
+
+def _pairs(coords):
+    return [
+        None if math.isnan(lon) else (lon, lat)
+        for lon, lat in zip(coords["longitude"], coords["latitude"])
+    ]
+
+
+def test_wikidata_and_geosparql_spellings():
+    coords, crs = parse_points([
+        "Point(-9.5 52.1)",
+        "POINT(-8.25 51.875)",
+        "  point ( +7 -1.5e1 )  ",
+        "<http://www.opengis.net/def/crs/OGC/1.3/CRS84> POINT(.5 53)",
+    ])
+    assert crs == WGS84
+    assert _pairs(coords) == [(-9.5, 52.1), (-8.25, 51.875), (7.0, -15.0), (0.5, 53.0)]
+
+
+def test_unparseable_and_missing_values_become_nan():
+    values = [None, "", "POINT EMPTY", "POINT(1 2 3)", "POINT(1,2)", "POINT(1.2.3 4)", "LINESTRING(0 0, 1 1)",
+              float("nan"), "Point(1 2)"]
+    coords, _ = parse_points(pd.Series(values, index=range(10, 19)))
+    assert coords.index.tolist() == list(range(10, 19))
+    assert _pairs(coords) == [None] * 8 + [(1.0, 2.0)]
+
+
+def test_off_earth_coordinates_are_dropped():
+    coords, crs = parse_points([
+        "<http://www.wikidata.org/entity/Q111> Point(10 20)",
+        "<http://www.wikidata.org/entity/Q2> Point(-6.3 53.3)",
+    ])
+    assert crs == WGS84 and _pairs(coords) == [None, (-6.3, 53.3)]
+
+
+def test_crs_iri_sets_the_crs():
+    coords, crs = parse_points([f"<{EPSG}3857> POINT(-1000000 7000000)", None])
+    assert crs == "EPSG:3857" and _pairs(coords) == [(-1000000.0, 7000000.0), None]
+
+
+def test_mixed_or_unknown_crs_is_an_error():
+    with pytest.raises(ValueError, match="Mixed CRS"):
+        parse_points([f"<{EPSG}3857> POINT(0 0)", f"<{EPSG}4326> POINT(0 0)"])
+    with pytest.raises(ValueError, match="Unsupported CRS IRI"):
+        parse_points(["<http://www.opengis.net/def/crs/OGC/0/Unknown> POINT(0 0)"])
+
+
+def test_points_frame_drops_rows_without_a_point():
+    gpd = pytest.importorskip("geopandas")
+    from lodnb.geo import points_frame, reproject
+
+    df = pd.DataFrame({"item": ["a", "b", "c"], "geo": ["Point(-9.5 52.1)", None, "Point(-6.3 53.3)"]})
+    gdf = points_frame(df)
+    assert isinstance(gdf, gpd.GeoDataFrame) and gdf.crs == WGS84
+    assert gdf["item"].tolist() == ["a", "c"] and gdf.geometry.x.tolist() == [-9.5, -6.3]
+    assert len(points_frame(df, dropna=False)) == 3
+    assert reproject(gdf).crs == "EPSG:3857"
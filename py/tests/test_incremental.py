@@ -0,0 +1,97 @@
+import json
+
+import pytest
+
+pytest.importorskip("rdflib")
+pytest.importorskip("requests")
+
+from lodnb import incremental  # noqa: E402
+from lodnb.local import LocalEndpoint  # noqa: E402
+from lodnb.planner import parse_select  # noqa: E402
+
+ENDPOINT = "https://query.wikidata.org/sparql"
+
+SITES = """
+@prefix wd: <http://www.wikidata.org/entity/> .
+@prefix wdt: <http://www.wikidata.org/prop/direct/> .
+@prefix rdfs: <http://www.w3.org/2000/01/rdf-schema#> .
+@prefix schema: <http://schema.org/> .
+@prefix xsd: <http://www.w3.org/2001/XMLSchema#> .
+
+wd:Q1 wdt:P31 wd:Q2016147 ; rdfs:label "Stone one"@en ;
+    schema:dateModified "2024-01-01T00:00:00Z"^^xsd:dateTime .
+wd:Q2 wdt:P31 wd:Q2016147 ; rdfs:label "Stone two"@en ;
+    schema:dateModified "2024-03-01T00:00:00Z"^^xsd:dateTime .
+wd:Q3 wdt:P31 wd:Q2016147 ; rdfs:label "Stone three"@en ;
+    schema:dateModified "2024-06-01T00:00:00Z"^^xsd:dateTime .
+wd:Q4 wdt:P31 wd:Q5 ; rdfs:label "Not a stone"@en ;
+    schema:dateModified "2025-01-01T00:00:00Z"^^xsd:dateTime .
+"""
+
+QUERY = """
+SELECT DISTINCT ?item ?itemLabel WHERE {
+  ?item wdt:P31 wd:Q2016147 .
+  SERVICE wikibase:label { bd:serviceParam wikibase:language "en". }
+}
+ORDER BY ?item
+"""
+
+
+@pytest.fixture
+def endpoint(tmp_path):
+    path = tmp_path / "sites.ttl"
+    path.write_text(SITES, encoding="utf-8")
+    return LocalEndpoint(ENDPOINT, [str(path)])
+
+
+def _bindings(endpoint, query):
+    return json.loads(endpoint.fetch(query))["results"]["bindings"]
+
+
+def test_fingerprint_query_counts_and_dates(endpoint):
+    row, = _bindings(endpoint, incremental.fingerprint_query(parse_select(QUERY), "item"))
+    assert row["rows"]["value"] == "3"
+    assert row["latest"]["value"].startswith("2024-06-01T00:00:00")
+
+
+def test_fingerprint_query_drops_label_service():
+    text = incremental.fingerprint_query(parse_select(QUERY), "item")
+    assert "wikibase:label" not in text
+    assert "?itemLabel" not in text
+
+
+def test_delta_query_selects_modified_items(endpoint):
+    rows = _bindings(endpoint, incremental.delta_query(parse_select(QUERY), "item", "2024-02-01T00:00:00Z"))
+    assert [row["item"]["value"].rsplit("/", 1)[-1] for row in rows] == ["Q2", "Q3"]
+    assert [row["itemLabel"]["value"] for row in rows] == ["Stone two", "Stone three"]
+
+
+def test_refresh_skips_fingerprint_while_fresh_and_offline(endpoint, monkeypatch):
+    pytest.importorskip("pandas")
+    pytest.importorskip("pyarrow")
+    sent = []
+
+    def live(client, query):
+        sent.append(query)
+        return client.fetch(query)
+
+    monkeypatch.setattr(incremental, "get_client", lambda _: endpoint)
+    monkeypatch.setattr(incremental, "_live", live)
+
+    frame, changed = incremental.refresh(QUERY, ENDPOINT)
+    assert changed and len(frame) == 3 and len(sent) == 2
+
+    frame, changed = incremental.refresh(QUERY, ENDPOINT)
+    assert not changed and len(frame) == 3 and len(sent) == 2
+
+    monkeypatch.setenv("LODNB_CACHE_TTL", "0")
+    monkeypatch.setenv("LODNB_OFFLINE", "1")
+    from lodnb import cache
+
+    monkeypatch.setattr(cache, "_default_cache", None)
+    frame, changed = incremental.refresh(QUERY, ENDPOINT)
+    assert not changed and len(sent) == 2
+
+    monkeypatch.delenv("LODNB_OFFLINE")
+    frame, changed = incremental.refresh(QUERY, ENDPOINT)
+    assert not changed and len(sent) == 3
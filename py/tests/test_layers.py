@@ -0,0 +1,78 @@
+import json
+import math
+import os
+
+import pytest
+
+gpd = pytest.importorskip("geopandas")
+pytest.importorskip("pyogrio")
+
+from lodnb import layers  # noqa: E402
+from lodnb.layers import boundary_layer, load_layer, zoom_tolerance  # noqa: E402
+
+
+def _circle(n=2000):
+    """A detailed polygon around Ireland, in degrees."""
+    ring = [[-8.0 + 2.5 * math.cos(2 * math.pi * i / n), 53.4 + 1.9 * math.sin(2 * math.pi * i / n)]
+            for i in range(n)]
+    return ring + [ring[0]]
+
+
+@pytest.fixture
+def geojson(tmp_path, monkeypatch):
+    monkeypatch.setattr(layers, "_layers", {})
+    path = tmp_path / "island.geojson"
+    feature = {"type": "Feature", "properties": {"name": "Ireland"},
+               "geometry": {"type": "Polygon", "coordinates": [_circle()]}}
+    path.write_text(json.dumps({"type": "FeatureCollection", "features": [feature]}), encoding="utf-8")
+    return str(path)
+
+
+def _vertices(frame):
+    return sum(len(geometry.exterior.coords) for geometry in frame.geometry)
+
+
+def test_layers_load_lazily_and_reprojected(geojson, monkeypatch):
+    reads = []
+    read_file = gpd.read_file
+    monkeypatch.setattr(gpd, "read_file", lambda path: reads.append(path) or read_file(path))
+    layer = boundary_layer(geojson)
+    assert reads == []
+    frame = layer.frame
+    assert reads == [geojson] and frame.crs == "EPSG:3857" and frame["name"].tolist() == ["Ireland"]
+    assert frame.total_bounds[0] == pytest.approx(-10.5 * math.pi / 180 * 6378137.0)
+    assert layer.frame is frame and reads == [geojson]
+
+
+def test_cache_survives_restarts_and_follows_edits(geojson, monkeypatch):
+    first = load_layer(geojson)
+    monkeypatch.setattr(layers, "_layers", {})
+    monkeypatch.setattr(gpd, "read_file", lambda path: pytest.fail("read the source again"))
+    assert load_layer(geojson).geom_equals(first).all()
+
+    monkeypatch.undo()
+    monkeypatch.setattr(layers, "_layers", {})
+    with open(geojson, encoding="utf-8") as handle:
+        document = json.load(handle)
+    document["features"][0]["properties"]["name"] = "Éire"
+    with open(geojson, "w", encoding="utf-8") as handle:
+        json.dump(document, handle)
+    os.utime(geojson, ns=(0, os.stat(geojson).st_mtime_ns + 10 ** 9))
+    assert load_layer(geojson)["name"].tolist() == ["Éire"]
+
+
+def test_zoom_simplifies_to_half_a_pixel(geojson):
+    full = load_layer(geojson)
+    coarse = boundary_layer(geojson).at_zoom(5).frame
+    assert zoom_tolerance(5) == pytest.approx(40075016.69 / 256 / 32 / 2)
+    assert _vertices(coarse) < _vertices(full) / 4
+    assert coarse.geometry.iloc[0].hausdorff_distance(full.geometry.iloc[0]) <= zoom_tolerance(5)
+
+
+def test_pickle_fallback_without_pyarrow(geojson, monkeypatch):
+    monkeypatch.setattr(layers, "pyarrow", None)
+    first = load_layer(geojson, crs="EPSG:2157")
+    monkeypatch.setattr(layers, "_layers", {})
+    cached = load_layer(geojson, crs="EPSG:2157")
+    assert cached.crs == "EPSG:2157" and cached.geom_equals(first).all()
+    assert any(name.endswith(".pkl") for name in os.listdir(layers.cache_dir("layers")))
@@ -0,0 +1,92 @@
+import gzip
+
+import pytest
+
+pytest.importorskip("rdflib")
+pytest.importorskip("requests")
+
+from lodnb import sparql  # noqa: E402
+from lodnb.local import LocalEndpoint, emulate_label_service, local_dumps  # noqa: E402
+
+WD = "http://www.wikidata.org/entity/"
+RDFS_LABEL = "<http://www.w3.org/2000/01/rdf-schema#label>"
+P31 = "<http://www.wikidata.org/prop/direct/P31>"
+DUMP = f"""
+<{WD}Q1> {P31} <{WD}Q2016147> .
+<{WD}Q1> {RDFS_LABEL} "Cloch Ogham"@ga .
+<{WD}Q1> {RDFS_LABEL} "Ogham stone"@en .
+<{WD}Q2> {P31} <{WD}Q2016147> .
+<{WD}Q2> {RDFS_LABEL} "Cloch eile"@ga .
+<{WD}Q2> <http://schema.org/description> "in Kerry"@en .
+<{WD}Q3> {P31} <{WD}Q2016147> .
+"""
+
+QUERY = """
+SELECT ?item ?itemLabel ?itemDescription WHERE {
+  ?item wdt:P31 wd:Q2016147 .
+  SERVICE wikibase:label { bd:serviceParam wikibase:language "%s". }
+}
+ORDER BY ?item
+"""
+
+
+@pytest.fixture
+def endpoint(tmp_path):
+    path = tmp_path / "ogham.nt.gz"
+    with gzip.open(path, "wt", encoding="utf-8") as handle:
+        handle.write(DUMP)
+    return LocalEndpoint(sparql.WIKIDATA, [str(path)])
+
+
+def _rows(endpoint, query):
+    bindings = endpoint.select(query)["results"]["bindings"]
+    return [{name: cell["value"] for name, cell in binding.items()} for binding in bindings]
+
+
+def test_label_service_follows_the_language_order(endpoint):
+    assert _rows(endpoint, QUERY % "en,ga") == [
+        {"item": WD + "Q1", "itemLabel": "Ogham stone"},
+        {"item": WD + "Q2", "itemLabel": "Cloch eile", "itemDescription": "in Kerry"},
+        {"item": WD + "Q3", "itemLabel": "Q3"},
+    ]
+    assert [row["itemLabel"] for row in _rows(endpoint, QUERY % "[AUTO_LANGUAGE],ga")] == \
+        ["Ogham stone", "Cloch eile", "Q3"]
+    assert [row["itemLabel"] for row in _rows(endpoint, QUERY % "ga")] == ["Cloch Ogham", "Cloch eile", "Q3"]
+
+
+def test_explicit_label_triples_are_kept():
+    query = """SELECT ?item ?name WHERE { ?item wdt:P31 wd:Q5 .
+      SERVICE wikibase:label { bd:serviceParam wikibase:language "en" . ?item rdfs:label ?name . } }"""
+    rewritten = emulate_label_service(query)
+    assert "SERVICE" not in rewritten and "OPTIONAL { ?item rdfs:label ?name . }" in rewritten
+    # Braces and '#' inside literals and IRIs do not end the service block.
+    tricky = 'SELECT ?xLabel WHERE { ?x ex:p "}#" ; ex:q <http://e.org/#a> . SERVICE wikibase:label { } }'
+    rewritten = emulate_label_service(tricky)
+    assert rewritten.startswith('SELECT ?xLabel WHERE { ?x ex:p "}#" ; ex:q <http://e.org/#a> . OPTIONAL {')
+    assert rewritten.endswith("AS ?xLabel) }")
+
+
+def test_query_forms(endpoint):
+    assert endpoint.select(f"ASK {{ <{WD}Q1> wdt:P31 wd:Q2016147 }}")["boolean"] is True
+    constructed = endpoint.fetch("CONSTRUCT { ?s rdfs:label ?o } WHERE { ?s rdfs:label ?o }")
+    assert b"Cloch Ogham" in constructed and b"P31" not in constructed
+    # Static documents (the Solid Pod) return the whole graph for SELECT queries asked as Turtle.
+    assert "Q2016147" in endpoint.turtle("SELECT * WHERE { ?s ?p ?o }")
+
+
+def test_local_dumps_configure_get_client(endpoint, monkeypatch, tmp_path):
+    monkeypatch.setenv("LODNB_LOCAL", f"{sparql.WIKIDATA}={endpoint.paths[0]} "
+                                      f"{sparql.WIKIDATA}=~/more.nt https://example.org/sparql=other.ttl")
+    dumps = local_dumps()
+    assert dumps[sparql.WIKIDATA][0] == endpoint.paths[0] and not dumps[sparql.WIKIDATA][1].startswith("~")
+    assert dumps["https://example.org/sparql"] == ["other.ttl"]
+
+    monkeypatch.setenv("LODNB_LOCAL", f"{sparql.WIKIDATA}={endpoint.paths[0]}")
+    monkeypatch.setattr(sparql, "_clients", {})
+    client = sparql.get_client(sparql.WIKIDATA)
+    assert isinstance(client, LocalEndpoint) and len(client.graph) == 7
+    assert len(sparql.querySparql(QUERY % "en")) == 3
+
+    monkeypatch.setenv("LODNB_LOCAL", "no-separator")
+    with pytest.raises(ValueError, match="endpoint=path"):
+        local_dumps()
@@ -0,0 +1,75 @@
+import numpy as np
+import pytest
+
+matplotlib = pytest.importorskip("matplotlib")
+gpd = pytest.importorskip("geopandas")
+matplotlib.use("Agg")
+
+import matplotlib.pyplot as plt  # noqa: E402
+
+from lodnb import maps, tiles  # noqa: E402
+
+
+@pytest.fixture
+def points():
+    rng = np.random.default_rng(0)
+    x = rng.uniform(-1.1e6, -0.6e6, 50000)
+    y = rng.uniform(6.7e6, 7.4e6, 50000)
+    gdf = gpd.GeoDataFrame({"county": np.where(x < -0.85e6, "west", "east"), "count": rng.integers(1, 9, 50000)},
+                           geometry=gpd.points_from_xy(x, y), crs="EPSG:3857")
+    return gdf
+
+
+def _red_pixels(fig):
+    fig.canvas.draw()
+    image = np.asarray(fig.canvas.buffer_rgba())[..., :3].astype(int)
+    return int(((image[..., 0] > 150) & (image[..., 1] < 80) & (image[..., 2] < 80)).sum())
+
+
+def _opaque_basemap(monkeypatch):
+    def basemap_image(bounds, zoom, source):
+        xmin, ymin, xmax, ymax = bounds
+        return np.full((16, 16, 3), 200, dtype=np.uint8), (xmin, xmax, ymin, ymax)
+
+    monkeypatch.setattr(tiles, "basemap_image", basemap_image)
+
+
+def test_bin_points_statistics():
+    x = np.array([0.1, 0.2, 0.9, np.nan])
+    y = np.array([0.1, 0.2, 0.9, 0.5])
+    extent, shape = (0.0, 1.0, 0.0, 1.0), (2, 2)
+    assert maps.bin_points(x, y, extent, shape).tolist() == [[2, 0], [0, 1]]
+    values = np.array([1.0, 3.0, np.nan, 5.0])
+    assert maps.bin_points(x, y, extent, shape, values, "sum").tolist() == [[4.0, 0.0], [0.0, 0.0]]
+    mean = maps.bin_points(x, y, extent, shape, values, "mean")
+    assert mean[0, 0] == 2.0 and np.isnan(mean[1, 1])
+
+
+def test_bin_categories_majority():
+    x = np.array([0.1, 0.2, 0.3, 0.9])
+    y = np.array([0.1, 0.1, 0.1, 0.9])
+    dominant = maps.bin_categories(x, y, np.array([1, 0, 1, 0]), (0.0, 1.0, 0.0, 1.0), (2, 2))
+    assert dominant.tolist() == [[1, -1], [-1, 0]]
+
+
+def test_raster_points_stay_visible_over_basemap(points, monkeypatch):
+    _opaque_basemap(monkeypatch)
+    fig, ax = plt.subplots(figsize=(4, 4))
+    artist = maps.plot_points(ax, points, color="red", alpha=1.0)
+    assert isinstance(artist, matplotlib.image.AxesImage)
+    without = _red_pixels(fig)
+    tiles.add_basemap(ax, zoom=6)
+    assert without > 0 and _red_pixels(fig) == without
+    plt.close(fig)
+
+
+def test_raster_categories_stay_visible_over_basemap_and_boundaries(points, monkeypatch):
+    from shapely.geometry import box
+
+    _opaque_basemap(monkeypatch)
+    fig, ax = plt.subplots(figsize=(4, 4))
+    gpd.GeoSeries([box(-1.2e6, 6.6e6, -0.5e6, 7.5e6)], crs="EPSG:3857").plot(ax=ax, color="white")
+    maps.plot_categories(ax, points, "county", colors=["red", "blue"])
+    tiles.add_basemap(ax, zoom=6)
+    assert _red_pixels(fig) > 0
+    plt.close(fig)
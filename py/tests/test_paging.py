@@ -0,0 +1,113 @@
+import json
+import re
+import threading
+import time
+
+import pytest
+
+pytest.importorskip("pandas")
+pytest.importorskip("requests")
+
+from lodnb import paging  # noqa: E402
+from lodnb.paging import iter_pages, projected_variables, split_query  # noqa: E402
+
+ENDPOINT = "https://sparql.example.org/"
+QUERY = "SELECT ?item ?n WHERE { ?item ex:n ?n }"
+
+
+class Client:
+    """Serves ``rows`` numbered items, honouring LIMIT/OFFSET, and records the pages asked for."""
+
+    def __init__(self, rows, delay=0.0):
+        self.rows = rows
+        self.delay = delay
+        self.pages = []
+        self.active = 0
+        self.peak = 0
+        self.lock = threading.Lock()
+
+    def fetch(self, query, accept=None):
+        limit, offset = (int(value) for value in re.search(r"LIMIT (\d+) OFFSET (\d+)$", query).groups())
+        with self.lock:
+            self.pages.append(offset)
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        time.sleep(self.delay)
+        with self.lock:
+            self.active -= 1
+        bindings = [
+            {"item": {"type": "uri", "value": f"http://example.org/{n}"},
+             "n": {"type": "literal", "datatype": "http://www.w3.org/2001/XMLSchema#integer", "value": str(n)}}
+            for n in range(offset, min(offset + limit, self.rows))
+        ]
+        return json.dumps({"head": {"vars": ["item", "n"]}, "results": {"bindings": bindings}}).encode()
+
+
+@pytest.fixture
+def client(monkeypatch):
+    def install(rows, delay=0.0):
+        fake = Client(rows, delay)
+        monkeypatch.setattr(paging, "get_client", lambda endpoint: fake)
+        return fake
+
+    monkeypatch.setattr(paging, "_slots", {})
+    return install
+
+
+def _numbers(pages):
+    return [n for page in pages for n in page["n"].tolist()]
+
+
+def test_split_query_orders_and_caps():
+    assert split_query(QUERY) == (QUERY + " ORDER BY ?item ?n", 0, None)
+    assert split_query(QUERY + "\nLIMIT 25 OFFSET 5") == (QUERY + " ORDER BY ?item ?n", 5, 25)
+    ordered = "SELECT ?item WHERE { ?item ex:n ?n } ORDER BY DESC(?n)"
+    assert split_query(ordered + " OFFSET 3") == (ordered, 3, None)
+    # A LIMIT inside a subquery is not the row cap.
+    nested = "SELECT ?item WHERE { { SELECT ?item WHERE { ?item ex:n ?n } LIMIT 5 } }"
+    assert split_query(nested) == (nested + " ORDER BY ?item", 0, None)
+    assert split_query("SELECT * WHERE { ?s ?p ?o }", order_by=["?s"])[0].endswith("ORDER BY ?s")
+
+
+def test_projected_variables():
+    assert projected_variables("SELECT DISTINCT ?a (COUNT(?b) AS ?count) ?c WHERE {}") == ["?a", "?c", "?count"]
+    with pytest.raises(ValueError, match="SELECT \\*"):
+        projected_variables("SELECT * WHERE { ?s ?p ?o }")
+    with pytest.raises(ValueError, match="Only SELECT"):
+        projected_variables("ASK { ?s ?p ?o }")
+
+
+@pytest.mark.parametrize("rows", [25, 20, 0])
+def test_pages_stop_at_the_first_short_page(client, rows):
+    fake = client(rows)
+    pages = list(iter_pages(QUERY, ENDPOINT, page_size=10, workers=2))
+    assert _numbers(pages) == list(range(rows))
+    assert all(len(page) for page in pages)
+    # Only the pages up to the first short one, plus at most one prefetched page.
+    assert sorted(fake.pages)[:rows // 10 + 1] == list(range(0, rows // 10 * 10 + 1, 10))
+    assert len(fake.pages) <= rows // 10 + 2
+
+
+def test_limit_and_offset_bound_the_pages(client):
+    fake = client(1000)
+    pages = list(iter_pages(QUERY + " LIMIT 25 OFFSET 5", ENDPOINT, page_size=10, workers=3))
+    assert _numbers(pages) == list(range(5, 30))
+    assert [len(page) for page in pages] == [10, 10, 5]
+    assert sorted(fake.pages) == [5, 15, 25]
+
+
+def test_endpoint_limit_bounds_concurrent_pages(client, monkeypatch):
+    monkeypatch.setitem(paging.ENDPOINT_LIMITS, ENDPOINT, 2)
+    fake = client(100, delay=0.02)
+    assert _numbers(iter_pages(QUERY, ENDPOINT, page_size=10, workers=6)) == list(range(100))
+    assert fake.peak <= 2
+
+
+def test_closing_early_stops_fetching(client):
+    fake = client(10 ** 6, delay=0.01)
+    pages = iter_pages(QUERY, ENDPOINT, page_size=10, workers=2)
+    assert _numbers([next(pages)]) == list(range(10))
+    pages.close()
+    fetched = len(fake.pages)
+    time.sleep(0.05)
+    assert len(fake.pages) == fetched <= 3
@@ -0,0 +1,141 @@
+import pytest
+
+from lodnb import planner
+from lodnb.cache import normalize_query
+
+ENDPOINT = "https://query.wikidata.org/sparql"
+
+COLOUR = """
+SELECT DISTINCT ?pokemon ?pokemonLabel ?pokedexNumber ?color ?colorLabel
+WHERE
+{
+    ?pokemon wdt:P31/wdt:P279* wd:Q3966183 .
+    ?pokemon p:P1685 ?statement.
+    ?pokemon wdt:P462 ?color.
+    ?statement ps:P1685 ?pokedexNumber;
+              pq:P972 wd:Q20005020.
+    FILTER ( !isBLANK(?pokedexNumber) ) .
+    SERVICE wikibase:label { bd:serviceParam wikibase:language "en" }
+}
+ORDER BY (?pokedexNumber)
+"""
+
+MASS = COLOUR.replace("?colorLabel\n", "?colorLabel ?mass\n").replace(
+    "    ?statement ps:P1685", "    ?pokemon wdt:P2067 ?mass.\n    ?statement ps:P1685"
+)
+
+
+def test_parse_select_splits_elements():
+    parsed = planner.parse_select(COLOUR)
+    assert parsed.distinct
+    assert parsed.variables == ["pokemon", "pokemonLabel", "pokedexNumber", "color", "colorLabel"]
+    assert parsed.modifiers == "ORDER BY (?pokedexNumber)"
+    kinds = [kind for kind, _ in parsed.elements]
+    assert kinds == ["triples"] * 4 + ["other", "other"]
+    assert parsed.elements[3][1] == "?statement ps:P1685 ?pokedexNumber; pq:P972 wd:Q20005020"
+    assert parsed.elements[4][1].startswith("FILTER")
+    assert parsed.elements[5][1].startswith("SERVICE")
+
+
+def test_parse_select_optional_and_literals():
+    parsed = planner.parse_select(
+        'SELECT ?item ?geo WHERE { ?item rdfs:label "a. b {c}"@en . OPTIONAL { ?item wdt:P625 ?geo . } }'
+    )
+    assert parsed.elements == [("triples", '?item rdfs:label "a. b {c}"@en'), ("optional", "?item wdt:P625 ?geo")]
+    assert not parsed.distinct
+
+
+def test_parse_select_rejects_other_queries():
+    assert planner.parse_select("SELECT * WHERE { ?s ?p ?o }") is None
+    assert planner.parse_select("SELECT (COUNT(?s) AS ?n) WHERE { ?s ?p ?o }") is None
+    assert planner.parse_select("SELECT ?s WHERE { ?s ?p ?o } GROUP BY ?s") is None
+    assert planner.parse_select("SELECT ?s WHERE { { ?s a ?o } UNION { ?s ?p ?o } }") is None
+    assert planner.parse_select("CONSTRUCT { ?s ?p ?o } WHERE { ?s ?p ?o }") is None
+
+
+def test_parse_select_round_trips():
+    parsed = planner.parse_select(COLOUR)
+    assert planner.parse_select(parsed.text()) == parsed
+
+
+def test_plan_merges_pokemon_queries():
+    views = planner.plan([(ENDPOINT, COLOUR), (ENDPOINT, MASS)])
+    colour = views[(ENDPOINT, normalize_query(COLOUR))]
+    mass = views[(ENDPOINT, normalize_query(MASS))]
+    assert colour.source == mass.source
+    merged = planner.parse_select(colour.source)
+    assert ("optional", "?pokemon wdt:P2067 ?mass") in merged.elements
+    assert merged.variables[-1] == "mass"
+    assert colour.required == [] and colour.variables == planner.parse_select(COLOUR).variables
+    assert mass.required == ["mass"]
+
+
+def test_plan_leaves_unrelated_queries_alone():
+    other = "SELECT ?item WHERE { ?item wdt:P31 wd:Q5 }"
+    views = planner.plan([(ENDPOINT, COLOUR), (ENDPOINT, other), ("https://example.org/sparql", MASS)])
+    assert views == {}
+
+
+def test_plan_requires_distinct_for_foreign_optionals():
+    base = "SELECT ?item WHERE { ?item wdt:P31 wd:Q5 }"
+    extra = "SELECT ?item ?img WHERE { ?item wdt:P31 wd:Q5 . OPTIONAL { ?item wdt:P18 ?img } }"
+    assert planner.plan([(ENDPOINT, base), (ENDPOINT, extra)]) == {}
+    views = planner.plan([(ENDPOINT, base.replace("SELECT", "SELECT DISTINCT")),
+                          (ENDPOINT, extra.replace("SELECT", "SELECT DISTINCT"))])
+    assert len(views) == 2
+
+
+def test_find_view_needs_an_active_plan(monkeypatch):
+    monkeypatch.setattr(planner, "_active_plan", None)
+    monkeypatch.setenv(planner.PLAN_ENV, "")
+    assert not planner.enabled()
+    assert planner.find_view(COLOUR, ENDPOINT) is None
+
+    views = planner.plan([(ENDPOINT, COLOUR), (ENDPOINT, MASS)])
+    planner.activate(views)
+    assert planner.find_view(MASS, ENDPOINT) == views[(ENDPOINT, normalize_query(MASS))]
+
+    # A process started by the runner reads the plan from LODNB_PLAN.
+    monkeypatch.setattr(planner, "_active_plan", None)
+    assert planner.find_view(MASS, ENDPOINT) == views[(ENDPOINT, normalize_query(MASS))]
+    monkeypatch.setattr(planner, "_active_plan", None)
+
+
+def test_merge_keeps_chained_triples_together():
+    chained = "SELECT DISTINCT ?x ?z WHERE { ?x <p> ?o . ?x <a> ?y . ?y <b> ?z }"
+    base = "SELECT DISTINCT ?x WHERE { ?x <p> ?o }"
+    merged, views = planner.merge([planner.parse_select(chained), planner.parse_select(base)])
+    assert ("optional", "?x <a> ?y . ?y <b> ?z") in merged.elements
+    assert views[0].required == ["y", "z"]
+    assert views[1].required == []
+
+
+def test_merge_refuses_optionals_sharing_variables():
+    first = "SELECT DISTINCT ?x ?y WHERE { ?x <p> ?o . ?x <a> ?y }"
+    second = "SELECT DISTINCT ?x ?y WHERE { ?x <p> ?o . OPTIONAL { ?x <c> ?y } }"
+    assert planner.merge([planner.parse_select(first), planner.parse_select(second)]) is None
+
+
+def test_views_match_direct_results():
+    rdflib = pytest.importorskip("rdflib")
+    pytest.importorskip("pandas")
+    import pandas as pd
+
+    chained = "SELECT DISTINCT ?x ?z WHERE { ?x <http://e/p> ?o . ?x <http://e/a> ?y . ?y <http://e/b> ?z }"
+    base = "SELECT DISTINCT ?x WHERE { ?x <http://e/p> ?o }"
+    graph = rdflib.Graph()
+    graph.parse(data="""
+        <http://e/x1> <http://e/p> 1 . <http://e/y9> <http://e/b> <http://e/z9> .
+        <http://e/x2> <http://e/p> 2 ; <http://e/a> <http://e/y2> . <http://e/y2> <http://e/b> <http://e/z2> .
+    """,
+                format="turtle")
+
+    def rows(query, variables):
+        return sorted(tuple(str(row[name]) if row[name] is not None else None for name in variables)
+                      for row in graph.query(query))
+
+    merged, views = planner.merge([planner.parse_select(chained), planner.parse_select(base)])
+    frame = pd.DataFrame(rows(merged.text(), merged.variables), columns=merged.variables)
+    for query, view in zip((chained, base), views):
+        derived = sorted(map(tuple, view.apply(frame).itertuples(index=False)))
+        assert derived == rows(query, view.variables)
@@ -0,0 +1,68 @@
+import io
+import threading
+
+import pytest
+
+pytest.importorskip("rdflib")
+pytest.importorskip("pandas")
+
+from lodnb.rdf import RDF_TYPE, Literal, TripleStore, iter_triples, read_subjects  # noqa: E402
+
+EX = "http://example.org/"
+XSD = "http://www.w3.org/2001/XMLSchema#"
+
+DOCUMENT = b"""
+@prefix ex: <http://example.org/> .
+@prefix xsd: <http://www.w3.org/2001/XMLSchema#> .
+
+ex:a a ex:Site ;
+    ex:name "Caf\\u00e9 \\"one\\""@EN-gb , "Eins"@de ;
+    ex:stones "3"^^xsd:integer ;
+    ex:near [ ex:name "anonymous" ] .
+ex:b a ex:Site .
+<relative> a ex:Site ; ex:stones 5 .
+"""
+
+
+def test_iter_triples_terms():
+    triples = set(iter_triples(DOCUMENT, base=EX))
+    assert (EX + "a", RDF_TYPE, EX + "Site") in triples
+    assert (EX + "a", EX + "name", Literal('Café "one"', lang="en-gb")) in triples
+    assert (EX + "a", EX + "name", Literal("Eins", lang="de")) in triples
+    assert (EX + "a", EX + "stones", Literal("3", XSD + "integer")) in triples
+    assert (EX + "relative", EX + "stones", Literal("5", XSD + "integer")) in triples
+    near, = [obj for subject, predicate, obj in triples if predicate == EX + "near"]
+    assert near.startswith("_:")
+    assert (near, EX + "name", Literal("anonymous")) in triples
+
+
+def test_read_subjects_and_store_agree(tmp_path):
+    columns = {"stones": EX + "stones"}
+    frame = read_subjects(DOCUMENT, EX + "Site", columns, base=EX).sort_values("subject", ignore_index=True)
+    assert frame["subject"].astype(str).tolist() == [EX + "a", EX + "b", EX + "relative"]
+    assert frame["stones"].tolist()[0] == 3 and frame["stones"].isna().tolist()[1]
+
+    store = TripleStore(str(tmp_path / "store.sqlite"))
+    assert store.load(DOCUMENT, base=EX) == len(store) == 9
+    stored = store.subjects_frame(EX + "Site", columns).sort_values("subject", ignore_index=True)
+    assert stored["stones"].tolist()[::2] == frame["stones"].tolist()[::2]
+    store.close()
+
+
+def test_iter_triples_streams_file_objects():
+    lines = "".join(f"<{EX}s{i}> <{EX}p> \"{i}\" .\n" for i in range(5000))
+    assert sum(1 for _ in iter_triples(io.StringIO(lines), format="nt")) == 5000
+    assert sum(1 for _ in iter_triples(io.BytesIO(lines.encode()))) == 5000
+
+
+def test_iter_triples_stops_parsing_when_closed():
+    lines = "".join(f"<{EX}s{i}> <{EX}p> \"{i}\" .\n" for i in range(50000)).encode()
+    triples = iter_triples(lines, format="nt")
+    assert next(triples)[1] == EX + "p"
+    triples.close()
+    assert not any(thread.name == "lodnb-rdf-parser" for thread in threading.enumerate())
+
+
+def test_iter_triples_raises_parse_errors():
+    with pytest.raises(Exception, match="(?i)bad|syntax|invalid"):
+        list(iter_triples(b"<http://example.org/a> <http://example.org/p> ."))
@@ -0,0 +1,21 @@
+import os
+
+import pytest
+
+gpd = pytest.importorskip("geopandas")
+
+from shapely.geometry import Point  # noqa: E402
+
+from lodnb.regions import assign_regions  # noqa: E402
+
+COUNTIES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "gs_ireland_island.geojson")
+
+
+def test_assign_regions_measures_offshore_distance_in_metric_crs():
+    # Inland, on the coast and about 8 km west of the Kerry coast.
+    points = gpd.GeoDataFrame(geometry=[Point(-8.0, 53.0), Point(-10.25, 52.0), Point(-10.6, 52.1)],
+                              crs="EPSG:4326").to_crs(epsg=3857)
+    mercator = assign_regions(points, COUNTIES, "NAME", max_distance=10000)
+    metric = assign_regions(points, COUNTIES, "NAME", max_distance=10000, distance_crs="EPSG:2157")
+    assert mercator.tolist()[:2] == ["Tipperary", "Kerry"] and mercator.isna().tolist()[2]
+    assert metric.tolist() == ["Tipperary", "Kerry", "Kerry"]
@@ -0,0 +1,81 @@
+import os
+
+import pytest
+
+pytest.importorskip("matplotlib")
+pytest.importorskip("requests")
+
+from lodnb.cache import cache_key, get_cache  # noqa: E402
+from lodnb.render import input_key, render_all, render_file  # noqa: E402
+from lodnb.runner import Analysis, QuerySpec  # noqa: E402
+
+SCRIPT = """
+import os
+import matplotlib.pyplot as plt
+
+print("printed output is discarded")
+plt.plot([1, 2, 3])
+plt.show()
+plt.figure()
+plt.bar(["a", "b"], [1, 2])
+plt.figure()
+plt.plot([3, 2, 1])
+with open(os.path.join(os.path.dirname(os.path.dirname(__file__)), "offline.txt"), "w") as handle:
+    handle.write(os.environ.get("LODNB_OFFLINE", ""))
+"""
+
+
+@pytest.fixture
+def script(tmp_path):
+    path = tmp_path / "scripts" / "plots.py"
+    path.parent.mkdir()
+    path.write_text(SCRIPT, encoding="utf-8")
+    return Analysis("plots", str(path))
+
+
+def test_render_file_saves_every_figure(script, tmp_path, capsys, monkeypatch):
+    import matplotlib.pyplot as plt
+
+    # render_file replaces plt.show for its worker process; restore it for the other tests.
+    monkeypatch.setattr(plt, "show", plt.show)
+    out = tmp_path / "figures"
+    out.mkdir()
+    files = render_file("plots", script.path, str(out), ("png", "svg"), 50, offline=True)
+    assert files == ["plots-1.png", "plots-1.svg", "plots-2.png", "plots-2.svg", "plots-3.png", "plots-3.svg"]
+    assert all((out / name).stat().st_size > 0 for name in files)
+    assert capsys.readouterr().out == ""
+    assert (tmp_path / "offline.txt").read_text() == "1"
+    assert "LODNB_OFFLINE" not in os.environ
+
+
+def test_render_all_skips_unchanged_scripts(script, tmp_path):
+    out = str(tmp_path / "figures")
+    (name, files, error), = render_all([script], out, workers=1)
+    assert (name, error) == ("plots", None) and len(files) == 3
+    assert list(render_all([script], out, workers=1)) == [("plots", None, None)]
+
+    os.remove(os.path.join(out, "plots-2.png"))
+    assert len(list(render_all([script], out, workers=1))[0][1]) == 3
+    with open(script.path, "a", encoding="utf-8") as handle:
+        handle.write("\n# changed\n")
+    assert list(render_all([script], out, workers=1))[0][1] is not None
+
+
+def test_failing_scripts_are_reported(tmp_path):
+    path = tmp_path / "broken.py"
+    path.write_text("raise ValueError('no data')", encoding="utf-8")
+    (name, files, error), = render_all([Analysis("broken", str(path))], str(tmp_path / "figures"), workers=1)
+    assert name == "broken" and files == [] and isinstance(error, ValueError)
+
+
+def test_input_key_follows_cached_responses(script):
+    spec = QuerySpec("q", "https://sparql.example.org/", "SELECT ?s WHERE { ?s ?p ?o }")
+    analysis = Analysis(script.name, script.path, [spec])
+    assert input_key(analysis, ("png",), 150) is None
+    cache = get_cache()
+    cache.put(cache_key(spec.endpoint, spec.text, spec.accept), spec.endpoint, b"one")
+    first = input_key(analysis, ("png",), 150)
+    assert first is not None and first == input_key(analysis, ("png",), 150)
+    assert input_key(analysis, ("svg",), 150) != first
+    cache.put(cache_key(spec.endpoint, spec.text, spec.accept), spec.endpoint, b"two")
+    assert input_key(analysis, ("png",), 150) != first
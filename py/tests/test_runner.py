@@ -0,0 +1,37 @@
+import asyncio
+import os
+import subprocess
+import sys
+
+import pytest
+
+pytest.importorskip("requests")
+
+from lodnb.runner import Analysis, render_script  # noqa: E402
+
+
+@pytest.mark.parametrize("code, message", [
+    ("import sys; sys.exit(3)", "exit status 3"),
+    ("raise ValueError('broken')", "ValueError: broken"),
+])
+def test_render_script_reports_failures(tmp_path, code, message):
+    path = tmp_path / "script.py"
+    path.write_text(code, encoding="utf-8")
+    with pytest.raises(RuntimeError, match=message):
+        asyncio.run(render_script(Analysis("script", str(path))))
+
+
+def test_fetch_without_incremental_does_not_load_arrow():
+    code = (
+        "import sys\n"
+        "from lodnb import runner, sparql\n"
+        "class Client:\n"
+        "    def fetch(self, text, accept):\n"
+        "        return b'{}'\n"
+        "sparql.get_client = lambda endpoint: Client()\n"
+        "assert runner._fetch(runner.QuerySpec('q', sparql.WIKIDATA, 'SELECT ?s WHERE { ?s ?p ?o }'))\n"
+        "print(sorted(name for name in ('pyarrow', 'numpy', 'pandas') if name in sys.modules))\n"
+    )
+    py_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    result = subprocess.run([sys.executable, "-c", code], cwd=py_dir, capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == "[]"
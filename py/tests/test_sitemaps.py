@@ -0,0 +1,80 @@
+import io
+
+import pytest
+
+pytest.importorskip("rdflib")
+pytest.importorskip("requests")
+pd = pytest.importorskip("pandas")
+
+from lodnb.frames import read_results  # noqa: E402
+from lodnb.local import LocalEndpoint  # noqa: E402
+from lodnb.sitemaps import CATACOMBS, CHIETI_SITES, ITALY_SITE_MAPS, SiteFilter, sites_frame, sites_query  # noqa: E402
+
+SITES = """
+@prefix wd: <http://www.wikidata.org/entity/> .
+@prefix wdt: <http://www.wikidata.org/prop/direct/> .
+@prefix rdfs: <http://www.w3.org/2000/01/rdf-schema#> .
+@prefix geo: <http://www.opengis.net/ont/geosparql#> .
+
+wd:Q172896 wdt:P279 wd:Q839954 .
+wd:Q19757 wdt:P279 wd:Q5000 .
+wd:Q5000 wdt:P279 wd:Q839954 .
+
+wd:Q1 wdt:P31 wd:Q172896 ; wdt:P17 wd:Q38 ; wdt:P131 wd:Q13138 ; rdfs:label "Catacomb in Chieti"@en ;
+    wdt:P625 "Point(14.17 42.35)"^^geo:wktLiteral .
+wd:Q2 wdt:P31 wd:Q172896 ; wdt:P17 wd:Q38 ; rdfs:label "Roman catacomb"@en ;
+    wdt:P625 "Point(12.5 41.9)"^^geo:wktLiteral ; wdt:P18 "Catacomb.jpg" .
+wd:Q3 wdt:P31 wd:Q19757 ; wdt:P17 wd:Q38 ; rdfs:label "Theatre"@en ;
+    wdt:P625 "Point(12.48 41.89)"^^geo:wktLiteral .
+wd:Q4 wdt:P31 wd:Q839954 ; wdt:P17 wd:Q38 ; wdt:P131 wd:Q13138 ; rdfs:label "Hill fort"@en ;
+    wdt:P625 "Point(14.3 42.2)"^^geo:wktLiteral .
+wd:Q5 wdt:P31 wd:Q172896 ; wdt:P17 wd:Q142 ; rdfs:label "Catacomb in France"@en ;
+    wdt:P625 "Point(2.3 48.8)"^^geo:wktLiteral .
+wd:Q6 wdt:P31 wd:Q19757 ; wdt:P17 wd:Q38 ; rdfs:label "Theatre without coordinates"@en .
+"""
+
+
+@pytest.fixture
+def endpoint(tmp_path):
+    path = tmp_path / "sites.ttl"
+    path.write_text(SITES, encoding="utf-8")
+    return LocalEndpoint("https://query.wikidata.org/sparql", [str(path)])
+
+
+def _frame(endpoint, filters):
+    return read_results(io.BytesIO(endpoint.fetch(sites_query(filters))))
+
+
+def _items(df):
+    return sorted(zip(df["filter"].astype(str), df["item"].astype(str).str.rsplit("/", n=1).str[1]))
+
+
+def test_one_query_tags_the_rows_of_every_filter(endpoint):
+    combined = _frame(endpoint, ITALY_SITE_MAPS)
+    assert _items(combined) == [
+        ("catacombs", "Q1"), ("catacombs", "Q2"), ("chieti", "Q1"), ("chieti", "Q4"), ("roman-theatres", "Q3"),
+    ]
+    separate = pd.concat([_frame(endpoint, [site_filter]) for site_filter in ITALY_SITE_MAPS])
+    assert _items(combined) == _items(separate)
+    assert combined.loc[combined["item"].astype(str).str.endswith("Q2"), "img"].tolist() == ["Catacomb.jpg"]
+
+
+def test_filters_with_the_same_constraints_share_a_values_block():
+    query = sites_query(ITALY_SITE_MAPS)
+    assert query.count("VALUES") == 2 and query.count(" UNION ") == 1
+    assert '("catacombs" wd:Q839954 wd:Q172896 wd:Q38)' in query
+    assert '("chieti" wd:Q839954 wd:Q13138 wd:Q38)' in query
+
+
+def test_invalid_filter_lists():
+    with pytest.raises(ValueError, match="No site filters"):
+        sites_query([])
+    with pytest.raises(ValueError, match="unique"):
+        sites_query([CATACOMBS, SiteFilter("catacombs", "other", "Other", country="Q142")])
+
+
+def test_sites_frame_orders_filters(endpoint):
+    pytest.importorskip("geopandas")
+    gdf = sites_frame(_frame(endpoint, [CHIETI_SITES, CATACOMBS]), [CHIETI_SITES, CATACOMBS])
+    assert list(gdf["filter"].cat.categories) == ["chieti", "catacombs"]
+    assert gdf.crs == "EPSG:3857" and len(gdf) == 4
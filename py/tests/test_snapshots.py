@@ -0,0 +1,78 @@
+import json
+
+import pytest
+
+pd = pytest.importorskip("pandas")
+pytest.importorskip("pyarrow")
+
+from lodnb.frames import XSD  # noqa: E402
+from lodnb.snapshots import SnapshotStore, get_store, results_frame, snapshot_key  # noqa: E402
+
+ENDPOINT = "https://query.wikidata.org/sparql"
+QUERY = "SELECT ?item ?countyLabel ?stones WHERE { ?item wdt:P31 wd:Q2016147 }"
+
+
+def _body(rows):
+    bindings = [
+        {
+            "item": {"type": "uri", "value": f"http://www.wikidata.org/entity/Q{number}"},
+            "countyLabel": {"type": "literal", "xml:lang": "en", "value": county},
+            "stones": {"type": "literal", "datatype": XSD + "integer", "value": str(stones)},
+        }
+        for number, county, stones in rows
+    ]
+    return json.dumps({"head": {"vars": ["item", "countyLabel", "stones"]},
+                       "results": {"bindings": bindings}}).encode()
+
+
+def test_round_trip_keeps_dtypes_and_metadata(tmp_path):
+    store = SnapshotStore(str(tmp_path))
+    frame = pd.DataFrame({
+        "county": pd.Series(["Kerry", "Cork", "Kerry"], dtype="category"),
+        "stones": pd.Series([3, None, 5], dtype="Int64"),
+        "name": ["a", "b", None],
+    })
+    store.write("ogham", frame, query=QUERY, digest="abc")
+    assert store.keys() == ["ogham"]
+    assert store.metadata("ogham")["digest"] == "abc" and store.metadata("ogham")["rows"] == 3
+    pd.testing.assert_frame_equal(store.read_frame("ogham"), frame)
+    subset = store.read_frame("ogham", columns=["stones"], filters=[("county", "==", "Kerry")])
+    assert subset.columns.tolist() == ["stones"] and subset["stones"].tolist() == [3, 5]
+    either = store.read_frame("ogham", filters=[[("stones", ">", 4)], [("name", "==", "b")]])
+    assert either["county"].tolist() == ["Cork", "Kerry"]
+    store.delete("ogham")
+    assert store.metadata("ogham") is None and not store.exists("ogham")
+
+
+def test_round_trip_geometries(tmp_path):
+    gpd = pytest.importorskip("geopandas")
+    from shapely.geometry import Point
+
+    store = SnapshotStore(str(tmp_path))
+    frame = gpd.GeoDataFrame({"name": ["a", "b"]}, geometry=[Point(-9.5, 52.1), Point(-8.5, 51.9)], crs="EPSG:4326")
+    store.write("sites", frame)
+    read = store.read_frame("sites")
+    assert isinstance(read, gpd.GeoDataFrame) and read.crs.to_epsg() == 4326
+    assert read.geometry.equals(frame.geometry)
+    assert not isinstance(store.read_frame("sites", geometry=False), gpd.GeoDataFrame)
+
+
+def test_results_frame_reuses_an_unchanged_response():
+    body = _body([(1, "Kerry", 3), (2, "Cork", 5)])
+    first = results_frame(body, QUERY, ENDPOINT)
+    key = snapshot_key(QUERY, ENDPOINT)
+    written = get_store().modified(key)
+    again = results_frame(body, QUERY, ENDPOINT, columns=["stones"])
+    assert again["stones"].tolist() == first["stones"].tolist() == [3, 5]
+    assert get_store().modified(key) == written
+    changed = results_frame(_body([(1, "Kerry", 4)]), QUERY, ENDPOINT)
+    assert changed["stones"].tolist() == [4] and get_store().metadata(key)["rows"] == 1
+
+
+def test_results_frame_keeps_incremental_snapshots():
+    store = get_store()
+    incremental_key = snapshot_key(QUERY, ENDPOINT, "incremental")
+    assert incremental_key != snapshot_key(QUERY, ENDPOINT)
+    store.write(incremental_key, pd.DataFrame({"stones": [1]}), fingerprint={"rows": 1, "latest": None})
+    results_frame(_body([(1, "Kerry", 3)]), QUERY, ENDPOINT)
+    assert store.metadata(incremental_key)["fingerprint"] == {"rows": 1, "latest": None}
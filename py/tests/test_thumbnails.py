@@ -0,0 +1,54 @@
+import os
+
+import pytest
+
+Image = pytest.importorskip("PIL.Image")
+pytest.importorskip("requests")
+
+from lodnb.cache import OfflineCacheMiss  # noqa: E402
+from lodnb.thumbnails import ThumbnailStore, commons_file_name  # noqa: E402
+
+P18 = "http://commons.wikimedia.org/wiki/Special:FilePath/Teatro%20romano%20di%20Chieti.jpg"
+
+
+@pytest.fixture
+def originals(tmp_path):
+    path = tmp_path / "originals"
+    path.mkdir()
+    Image.new("RGB", (1000, 500), "red").save(path / "Teatro_romano_di_Chieti.jpg")
+    Image.new("RGBA", (100, 80), (0, 0, 255, 128)).save(path / "Small.png")
+    return str(path)
+
+
+def test_commons_file_name():
+    assert commons_file_name(P18) == "Teatro romano di Chieti.jpg"
+    assert commons_file_name("File:Teatro_romano.jpg") == "Teatro romano.jpg"
+
+
+def test_directory_source_thumbnails(originals):
+    store = ThumbnailStore(source=originals)
+    assert store.prefetch([P18, "Small.png", "Missing.jpg", None]) == 2
+    with Image.open(store.get(P18, width=200)) as thumbnail:
+        assert thumbnail.size == (320, 160) and thumbnail.format == "JPEG"
+    with Image.open(store.get("Small.png", width=640)) as thumbnail:
+        assert thumbnail.size == (100, 80) and thumbnail.mode == "RGB"
+    # Identical content is stored once: Small.png fits every width unscaled.
+    assert len({store.get("Small.png", width) for width in store.widths}) == 1
+    assert store.thumbnails([P18, None], width=160)[1] is None
+    assert os.path.dirname(store.get(P18)).startswith(store.objects)
+
+
+def test_commons_downloads_are_opt_in(monkeypatch):
+    class Source:
+        remote = True
+
+        def read(self, name, width):
+            raise AssertionError("no download expected")
+
+    store = ThumbnailStore(source=Source())
+    assert store.prefetch([P18]) == 0
+    with pytest.raises(OfflineCacheMiss):
+        store.get(P18)
+    monkeypatch.setenv("LODNB_THUMBNAILS", "1")
+    with pytest.raises(AssertionError, match="no download expected"):
+        store.get(P18)
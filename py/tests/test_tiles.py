@@ -0,0 +1,101 @@
+import io
+import threading
+
+import numpy as np
+import pytest
+
+pytest.importorskip("requests")
+Image = pytest.importorskip("PIL.Image")
+
+from lodnb import tiles  # noqa: E402
+from lodnb.cache import OfflineCacheMiss  # noqa: E402
+
+URL = "https://tiles.example.org/{z}/{x}/{y}.png"
+
+
+def _png(color):
+    buffer = io.BytesIO()
+    Image.new("RGB", (tiles.TILE_SIZE, tiles.TILE_SIZE), color).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+class Session:
+    """Stands in for the shared ``requests.Session``; serves one colour per column."""
+
+    def __init__(self):
+        self.urls = []
+        self.lock = threading.Lock()
+
+    def get(self, url, timeout):
+        with self.lock:
+            self.urls.append(url)
+        x = int(url.split("/")[-2])
+
+        class Response:
+            content = _png((255, 0, 0) if x % 2 == 0 else (0, 0, 255))
+
+            def raise_for_status(self):
+                pass
+
+        return Response()
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = tiles.TileStore(URL, path=str(tmp_path / "tiles.mbtiles"))
+    store._session = Session()
+    return store
+
+
+def test_session_is_shared_from_the_start(tmp_path):
+    store = tiles.TileStore(URL, path=str(tmp_path / "tiles.mbtiles"))
+    assert store._session.headers["User-Agent"] == tiles.USER_AGENT
+
+
+def test_tile_ranges():
+    assert tiles.tile_range((-tiles.ORIGIN, -tiles.ORIGIN, tiles.ORIGIN, tiles.ORIGIN), 2) == (0, 3, 0, 3)
+    assert tiles.lonlat_tile_range((-10.7, 51.4, -5.4, 55.5), 0) == (0, 0, 0, 0)
+    x0, x1, y0, y1 = tiles.lonlat_tile_range((-10.7, 51.4, -5.4, 55.5), 7)
+    assert (x0, x1) == (60, 62) and (y0, y1) == (40, 42)
+
+
+def test_prefetch_stores_missing_tiles_once(store):
+    wanted = [(3, x, y) for x in range(2) for y in range(2)]
+    assert store.prefetch(wanted, workers=4) == 4
+    assert store.prefetch(wanted) == 0
+    assert len(store._session.urls) == 4
+    assert all(store.has(*tile) for tile in wanted)
+
+
+def test_prefetch_refuses_bulk_downloads(store, monkeypatch):
+    with pytest.raises(ValueError, match="zoom 14"):
+        store.prefetch([(14, 0, 0)])
+    monkeypatch.setattr(tiles, "PREFETCH_MAX_TILES", 3)
+    with pytest.raises(ValueError, match="4 tiles"):
+        store.prefetch([(3, x, 0) for x in range(4)])
+    assert store._session.urls == []
+    assert store.prefetch([(14, 0, 0)], force=True) == 1
+
+
+def test_offline_store_never_downloads(store, monkeypatch):
+    monkeypatch.setenv("LODNB_OFFLINE", "1")
+    with pytest.raises(OfflineCacheMiss):
+        store.get(3, 0, 0)
+    assert store._session.urls == []
+
+
+def test_basemap_image_stitches_tiles(store, monkeypatch):
+    monkeypatch.setattr(tiles, "_stores", {URL: store})
+    monkeypatch.setattr(tiles, "_images", {})
+    size = 2 * tiles.ORIGIN / 4
+    west, north = -tiles.ORIGIN, tiles.ORIGIN
+    bounds = (west + 0.5 * size, north - 1.5 * size, west + 1.5 * size, north - 0.5 * size)
+    image, extent = tiles.basemap_image(bounds, 2, URL)
+    assert image.shape == (2 * tiles.TILE_SIZE, 2 * tiles.TILE_SIZE, 3)
+    assert extent == (-tiles.ORIGIN, -tiles.ORIGIN + 2 * size, tiles.ORIGIN - 2 * size, tiles.ORIGIN)
+    assert np.array_equal(image[0, 0], [255, 0, 0]) and np.array_equal(image[-1, -1], [0, 0, 255])
+    # The stitched image comes from disk once the in-memory copy is gone.
+    monkeypatch.setattr(tiles, "_images", {})
+    monkeypatch.setenv("LODNB_OFFLINE", "1")
+    store._db.execute("DELETE FROM tiles")
+    assert np.array_equal(tiles.basemap_image(bounds, 2, URL)[0], image)
@@ -0,0 +1,82 @@
+import json
+import types
+
+import pytest
+
+from lodnb import trace
+from lodnb.trace import current, format_summary, read_trace, span, summarize, traced
+
+
+@pytest.fixture
+def records(monkeypatch):
+    records = []
+    monkeypatch.setattr(trace, "_records", records)
+    monkeypatch.setattr(trace, "atexit", types.SimpleNamespace(register=lambda function: None))
+    return records
+
+
+def test_spans_are_free_when_tracing_is_off(records):
+    with span("fetch") as stage:
+        stage.add(bytes=10)
+        current().add(hits=1)
+    assert records == []
+
+
+def test_nested_spans_record_parents_counts_and_errors(records, monkeypatch):
+    monkeypatch.setenv("LODNB_TRACE", "1")
+    with span("script", script="ogham") as outer:
+        with span("fetch"):
+            current().add(hits=1, cached_bytes=100)
+            current().add(hits=1, cached_bytes=50)
+        with pytest.raises(KeyError), span("frame"):
+            raise KeyError("item")
+    fetch, frame, script = records
+    assert fetch["parent"] == frame["parent"] == outer.span_id and script["parent"] is None
+    assert (fetch["hits"], fetch["cached_bytes"]) == (2, 150)
+    assert frame["error"] == "KeyError" and script["script"] == "ogham"
+    assert all(record["seconds"] >= 0 and record["trace"] == trace._trace_id for record in records)
+    assert current() is trace._NO_SPAN
+
+
+def test_traced_records_rows(records, monkeypatch):
+    @traced("geometry", rows=True)
+    def rows(n):
+        return list(range(n))
+
+    assert rows(3) == [0, 1, 2] and records == []
+    monkeypatch.setenv("LODNB_TRACE", "1")
+    rows(5)
+    assert [(record["name"], record["rows"]) for record in records] == [("geometry", 5)]
+
+
+@pytest.mark.parametrize("trace_format", ["", "otlp"])
+def test_trace_files_round_trip(records, monkeypatch, tmp_path, trace_format):
+    path = tmp_path / "trace.jsonl"
+    monkeypatch.setenv("LODNB_TRACE", str(path))
+    monkeypatch.setenv("LODNB_TRACE_FORMAT", trace_format)
+    with span("fetch", endpoint="wikidata") as stage:
+        stage.add(bytes=2048, misses=1)
+    with span("fetch") as stage:
+        stage.add(cached_bytes=1024, hits=1)
+    lines = [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+    assert len(lines) == 2 and ("resourceSpans" in lines[0]) == (trace_format == "otlp")
+
+    read = read_trace(str(path))
+    assert [record["name"] for record in read] == ["fetch", "fetch"]
+    assert read[0]["bytes"] == 2048 and read[0]["endpoint"] == "wikidata"
+    assert read[0]["seconds"] == pytest.approx(records[0]["seconds"], abs=1e-6)
+    stage = summarize(read)["fetch"]
+    totals = [stage[key] for key in ("calls", "bytes", "cached_bytes", "hits", "misses")]
+    assert totals == [2, 2048, 1024, 1, 1]
+
+
+def test_format_summary_orders_stages_by_time():
+    records = [
+        {"name": "frame", "seconds": 0.5, "rows": 10, "peak_rss": 2 ** 20},
+        {"name": "fetch", "seconds": 2.0, "bytes": 2 ** 21, "peak_rss": None},
+        {"name": "frame", "seconds": 0.25, "rows": 5, "peak_rss": 3 * 2 ** 20},
+    ]
+    header, fetch, frame = format_summary(records).splitlines()
+    assert header.split()[:3] == ["stage", "calls", "wall"]
+    assert fetch.split()[:4] == ["fetch", "1", "2.000", "2.00"] and fetch.split()[6] == "-"
+    assert frame.split()[:3] == ["frame", "2", "0.750"] and frame.split()[5:7] == ["15", "3"]
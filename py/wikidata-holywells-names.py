@@ -1,15 +1,7 @@
-from SPARQLWrapper import SPARQLWrapper, JSON
-import pandas as pd
 import matplotlib.pyplot as plt
-from wordcloud import WordCloud
-
-# Function to query Wikidata
-def querySparql(query):
-    sparql = SPARQLWrapper("https://query.wikidata.org/sparql")
-    sparql.setQuery(query)
-    sparql.setReturnFormat(JSON)
-    results = sparql.queryAndConvert()
-    return results['results']['bindings']
+from lodnb.aggregate import share_with_others
+from lodnb.clouds import cached_wordcloud, render_wordcloud
+from lodnb.sparql import queryFrame
 
 # SPARQL Query for Holy Wells and Their Etymologies
 holyWellsQuery = """
@@ -25,53 +17,27 @@ GROUP BY ?etymology ?etymologyLabel
 ORDER BY DESC(?count)
 """
 
-# Fetch data using the SPARQL query
-sparql_results = querySparql(holyWellsQuery)
-
-# Convert SPARQL JSON results into a DataFrame
-data = []
-for result in sparql_results:
-    data.append({
-        "etymology": result['etymology']['value'],
-        "etymologyLabel": result['etymologyLabel']['value'],
-        "count": int(result['count']['value']),
-    })
-
-df = pd.DataFrame(data)
+# Fetch the SPARQL results as a typed DataFrame (?count is an xsd:integer)
+df = queryFrame(holyWellsQuery)
 
 # Check if DataFrame is populated
 if df.empty:
     print("No data retrieved from the query.")
 else:
-    # Generate Word Cloud
-    wordcloud = WordCloud(width=800, height=400, background_color="white").generate_from_frequencies(
-        dict(zip(df["etymologyLabel"], df["count"]))
+    # Generate Word Cloud; the layout is cached and reused while the counts stay (nearly) the same
+    wordcloud = cached_wordcloud(
+        dict(zip(df["etymologyLabel"], df["count"])), width=800, height=400, background_color="white"
     )
 
     plt.figure(figsize=(12, 8))
-    plt.imshow(wordcloud, interpolation="bilinear")
+    plt.imshow(render_wordcloud(wordcloud, width=1600), interpolation="bilinear")
     plt.axis("off")
     plt.title("Word Cloud of Holy Well Namesakes", fontsize=16)
     plt.tight_layout()
     plt.show()
 
-    # Generate Pie Chart with Filtering
-    df_sorted = df.sort_values(by="count", ascending=False)
-    total_count = df_sorted["count"].sum()
-
-    # Filter namesakes > 1% and group the rest into "Others"
-    df_sorted["percentage"] = (df_sorted["count"] / total_count) * 100
-    df_filtered = df_sorted[df_sorted["percentage"] > 1]
-    others_count = df_sorted[df_sorted["percentage"] <= 1]["count"].sum()
-
-    # Add "Others" if applicable
-    if others_count > 0:
-        df_filtered = pd.concat(
-            [
-                df_filtered,
-                pd.DataFrame({"etymologyLabel": ["Others"], "count": [others_count], "percentage": [others_count / total_count * 100]})
-            ]
-        )
+    # Generate Pie Chart with Filtering: namesakes > 1%, the rest grouped into "Others"
+    df_filtered = share_with_others(df.sort_values(by="count", ascending=False), "etymologyLabel", "count", 1)
 
     # Pie chart
     plt.figure(figsize=(12, 8))
@@ -0,0 +1,31 @@
+import matplotlib.pyplot as plt
+from lodnb.sitemaps import ITALY_SITE_MAPS, ITALY_SITES_QUERY, plot_site_map, sites_frame
+from lodnb.sparql import queryFrame
+from lodnb.thumbnails import contact_sheet
+
+# One SPARQL query for all site maps: catacombs and Roman theatres in Italy,
+# archaeological sites in Chieti; every row is tagged with its map in ?filter
+df = queryFrame(ITALY_SITES_QUERY, columns=["filter", "item", "itemLabel", "geo", "img"])
+print(df)
+
+# Check if DataFrame is populated
+if df.empty:
+    print("No data retrieved from the query.")
+else:
+    print("Data retrieved:")
+    print(df.groupby("filter", observed=True).size())
+
+    # Parse the coordinates and convert to Web Mercator once for all maps
+    gdf_mercator = sites_frame(df, ITALY_SITE_MAPS)
+
+    # One map per site type over an OSM basemap
+    for site_filter in ITALY_SITE_MAPS:
+        if plot_site_map(gdf_mercator, site_filter) is not None:
+            plt.show()
+
+    # Contact sheets of the Commons images (P18), read from the local thumbnail store;
+    # missing thumbnails are only downloaded with LODNB_THUMBNAILS=1
+    for site_filter in ITALY_SITE_MAPS:
+        sites = gdf_mercator[(gdf_mercator["filter"] == site_filter.name) & gdf_mercator["img"].notna()]
+        if not sites.empty and contact_sheet(sites, title=f"Images of {site_filter.label}", limit=48) is not None:
+            plt.show()
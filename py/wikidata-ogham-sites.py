@@ -1,13 +1,6 @@
-from SPARQLWrapper import SPARQLWrapper, JSON
-import pandas as pd
 import matplotlib.pyplot as plt
-
-def querySparql(query):
-    sparql = SPARQLWrapper("https://query.wikidata.org/sparql")
-    sparql.setQuery(query)
-    sparql.setReturnFormat(JSON)
-    results = sparql.queryAndConvert()
-    return results['results']['bindings']
+from lodnb.aggregate import count_by, grouped_bar, top_k_per_group
+from lodnb.sparql import queryFrame
 
 # Updated SPARQL Query
 oghamQuery = """
@@ -22,23 +15,8 @@ SELECT ?item ?itemLabel ?geo ?site ?siteLabel ?county ?countyLabel WHERE {
 }
 """
 
-# Fetch data using the SPARQL query
-sparql_results = querySparql(oghamQuery)
-
-# Convert SPARQL JSON results into a DataFrame
-data = []
-for result in sparql_results:
-    data.append({
-        "item": result['item']['value'],
-        "itemLabel": result['itemLabel']['value'],
-        "geo": result['geo']['value'] if 'geo' in result else None,
-        "site": result['site']['value'],
-        "siteLabel": result['siteLabel']['value'],
-        "county": result['county']['value'],
-        "countyLabel": result['countyLabel']['value'],
-    })
-
-df = pd.DataFrame(data)
+# Fetch the SPARQL results as a typed DataFrame
+df = queryFrame(oghamQuery)
 
 # Check if DataFrame is populated
 if df.empty:
@@ -49,21 +27,20 @@ else:
     county_colors = {county: color for county, color in zip(unique_counties, plt.cm.tab20.colors)}
 
     # Group by county and site to count stones
-    site_counts = df.groupby(['countyLabel', 'siteLabel']).size().reset_index(name='count')
+    site_counts = count_by(df, ['countyLabel', 'siteLabel'])
 
     # Identify the top 3 sites per county
-    top_sites = site_counts.groupby('countyLabel').apply(lambda x: x.nlargest(3, 'count')).reset_index(drop=True)
+    top_sites = top_k_per_group(site_counts, 'countyLabel', 'count', 3)
 
-    # Create a bar plot for the top 3 sites per county
+    # Create a bar plot for the top 3 sites per county (one bar call, coloured by county)
     plt.figure(figsize=(12, 8))
-    for county, group in top_sites.groupby('countyLabel'):
-        plt.bar(group['siteLabel'], group['count'], color=county_colors[county], label=county)
-    
+    patches = grouped_bar(plt.gca(), top_sites, 'siteLabel', 'count', 'countyLabel', county_colors)
+
     plt.title("Top 3 Sites per County with the Most Ogham Stones")
     plt.xlabel("Sites")
     plt.ylabel("Number of Ogham Stones")
     plt.xticks(rotation=45, ha="right")
-    plt.legend(title="County", bbox_to_anchor=(1.05, 1), loc='upper left')
+    plt.legend(handles=patches, title="County", bbox_to_anchor=(1.05, 1), loc='upper left')
     plt.tight_layout()
     plt.show()
 
@@ -1,13 +1,5 @@
-from SPARQLWrapper import SPARQLWrapper, JSON
-import pandas as pd
 import matplotlib.pyplot as plt
-
-def querySparql(query):
-    sparql = SPARQLWrapper("https://query.wikidata.org/sparql")
-    sparql.setQuery(query)
-    sparql.setReturnFormat(JSON)
-    results = sparql.queryAndConvert()
-    return results['results']['bindings']
+from lodnb.sparql import queryFrame
 
 # Updated SPARQL Query
 pokemonQuery = """
@@ -26,23 +18,10 @@ WHERE
 ORDER BY (?pokedexNumber)
 """
 
-# Fetch data using the SPARQL query
-sparql_results = querySparql(pokemonQuery)
-
-# Convert SPARQL JSON results into a DataFrame
-data = []
-for result in sparql_results:
-    data.append({
-        "pokemon": result['pokemon']['value'],
-        "pokemonLabel": result['pokemonLabel']['value'],
-        "pokedexNumber": int(result['pokedexNumber']['value']),
-        "color": result['color']['value'],
-        "colorLabel": result['colorLabel']['value'],
-        "mass": float(result['mass']['value']),
-    })
-
-# Create a DataFrame
-df = pd.DataFrame(data)
+# Fetch the SPARQL results as a typed DataFrame (?mass is an xsd:decimal)
+df = queryFrame(pokemonQuery)
+# Pokédex numbers are plain string literals, e.g. "025"
+df["pokedexNumber"] = df["pokedexNumber"].astype(int)
 
 # Check if DataFrame is populated
 if df.empty:
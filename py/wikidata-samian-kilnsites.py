@@ -1,13 +1,6 @@
-from SPARQLWrapper import SPARQLWrapper, JSON
-import pandas as pd
 import matplotlib.pyplot as plt
-
-def querySparql(query):
-    sparql = SPARQLWrapper("https://query.wikidata.org/sparql")
-    sparql.setQuery(query)
-    sparql.setReturnFormat(JSON)
-    results = sparql.queryAndConvert()
-    return results['results']['bindings']
+from lodnb.geo import parse_points
+from lodnb.sparql import queryFrame
 
 # SPARQL Query for Samian Ware Kiln Sites
 samianQuery = """
@@ -22,35 +15,19 @@ SELECT ?item ?samian ?itemLabel ?geo ?layerLabel ?layer ?kilnregion ?kilnregionL
 }
 """
 
-# Fetch data using the SPARQL query
-sparql_results = querySparql(samianQuery)
-
-# Convert SPARQL JSON results into a DataFrame
-data = []
-for result in sparql_results:
-    geo = result.get('geo', {}).get('value', None)
-    lat, lon = None, None
-    if geo:
-        coords = geo.replace("Point(", "").replace(")", "").split()
-        if len(coords) == 2:
-            lon, lat = map(float, coords)
-    data.append({
-        "item": result.get("item", {}).get("value", None),
-        "itemLabel": result.get("itemLabel", {}).get("value", None),
-        "layerLabel": result.get("layerLabel", {}).get("value", None),
-        "kilnregionLabel": result.get("kilnregionLabel", {}).get("value", None),
-        "latitude": lat,
-        "longitude": lon,
-    })
+# Fetch the SPARQL results as a typed DataFrame
+df = queryFrame(samianQuery, columns=["item", "itemLabel", "layerLabel", "kilnregionLabel", "geo"])
 
-df = pd.DataFrame(data)
+# Parse the kiln site coordinates
+coords, _ = parse_points(df["geo"])
+df[["latitude", "longitude"]] = coords[["latitude", "longitude"]]
 
 # Check if DataFrame is populated
 if df.empty:
     print("No data retrieved from the query.")
 else:
     # Count sites by region and layer for stacked bar chart
-    region_layer_counts = df.groupby(["kilnregionLabel", "layerLabel"]).size().unstack(fill_value=0)
+    region_layer_counts = df.groupby(["kilnregionLabel", "layerLabel"], observed=True).size().unstack(fill_value=0)
     
     # Create pie chart data
     region_counts = df["kilnregionLabel"].value_counts()